@@ -5,11 +5,15 @@ from langchain.memory import ConversationBufferWindowMemory
 from langchain.agents import AgentExecutor
 from langchain_core.prompts import ChatPromptTemplate,MessagesPlaceholder
 from langchain_openai import ChatOpenAI
-from optimization_solver import solve_dynamic_recovery_model
+from optimization_solver import solve_with_result_cache, solve_all_objectives, solve_heuristic_recovery, supports_template
 from schema import *
 from database import OptimizationDatabase
+import playbook
 import requests
 import os
+import json
+import contextvars
+import threading
 import redis
 from dotenv import load_dotenv
 import logging
@@ -17,17 +21,8 @@ load_dotenv(".env.example")
 # 初始化数据库
 db = OptimizationDatabase()
 db.save_optimization_config(OptimizationInput.Config.json_schema_extra["example"])
-def get_optimization_boundary(device_name:str,device_type:Literal["线路", "母线", "主变"]) -> str:
-    """
-    获取优化边界的工具，当识别到新故障时调用
-    
-    Args:
-        device_name: 故障设备的具体名称
-        device_type: 故障设备的类型
-    
-    Returns:
-        str: 操作结果描述
-    """
+def fetch_optimization_boundary(device_name: str, device_type: str) -> str:
+    """调用API接口获取故障设备的优化边界并存入数据库，返回操作结果描述"""
     try:
         # 尝试调用API接口获取优化边界
         api_url = os.getenv("DATA_URL")
@@ -51,6 +46,42 @@ def get_optimization_boundary(device_name:str,device_type:Literal["线路", "母
     except Exception as e:
         return f"获取优化边界时发生错误: {str(e)}"
 
+# 当前会话标识：main.py 的 /chat 按请求的 session_id 设置，工具调用在同一上下文中执行
+current_session = contextvars.ContextVar("agent_session", default="default")
+# 各会话后台获取优化边界的线程，run_optimization 读取配置前只等待本会话的线程完成
+_boundary_fetches = {}
+_boundary_fetches_lock = threading.Lock()
+
+def get_optimization_boundary(device_name:str,device_type:Literal["线路", "母线", "主变"]) -> str:
+    """
+    获取优化边界的工具，当识别到新故障时调用
+    
+    Args:
+        device_name: 故障设备的具体名称
+        device_type: 故障设备的类型
+    
+    Returns:
+        str: 操作结果描述
+    """
+    try:
+        # 快速路径：有该故障的预计算方案时立即返回，优化边界在后台获取
+        config = db.get_optimization_config()
+        entry = playbook.lookup_fault(db, OptimizationInput(**config).model_dump(), device_name, device_type) if config else None
+    except Exception as e:
+        print(f"Playbook lookup failed: {e}")
+        entry = None
+    if entry is None:
+        return fetch_optimization_boundary(device_name, device_type)
+    fetch = threading.Thread(target=fetch_optimization_boundary, args=(device_name, device_type), daemon=True)
+    with _boundary_fetches_lock:
+        _boundary_fetches[current_session.get()] = fetch
+    fetch.start()
+    plan = entry["plan"]
+    brief = {"summary": plan["summary"], "switch_operations": plan["results"]["switch_operations"],
+             "operations": plan["results"]["operations"]}
+    return f"设备 {device_name}（{device_type}）故障的预计算恢复方案（{entry['refreshed_at']} 生成）: " \
+           f"{json.dumps(brief, ensure_ascii=False)}。优化边界正在后台获取, 请继续执行后续优化以得到实时方案"
+
 def run_optimization(objective: Literal["MIN_SWITCH_OP", "MAX_SAFETY_REGION", "MIN_COST"] = None):
     """
     运行优化模型并返回结果
@@ -74,12 +105,45 @@ def run_optimization(objective: Literal["MIN_SWITCH_OP", "MAX_SAFETY_REGION", "M
                 data['objective'] = ObjectiveType.MAX_SAFETY_REGION
             elif objective == 'MIN_COST':
                 data['objective'] = ObjectiveType.MIN_COST        
+        # 等待本会话后台获取的优化边界写入数据库
+        with _boundary_fetches_lock:
+            fetch = _boundary_fetches.pop(current_session.get(), None)
+        if fetch is not None:
+            fetch.join()
+        # 快速路径：有预计算方案时直接返回，并在后台实时求解刷新方案
+        entry = playbook.lookup(db, data)
+        if entry is not None:
+            playbook.refresh_in_background(db, entry, data)
+            return entry["plan"]
         # 运行优化
-        result = solve_dynamic_recovery_model(**data)
+        result = solve_with_result_cache(**data, use_template=supports_template(data.get("solver_settings")))
         return result
     except Exception as e:
         return f"运行优化时发生错误: {str(e)}"
 
+def compare_objectives():
+    """
+    并行求解全部优化目标并比较方案，返回各目标的指标比较表和非支配（Pareto）方案
+    """
+    try:
+        data = OptimizationInput(**db.get_optimization_config()).model_dump()
+        result = solve_all_objectives(**data)
+        return {"comparison": result["comparison"], "pareto_front": result["pareto_front"]}
+    except Exception as e:
+        return f"多目标比较时发生错误: {str(e)}"
+
+def quick_recovery_plan():
+    """
+    不求解优化模型，用贪心启发式在1秒内给出初步恢复方案（开关操作、主变归属、操作顺序），供调度员先行参考
+    """
+    try:
+        data = OptimizationInput(**db.get_optimization_config()).model_dump()
+        result = solve_heuristic_recovery(**data)
+        return {"summary": result["summary"], "violations": result["solver"]["violations"],
+                "switch_operations": result["results"]["switch_operations"], "operations": result["results"]["operations"]}
+    except Exception as e:
+        return f"生成初步方案时发生错误: {str(e)}"
+
 from openai import OpenAI, max_retries
 modify_optimization_config_client = OpenAI(
     base_url=os.getenv("XIYAN_API_URL"),
@@ -119,6 +183,8 @@ def modify_optimization_config(query:str):
     clause = response.choices[0].message.content
     print(clause)
     db.execute_sql(clause)
+    # 开关、可用性或负荷修改后，删除按旧配置生成的预计算方案
+    playbook.invalidate(db)
     return "优化配置已更新, 请重新优化"
     
 tools = [
@@ -127,6 +193,16 @@ tools = [
         name="run_optimization",
         description="用于运行电网动态恢复优化的工具。参数从数据库中获取，输出为优化结果。"
     ),
+    StructuredTool.from_function(
+        func=quick_recovery_plan,
+        name="quick_recovery_plan",
+        description="不求解优化模型、快速给出初步恢复方案的工具。获取优化边界后先调用，向调度员给出初步方案，再运行完整优化。"
+    ),
+    StructuredTool.from_function(
+        func=compare_objectives,
+        name="compare_objectives",
+        description="同时求解最小化开关操作、最大化安全裕度、最小化发电成本三个目标并比较方案的工具。当用户希望比较不同目标的方案或查看权衡时调用。"
+    ),
     StructuredTool.from_function(
         func=get_optimization_boundary,
         name="get_optimization_boundary",
@@ -157,12 +233,14 @@ Guidelines:
 - If user input does not contain '/newfaultactivated', DO NOT call get_optimization_boundary tool. 
 - Device types must be one of: "线路", "母线", "主变"
 - After getting optimization boundary, you can run the run_optimization tool
+- After getting optimization boundary, call quick_recovery_plan first and briefly report the preliminary plan, then run the run_optimization tool
 - if user input indicates modification of optimization config, for example "某某机组无法启动"、"某某线路/通道不可用"、"某某开关存在缺陷"、"某某发电机出力受限，最高xxMW"、"某某负载负载值xx%", call modify_optimization_config tool.
 - when using modify_optimization_config tool, only keep the essential part of the user input, neglect the irrelevant parts.
 - if modify_optimization_config tool or get_optimization_boundary tool is called, you must run the run_optimization tool.
 - Report optimization results with clear explanations based on the optimization results. It should contain a summary of the optimization results, and the detailed explanations of each time slot.
 - DO NOT MODIFY the device name which the user mentioned.
 - use the default objective MIN_SWITCH_OP in normal case.
+- if the user asks to compare objectives or see the trade-offs, call compare_objectives instead of running run_optimization once per objective.
 
 OPTIMIZATION REPORT TEMPLATE 
 -----
@@ -0,0 +1,801 @@
+# benchmark.py
+"""
+求解器性能基准脚本
+
+使用方法:
+    python benchmark.py build        # 建模耗时随拓扑规模的变化（验证线性）
+    python benchmark.py template     # 配置修改后：重建模型 vs 模型模板增量更新
+    python benchmark.py warmstart    # 有/无初始解时的首个可行解时间与总求解时间
+    python benchmark.py objectives   # 三个目标依次求解 vs 进程池并行求解的总耗时
+    python benchmark.py lexicographic # 加权目标 vs 分层目标：求解时间、节点数、目标系数量级跨度
+    python benchmark.py reduction    # 部分开关不可用时，拓扑化简前后的模型规模与求解时间
+    python benchmark.py equivalence  # 随机开关不可用（含并联开关）时，拓扑化简前后各建模方式的最优目标值一致性检查
+    python benchmark.py reachability # 多个独立变电站时，可达性剪枝前后的模型规模与求解时间
+    python benchmark.py formulation  # 多商品流 / 单商品流 / 延迟割连通性建模：建模/求解耗时、峰值内存、方案是否一致
+    python benchmark.py strengthen   # 加强建模前后的LP松弛界、根节点界和求解时间
+    python benchmark.py heuristic    # 贪心启发式与MIP的耗时和目标值对比
+    python benchmark.py aggregation  # 长时段算例原始时段 vs 时段聚合求解
+    python benchmark.py decomposition # 长时段多机组算例直接求解 vs 拓扑/调度分解求解
+    python benchmark.py islands      # 多个独立变电站时整体求解 vs 按电气孤岛并行求解
+    python benchmark.py backends     # PySCIPOpt逐条建模 vs NumPy稀疏标准形式编译，SCIP/HiGHS求解耗时与目标值
+    python benchmark.py modelcache   # 冷启动建模 vs 从磁盘缓存（CIP/MPS）读入模型并修改数值参数
+    python benchmark.py resultcache  # 结果缓存未命中/进程内命中/Redis命中（内存替身）的耗时，核对三者结果形式一致、命中时时段标签重新生成
+    python benchmark.py contingency  # N-1预想事故扫描的吞吐量（每核每分钟事故数）随进程数的变化
+    python benchmark.py n2           # N-2扫描（支配剪枝、N-1方案证书）vs 逐对完整求解的耗时和无解设备对
+    python benchmark.py alternatives # 同一模型上取K个备选方案（解池 / no-good割）vs 每个方案重新建模求解
+    python benchmark.py scenarios    # 负荷场景：N份完整输入 vs 负荷矩阵的校验耗时与请求大小，场景批量求解及鲁棒性评估耗时
+"""
+import copy
+import json
+import math
+import os
+import random
+import sys
+import time
+from optimization_solver import build_dynamic_recovery_model, RecoveryModel, solve_dynamic_recovery_model, solve_all_objectives
+from schema import ObjectiveType, SolverSettings
+
+
+def make_synthetic_case(n_sections: int, bays_per_section: int = 4, n_zones: int = 2, horizon: int = 4,
+                        section_ties: bool = True) -> dict:
+    """
+    生成双母线分段接线的合成算例，格式与 OptimizationInput 一致
+    :param n_sections: 母线分段数，每段包含一组正/副母线和母联开关，相邻分段之间有分段开关
+    :param bays_per_section: 每段的主变间隔数
+    :param n_zones: 供区数量，每段正母/副母分别接入不同供区的线路
+    :param horizon: 时段数
+    :param section_ties: 是否设置分段开关；为False时各段相互独立（相当于多个变电站）
+    :return: 算例字典
+    """
+    zones = {f"Zone_{z}": {"capacity": 2000.0 + 100 * z, "fixed_load": [800.0 + 10 * t for t in range(horizon)]}
+             for z in range(n_zones)}
+    zone_names = list(zones.keys())
+    substation_nodes, transformers, zone_lines, switches = [], {}, {}, {}
+
+    def add_bay(name, bus_main, bus_aux, on_main, breaker_closed=1):
+        conn, brk = f"{name}_conn", f"{name}_breaker"
+        substation_nodes.extend([conn, brk])
+        switches[f"Breaker_{name}"] = {"nodes": (conn, brk), "initial_state": breaker_closed, "cost": 1.0,
+                                       "available": True, "switch_type": "breaker"}
+        switches[f"Switch_{name}_Main"] = {"nodes": (brk, bus_main), "initial_state": 1 if on_main else 0,
+                                           "cost": 5.0, "available": True, "switch_type": "switch"}
+        switches[f"Switch_{name}_Aux"] = {"nodes": (brk, bus_aux), "initial_state": 0 if on_main else 1,
+                                          "cost": 5.0, "available": True, "switch_type": "switch"}
+        return conn
+
+    for s in range(n_sections):
+        main_bus, aux_bus = f"main_bus_{s}", f"aux_bus_{s}"
+        substation_nodes.extend([main_bus, aux_bus])
+        switches[f"Breaker_Tie_{s}"] = {"nodes": (main_bus, aux_bus), "initial_state": 0, "cost": 5.0,
+                                        "available": True, "switch_type": "breaker"}
+        if s > 0 and section_ties:
+            switches[f"Breaker_Sec_{s}"] = {"nodes": (f"main_bus_{s - 1}", main_bus), "initial_state": 0,
+                                            "cost": 5.0, "available": True, "switch_type": "breaker"}
+        main_zone, aux_zone = zone_names[(2 * s) % n_zones], zone_names[(2 * s + 1) % n_zones]
+        # 每条母线各接一条运行线路和一条备用线路
+        for bus_tag, zone_name, on_main in (("M", main_zone, True), ("A", aux_zone, False)):
+            for k, closed in ((1, 1), (2, 0)):
+                line = f"Line_{s}_{bus_tag}{k}"
+                conn = add_bay(line, main_bus, aux_bus, on_main, breaker_closed=closed)
+                zone_lines[line] = {"zone": zone_name, "conn_node": conn, "available": True}
+        for b in range(bays_per_section):
+            t_name = f"T_{s}_{b}"
+            conn = add_bay(t_name, main_bus, aux_bus, on_main=(b % 2 == 0))
+            transformers[t_name] = {"load": [20.0 + b] * horizon, "conn_node": conn,
+                                    "sensitivity": {z: 1.0 for z in zone_names},
+                                    "cost": {z: 100.0 for z in zone_names}, "allocate": None}
+    # 故障：第一段正母线运行线路不可用
+    zone_lines["Line_0_M1"]["available"] = False
+    switches["Breaker_Line_0_M1"]["initial_state"] = 0
+
+    operating_units = {f"Coal_{z}": {"zone": z, "p_min": 100.0, "p_max": 400.0, "cost": 380.0,
+                                     "sensitivity": 1.0, "p_current": 200.0} for z in zone_names}
+    return {
+        "horizon": horizon, "zones": zones, "substation_nodes": substation_nodes,
+        "transformers": transformers, "zone_lines": zone_lines, "switches": switches,
+        "objective": "minimize_switch_operation", "operating_units": operating_units,
+        "backup_units": {}, "hydro_units": {}, "storage_units": {}, "interruptible_loads": {},
+    }
+
+
+def _params(case: dict) -> dict:
+    from schema import OptimizationInput
+    return OptimizationInput(**case).model_dump()
+
+
+def bench_build(sizes=(2, 4, 8, 16, 32), n_zones: int = 4, horizon: int = 4, repeat: int = 3):
+    """建模耗时随拓扑规模的变化，单位开关耗时应基本恒定（线性复杂度）"""
+    print(f"{'sections':>8} {'switches':>8} {'nodes':>6} {'vars':>7} {'conss':>7} {'build(s)':>9} {'us/switch':>10}")
+    for n in sizes:
+        params = _params(make_synthetic_case(n, n_zones=n_zones, horizon=horizon))
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            model = build_dynamic_recovery_model(**params).model
+            best = min(best, time.perf_counter() - start)
+        n_sw = len(params["switches"])
+        print(f"{n:>8} {n_sw:>8} {len(params['substation_nodes']):>6} {model.getNVars():>7} {model.getNConss():>7} "
+              f"{best:>9.3f} {best / n_sw * 1e6:>10.1f}")
+
+
+def bench_template(n_sections: int = 16, n_zones: int = 4, horizon: int = 4):
+    """模拟“某设备不可用，重新优化”：对比每次重建模型与模板增量更新的建模耗时"""
+    params = _params(make_synthetic_case(n_sections, n_zones=n_zones, horizon=horizon))
+    template = RecoveryModel(**params)
+    template.model.hideOutput()
+    # 只关心建模/更新耗时，求解限时即可让模型进入已求解状态
+    template.model.setParam("limits/time", 2)
+    edits = []
+    for name in list(params["switches"])[:5]:
+        edit = copy.deepcopy(params)
+        edit["switches"][name]["available"] = False
+        edits.append((f"switch {name} unavailable", edit))
+    edit = copy.deepcopy(params)
+    edit["operating_units"]["Coal_Zone_0"]["p_max"] = 350.0
+    edits.append(("Coal_Zone_0 p_max=350", edit))
+    print(f"{'edit':<40} {'rebuild(s)':>10} {'update(s)':>10} {'changes':>8}")
+    for label, edit in edits:
+        start = time.perf_counter()
+        RecoveryModel(**edit)
+        rebuild = time.perf_counter() - start
+        template.optimize()
+        start = time.perf_counter()
+        changes = template.update(**edit)
+        update = time.perf_counter() - start
+        print(f"{label:<40} {rebuild:>10.3f} {update:>10.3f} {changes:>8}")
+
+
+def _first_solution_time(model) -> float:
+    sols = model.getSols()
+    return min(model.getSolTime(sol) for sol in sols) if sols else float("nan")
+
+
+def bench_warm_start(n_sections: int = 3, n_zones: int = 4, horizon: int = 4):
+    """同一故障重复求解、相近故障（多一个开关不可用）求解时，初始解对求解时间的影响"""
+    params = _params(make_synthetic_case(n_sections, n_zones=n_zones, horizon=horizon))
+    near = copy.deepcopy(params)
+    near["switches"]["Breaker_Tie_0"]["available"] = False
+    # 先求解一次基础故障，保存的解作为后续求解的 previous 初始解
+    base = RecoveryModel(**params)
+    base.model.hideOutput()
+    base.optimize()
+    base.store_solution()
+    print(f"{'case':<10} {'warm_start':<10} {'accepted':<9} {'first_sol(s)':>12} {'total(s)':>9} {'objective':>10}")
+    for label, case in (("repeat", params), ("near", near)):
+        for source in ("none", "auto"):
+            recovery_model = RecoveryModel(**case)
+            recovery_model.model.hideOutput()
+            recovery_model.add_warm_start(source)
+            start = time.perf_counter()
+            recovery_model.optimize()
+            total = time.perf_counter() - start
+            report = recovery_model.warm_start_report() or {}
+            print(f"{label:<10} {source:<10} {str(report.get('accepted', '-')):<9} "
+                  f"{_first_solution_time(recovery_model.model):>12.3f} {total:>9.3f} {recovery_model.model.getObjVal():>10.4f}")
+
+
+def bench_objectives(n_sections: int = 2, n_zones: int = 4, horizon: int = 4):
+    """“比较各目标的方案”：三个目标依次求解与进程池并行求解的总耗时（并行收益取决于CPU核数）"""
+    params = _params(make_synthetic_case(n_sections, n_zones=n_zones, horizon=horizon))
+    params["solver_settings"] = {"warm_start": "none"}
+    start = time.perf_counter()
+    for objective in ObjectiveType:
+        solve_dynamic_recovery_model(**dict(params, objective=objective))
+    sequential = time.perf_counter() - start
+    result = solve_all_objectives(**params)
+    print(f"{'objective':<28} {'switch_cost':>11} {'safety(%)':>9} {'op_cost':>12} {'pareto':>6}")
+    for row in result["comparison"]:
+        print(f"{row['objective']:<28} {row.get('switch_cost', '-'):>11} {row.get('safety_region_percent', '-'):>9} "
+              f"{row.get('operation_cost', '-'):>12} {str(row['pareto_optimal']):>6}")
+    print(f"sequential: {sequential:.3f}s  parallel: {result['wall_time']:.3f}s  cpus: {os.cpu_count()}")
+
+
+def _coefficient_range(expr) -> float:
+    """目标函数非零系数的最大/最小绝对值之比，衡量数值跨度"""
+    coefs = [abs(c) for c in expr.terms.values() if abs(c) > 0]
+    return max(coefs) / min(coefs) if coefs else 1.0
+
+
+def bench_lexicographic(sizes=(2, 3), n_zones: int = 4, horizon: int = 4):
+    """同一算例分别以加权目标和分层目标求解（无初始解），比较耗时、节点数、目标系数跨度及方案指标"""
+    print(f"{'sections':>8} {'mode':<14} {'time(s)':>8} {'nodes':>6} {'coef_range':>11} "
+          f"{'switch_cost':>11} {'safety(%)':>9} {'op_cost':>12}")
+    for n in sizes:
+        params = _params(make_synthetic_case(n, n_zones=n_zones, horizon=horizon))
+        for mode in ("weighted", "lexicographic"):
+            recovery_model = RecoveryModel(**params)
+            recovery_model.model.hideOutput()
+            if mode == "weighted":
+                coef_range = _coefficient_range(recovery_model.model.getObjective())
+            else:
+                coef_range = max(_coefficient_range(recovery_model.objective_terms[o]) for o in ObjectiveType)
+            start = time.perf_counter()
+            recovery_model.run(SolverSettings(warm_start="none", objective_mode=mode))
+            elapsed = time.perf_counter() - start
+            result = recovery_model.extract_result()
+            switch_cost = sum(op["cost"] for op in result["results"]["switch_operations"])
+            print(f"{n:>8} {mode:<14} {elapsed:>8.3f} {result['solver']['nodes']:>6} {coef_range:>11.3g} "
+                  f"{switch_cost:>11} {result['summary']['safety_region_percent']:>9} {result['summary']['operation_cost']:>12}")
+
+
+def bench_reduction(sizes=(2, 3), n_cases: int = 4, unavailable_ratio: float = 0.25, n_zones: int = 4, horizon: int = 4):
+    """随机令一部分开关不可用（固定为初始状态），对比拓扑化简前后的变量/约束数和求解时间，并核对目标值一致"""
+    rng = random.Random(7)
+    print(f"{'sections':>8} {'case':>4} {'vars':>11} {'conss':>11} {'time(s)':>13} {'objective':>10} {'match':>5}")
+    for n in sizes:
+        base = _params(make_synthetic_case(n, n_zones=n_zones, horizon=horizon))
+        for k in range(n_cases):
+            params = copy.deepcopy(base)
+            for name in rng.sample(list(params["switches"]), int(len(params["switches"]) * unavailable_ratio)):
+                params["switches"][name]["available"] = False
+            rows = []
+            for reduce_topology in (False, True):
+                recovery_model = RecoveryModel({"reduce_topology": reduce_topology}, **params)
+                recovery_model.model.hideOutput()
+                size = (recovery_model.model.getNVars(), recovery_model.model.getNConss())
+                start = time.perf_counter()
+                recovery_model.optimize()
+                elapsed = time.perf_counter() - start
+                objective = round(recovery_model.model.getObjVal(), 4) if recovery_model.has_solution() else None
+                rows.append((size, elapsed, objective))
+            (full, t_full, obj_full), (reduced, t_reduced, obj_reduced) = rows
+            print(f"{n:>8} {k:>4} {full[0]:>5}->{reduced[0]:<5} {full[1]:>5}->{reduced[1]:<5} "
+                  f"{t_full:>6.2f}->{t_reduced:<6.2f} {str(obj_reduced):>10} {str(obj_full == obj_reduced):>5}")
+
+
+def bench_equivalence(sizes=(2, 3), n_cases: int = 12, n_zones: int = 4, horizon: int = 2, seed: int = 11):
+    """
+    随机算例上比较拓扑化简前后的最优目标值：若干主变间隔的断路器和一侧隔离开关固定闭合（间隔并入该侧母线，
+    另一侧隔离开关与母联开关并联），母联开关和另一侧隔离开关的初始状态随机，另有部分开关随机不可用。
+    RecoveryModel 的多商品流/加强/延迟割建模及稀疏标准形式分别核对，任一不一致时以非零状态退出
+    """
+    from optimization_solver import solve_standard_form
+    rng = random.Random(seed)
+    variants = {"multi_commodity": {}, "strengthen": {"strengthen": True}, "lazy_cuts": {"formulation": "lazy_cuts"}}
+    objectives = [objective.value for objective in ObjectiveType]
+    print(f"{'sections':>8} {'case':>4} {'objective':<26} {'parallel':>8} {'variant':<15} {'full':>10} {'reduced':>10} {'match':>5}")
+    mismatches = 0
+    for n in sizes:
+        base = _params(make_synthetic_case(n, n_zones=n_zones, horizon=horizon))
+        for k in range(n_cases):
+            params = copy.deepcopy(base)
+            params["objective"] = rng.choice(objectives)
+            switches = params["switches"]
+            for s in range(n):
+                switches[f"Breaker_Tie_{s}"]["initial_state"] = rng.choice((0, 1))
+            for t_name in rng.sample(list(params["transformers"]), rng.randint(1, 3)):
+                side, other = rng.choice((("Main", "Aux"), ("Aux", "Main")))
+                for name in (f"Breaker_{t_name}", f"Switch_{t_name}_{side}"):
+                    switches[name].update(available=False, initial_state=1)
+                switches[f"Switch_{t_name}_{other}"]["initial_state"] = rng.choice((0, 1))
+            for name in rng.sample(list(switches), int(len(switches) * rng.uniform(0.0, 0.15))):
+                switches[name]["available"] = False
+            parallel = None
+            for variant, options in variants.items():
+                values = []
+                for reduce_topology in (False, True):
+                    recovery_model = RecoveryModel(dict(options, reduce_topology=reduce_topology), **params)
+                    recovery_model.model.hideOutput()
+                    recovery_model.optimize()
+                    values.append(round(recovery_model.model.getObjVal(), 4) if recovery_model.has_solution() else None)
+                    if reduce_topology:
+                        parallel = recovery_model.network["stats"]["parallel_groups"]
+                rows = [(variant, values)]
+                if variant == "multi_commodity":
+                    standard = []
+                    for reduce_topology in (False, True):
+                        settings = SolverSettings(warm_start="none", backend="scip", topology_reduction=reduce_topology)
+                        result = solve_standard_form(params, settings)
+                        standard.append(result["objective_value"] if result else None)
+                    rows.append(("standard_form", standard))
+                for name, (full, reduced) in rows:
+                    match = full == reduced or (full is not None and reduced is not None
+                                                and abs(full - reduced) <= 1e-4 * max(1.0, abs(full)))
+                    mismatches += not match
+                    print(f"{n:>8} {k:>4} {params['objective']:<26} {parallel:>8} {name:<15} {str(full):>10} "
+                          f"{str(reduced):>10} {str(match):>5}")
+    print(f"mismatches: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+def bench_reachability(sizes=(2, 4, 8), horizon: int = 4):
+    """各段相互独立、每段两个供区时，主变只能转供到本段供区，比较可达性剪枝前后的流量变量数、模型规模与求解时间"""
+    print(f"{'sections':>8} {'zones':>5} {'flow_vars':>13} {'vars':>13} {'conss':>13} {'time(s)':>13} {'match':>5}")
+    for n in sizes:
+        params = _params(make_synthetic_case(n, n_zones=2 * n, horizon=horizon, section_ties=False))
+        rows = []
+        for prune in (False, True):
+            recovery_model = RecoveryModel({"prune_unreachable": prune}, **params)
+            recovery_model.model.hideOutput()
+            size = (len(recovery_model.f), recovery_model.model.getNVars(), recovery_model.model.getNConss())
+            start = time.perf_counter()
+            recovery_model.optimize()
+            elapsed = time.perf_counter() - start
+            objective = round(recovery_model.model.getObjVal(), 4) if recovery_model.has_solution() else None
+            rows.append((size, elapsed, objective))
+        (full, t_full, obj_full), (pruned, t_pruned, obj_pruned) = rows
+        print(f"{n:>8} {2 * n:>5} {full[0]:>6}->{pruned[0]:<6} {full[1]:>6}->{pruned[1]:<6} {full[2]:>6}->{pruned[2]:<6} "
+              f"{t_full:>6.2f}->{t_pruned:<6.2f} {str(obj_full == obj_pruned):>5}")
+
+
+def _run_formulation(params: dict, formulation: str, time_limit: float) -> dict:
+    """在独立进程中建模并求解，返回耗时、规模、峰值内存（ru_maxrss，KB）及方案"""
+    import resource
+    start = time.perf_counter()
+    recovery_model = RecoveryModel({"formulation": formulation}, **params)
+    build = time.perf_counter() - start
+    recovery_model.model.hideOutput()
+    recovery_model.model.setParam("limits/time", time_limit)
+    size = (recovery_model.model.getNVars(), recovery_model.model.getNConss())
+    start = time.perf_counter()
+    status = recovery_model.optimize()
+    solve = time.perf_counter() - start
+    solved = recovery_model.has_solution()
+    return {
+        "build": build, "solve": solve, "size": size, "status": status,
+        "memory": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "objective": round(recovery_model.model.getObjVal(), 4) if solved else None,
+        "plan": {name: round(recovery_model.model.getVal(var)) for name, var in recovery_model.S.items()} if solved else None,
+        "cuts": recovery_model.connectivity_conshdlr.ncuts if formulation == "lazy_cuts" else "-",
+    }
+
+
+def bench_formulation(sizes=(2, 3, 4), n_zones: int = 4, horizon: int = 4, time_limit: float = 120):
+    """同一算例分别用三种连通性建模方式求解（各自在新进程中运行以单独统计峰值内存），比较规模、耗时、内存与方案"""
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    context = multiprocessing.get_context("spawn")
+    print(f"{'sections':>8} {'formulation':<16} {'vars':>6} {'conss':>6} {'build(s)':>8} {'solve(s)':>8} "
+          f"{'maxrss(MB)':>10} {'status':<10} {'objective':>10} {'cuts':>5} {'same_plan':>9}")
+    for n in sizes:
+        params = _params(make_synthetic_case(n, n_zones=n_zones, horizon=horizon))
+        runs = {}
+        for formulation in ("multi_commodity", "single_commodity", "lazy_cuts"):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                runs[formulation] = pool.submit(_run_formulation, params, formulation, time_limit).result()
+        for formulation, run in runs.items():
+            same_plan = run["plan"] == runs["multi_commodity"]["plan"]
+            print(f"{n:>8} {formulation:<16} {run['size'][0]:>6} {run['size'][1]:>6} {run['build']:>8.3f} {run['solve']:>8.3f} "
+                  f"{run['memory'] / 1024:>10.1f} {run['status']:<10} {str(run['objective']):>10} {run['cuts']:>5} {str(same_plan):>9}")
+
+
+def _root_bound(recovery_model, lp_only: bool = False):
+    """只处理根节点求解，返回 (对偶界, 间隙)；lp_only 时关闭预处理、割平面、启发式和传播，得到LP松弛的界"""
+    from pyscipopt import SCIP_PARAMSETTING
+    model = recovery_model.model
+    if lp_only:
+        model.setPresolve(SCIP_PARAMSETTING.OFF)
+        model.setSeparating(SCIP_PARAMSETTING.OFF)
+        model.setHeuristics(SCIP_PARAMSETTING.OFF)
+        model.setParam("propagating/maxroundsroot", 0)
+    recovery_model.set_limits(node_limit=1)
+    recovery_model.optimize()
+    return model.getDualbound(), model.getGap() if model.getNSols() else None
+
+
+def bench_strengthen(sizes=(2, 3, 4, 5, 6), n_zones: int = 4, horizon: int = 4, time_limit: float = 300):
+    """比较当前建模与加强建模：LP松弛界、根节点对偶界与间隙（限制1个节点求解），以及完整求解的节点数、耗时与目标值"""
+    print(f"{'sections':>8} {'strengthen':>10} {'conss':>6} {'lp_bound':>9} {'root_bound':>11} {'root_gap':>9} "
+          f"{'nodes':>7} {'solve(s)':>8} {'objective':>10}")
+    for n in sizes:
+        params = _params(make_synthetic_case(n, n_zones=n_zones, horizon=horizon))
+        for strengthen in (False, True):
+            options = {"reduce_topology": True, "prune_unreachable": True, "strengthen": strengthen}
+            # 每项统计使用新模型，避免沿用之前求解找到的解
+            models = [RecoveryModel(options, **params) for _ in range(3)]
+            for recovery_model in models:
+                recovery_model.model.hideOutput()
+            lp_bound, _ = _root_bound(models[0], lp_only=True)
+            root_bound, root_gap = _root_bound(models[1])
+            recovery_model, model = models[2], models[2].model
+            recovery_model.set_limits(time_limit=time_limit)
+            start = time.perf_counter()
+            recovery_model.optimize()
+            solve = time.perf_counter() - start
+            objective = round(model.getObjVal(), 4) if recovery_model.has_solution() else None
+            gap = f"{root_gap:.2%}" if root_gap is not None and root_gap < 1e6 else "-"
+            print(f"{n:>8} {str(strengthen):>10} {model.getNConss():>6} {lp_bound:>9.4f} {root_bound:>11.4f} {gap:>9} "
+                  f"{model.getNNodes():>7} {solve:>8.3f} {str(objective):>10}")
+
+
+def bench_heuristic(sizes=(2, 4, 6, 8), n_zones: int = 4, horizon: int = 4, time_limit: float = 300):
+    """贪心启发式与MIP最优解比较：启发式耗时、目标值及与最优值的差距，以及MIP分别以初始状态/启发式方案为初始解的耗时"""
+    from optimization_solver import solve_heuristic_recovery, solve_dynamic_recovery_model
+    print(f"{'sections':>8} {'heur(s)':>8} {'heur_obj':>10} {'feasible':>8} {'optimal':>10} {'gap':>8} "
+          f"{'mip_initial(s)':>14} {'mip_heuristic(s)':>16}")
+    for n in sizes:
+        params = _params(make_synthetic_case(n, n_zones=n_zones, horizon=horizon))
+        start = time.perf_counter()
+        heuristic = solve_heuristic_recovery(**params)
+        heuristic_time = time.perf_counter() - start
+        times, optimal = {}, None
+        for warm_start in ("initial", "heuristic"):
+            settings = {"warm_start": warm_start, "time_limit": time_limit}
+            start = time.perf_counter()
+            result = solve_dynamic_recovery_model(**dict(params, solver_settings=settings))
+            times[warm_start] = time.perf_counter() - start
+            optimal = result["objective_value"] if result else optimal
+        gap = f"{(heuristic['objective_value'] - optimal) / abs(optimal):.2%}" if optimal else "-"
+        print(f"{n:>8} {heuristic_time:>8.3f} {heuristic['objective_value']:>10} {str(heuristic['solver']['feasible']):>8} "
+              f"{str(optimal):>10} {gap:>8} {times['initial']:>14.3f} {times['heuristic']:>16.3f}")
+
+
+def bench_aggregation(horizons=(24, 48, 96), n_sections: int = 2, n_zones: int = 4, steps_per_level: int = 8):
+    """
+    长时段算例（固定负荷每 steps_per_level 个时段变化一次）分别按原始时段和时段聚合求解，
+    比较模型时段数、耗时、目标值和开关方案
+    """
+    from optimization_solver import solve_dynamic_recovery_model
+    print(f"{'horizon':>7} {'mode':<12} {'steps':>5} {'time(s)':>8} {'objective':>10} {'same_plan':>9}")
+    for horizon in horizons:
+        case = make_synthetic_case(n_sections, n_zones=n_zones, horizon=horizon)
+        for z in case["zones"].values():
+            z["fixed_load"] = [800.0 + 50 * ((t // steps_per_level) % 3) for t in range(horizon)]
+        params = _params(case)
+        runs = {}
+        for mode, settings in (("full", {}), ("exact", {"time_aggregation": True}),
+                               ("coarsened", {"time_aggregation": True, "coarsen_after": 24, "coarsen_block": 12})):
+            start = time.perf_counter()
+            result = solve_dynamic_recovery_model(**dict(params, solver_settings=dict(settings, warm_start="none")))
+            runs[mode] = (time.perf_counter() - start, result)
+        for mode, (elapsed, result) in runs.items():
+            steps = result["solver"].get("time_aggregation", {}).get("aggregated_horizon", horizon)
+            same_plan = result["results"]["final_switch_states"] == runs["full"][1]["results"]["final_switch_states"]
+            print(f"{horizon:>7} {mode:<12} {steps:>5} {elapsed:>8.3f} {result['objective_value']:>10} {str(same_plan):>9}")
+
+
+def _add_dispatch_units(case: dict, units_per_zone: int):
+    """为算例的每个供区增加多台运行机组、备用机组、水电、储能和可中断负荷，固定负荷按日周期变化"""
+    horizon = case["horizon"]
+    for i, z in enumerate(case["zones"].values()):
+        z["capacity"] = 1150.0 + 50 * i
+        z["fixed_load"] = [800.0 + 150 * math.sin(2 * math.pi * t / 24) for t in range(horizon)]
+    case["operating_units"] = {}
+    for z_name in case["zones"]:
+        for k in range(units_per_zone):
+            case["operating_units"][f"G_{z_name}_{k}"] = {"zone": z_name, "p_min": 10.0, "p_max": 60.0 + 5 * k,
+                                                          "cost": 300.0 + 20 * k, "sensitivity": 1.0, "p_current": 20.0}
+        case["backup_units"][f"B_{z_name}"] = {"zone": z_name, "p_min": 20.0, "p_max": 80.0, "cost": 500.0,
+                                               "startup_cost": 2000.0, "sensitivity": 1.0, "available": True}
+        case["hydro_units"][f"H_{z_name}"] = {"zone": z_name, "p_max": 30.0, "cost": 50.0, "sensitivity": 1.0, "available": True}
+        case["storage_units"][f"ES_{z_name}"] = {"zone": z_name, "p_charge_max": 20.0, "p_discharge_max": 20.0,
+                                                 "soc_min": 10.0, "soc_max": 80.0, "soc_initial": 40.0,
+                                                 "p_current": 0.0, "sensitivity": 1.0}
+        case["interruptible_loads"][f"IL_{z_name}"] = {"zone": z_name, "shed_max": 50.0, "cost": 5000.0, "sensitivity": 1.0}
+
+
+def bench_decomposition(horizons=(24, 48, 96), n_sections: int = 3, n_zones: int = 4, units_per_zone: int = 8,
+                        objectives=("minimize_switch_operation", "minimize_gen_cost")):
+    """长时段、多机组算例分别直接求解和拓扑/调度分解求解，比较耗时、目标值和分解求解的割数、各部分耗时"""
+    print(f"{'horizon':>7} {'objective':<26} {'mode':<13} {'time(s)':>8} {'objective_value':>16} {'cuts':>5} "
+          f"{'master(s)':>9} {'sub(s)':>7} {'dispatch(s)':>11}")
+    for horizon in horizons:
+        case = make_synthetic_case(n_sections, n_zones=n_zones, horizon=horizon)
+        _add_dispatch_units(case, units_per_zone)
+        for objective in objectives:
+            params = _params(dict(case, objective=objective))
+            for mode, settings in (("monolithic", {}), ("decomposition", {"decomposition": True})):
+                start = time.perf_counter()
+                result = solve_dynamic_recovery_model(**dict(params, solver_settings=dict(settings, warm_start="none")))
+                elapsed = time.perf_counter() - start
+                info = result["solver"].get("decomposition")
+                columns = f"{info['cuts']:>5} {info['master_time']:>9.3f} {info['subproblem_time']:>7.3f} {info['dispatch_time']:>11.3f}" \
+                    if info else f"{'-':>5} {'-':>9} {'-':>7} {'-':>11}"
+                print(f"{horizon:>7} {objective:<26} {mode:<13} {elapsed:>8.3f} {result['objective_value']:>16} {columns}")
+
+
+def bench_islands(sizes=(2, 4, 8), horizon: int = 4):
+    """各段相互独立、每段两个供区时，整体求解与按孤岛并行求解的耗时、目标值，以及开关方案是否一致"""
+    print(f"{'sections':>8} {'islands':>7} {'workers':>7} {'monolithic(s)':>13} {'islands(s)':>10} "
+          f"{'objective':>20} {'plan_match':>10}")
+    for n in sizes:
+        params = _params(make_synthetic_case(n, n_zones=2 * n, horizon=horizon, section_ties=False))
+        rows = []
+        for parallel in (False, True):
+            start = time.perf_counter()
+            result = solve_dynamic_recovery_model(**dict(params, solver_settings={"parallel_islands": parallel, "warm_start": "none"}))
+            rows.append((result, time.perf_counter() - start))
+        (full, t_full), (split, t_split) = rows
+        islands = split["solver"].get("islands", [])
+        match = full["results"]["final_switch_states"] == split["results"]["final_switch_states"]
+        print(f"{n:>8} {len(islands):>7} {split['solver'].get('workers', 1):>7} {t_full:>13.3f} {t_split:>10.3f} "
+              f"{str(full['objective_value']) + '/' + str(split['objective_value']):>20} {str(match):>10}")
+
+
+def bench_backends(cases=((2, 4, 0), (3, 4, 0), (2, 24, 4), (3, 24, 4)), n_zones: int = 4, time_limit: float = 120,
+                   objectives=("minimize_switch_operation", "minimize_gen_cost")):
+    """
+    各算例（分段数, 时段数, 每供区机组数）分别比较：RecoveryModel 建模耗时与稀疏标准形式编译耗时，
+    以及直接求解、标准形式+SCIP、标准形式+HiGHS 的总耗时和目标值
+    """
+    from standard_form import compile_standard_form
+    from optimization_solver import MODEL_OPTIONS, _normalize_params, model_options
+    print(f"{'sections':>8} {'horizon':>7} {'units':>5} {'objective':<26} {'build(s)':>8} {'compile(s)':>10} "
+          f"{'native(s)':>9} {'scip(s)':>8} {'highs(s)':>8} {'objective_value':>16} {'match':>5}")
+    for n_sections, horizon, units_per_zone in cases:
+        case = make_synthetic_case(n_sections, n_zones=n_zones, horizon=horizon)
+        if units_per_zone:
+            _add_dispatch_units(case, units_per_zone)
+        for objective in objectives:
+            params = _params(dict(case, objective=objective))
+            settings = SolverSettings(warm_start="none", time_limit=time_limit)
+            start = time.perf_counter()
+            recovery_model = RecoveryModel(model_options(settings), **params)
+            build_time = time.perf_counter() - start
+            start = time.perf_counter()
+            compile_standard_form(_normalize_params(params), dict(MODEL_OPTIONS, **model_options(settings)))
+            compile_time = time.perf_counter() - start
+            del recovery_model
+            times, values = [], []
+            for backend in (None, "scip", "highs"):
+                start = time.perf_counter()
+                result = solve_dynamic_recovery_model(**dict(params, solver_settings=dict(settings.model_dump(), backend=backend)))
+                times.append(time.perf_counter() - start)
+                values.append(result["objective_value"] if result else None)
+            match = all(v is not None and abs(v - values[0]) <= 1e-4 * max(1.0, abs(values[0])) for v in values)
+            print(f"{n_sections:>8} {horizon:>7} {units_per_zone:>5} {objective:<26} {build_time:>8.3f} {compile_time:>10.3f} "
+                  f"{times[0]:>9.3f} {times[1]:>8.3f} {times[2]:>8.3f} {str(values[0]):>16} {str(match):>5}")
+
+
+def bench_model_cache(sizes=(4, 8, 16, 32), n_zones: int = 4, horizon: int = 24, repeat: int = 3):
+    """
+    各规模下比较：在Python中逐条建模的耗时，与从磁盘缓存读入模型文件（CIP/MPS）并按新负荷修改数值参数的耗时，
+    以及两种方式求解的目标值是否一致
+    """
+    import tempfile
+    import model_cache
+    from optimization_solver import _normalize_params, model_options, topology_fingerprint
+    settings = SolverSettings(warm_start="none")
+    options = model_options(settings)
+    print(f"{'sections':>8} {'vars':>7} {'conss':>7} {'format':>6} {'size(KB)':>8} {'build(s)':>8} {'write(s)':>8} "
+          f"{'load(s)':>8} {'update(s)':>9} {'speedup':>7} {'match':>5}")
+    for n in sizes:
+        case = make_synthetic_case(n, n_zones=n_zones, horizon=horizon)
+        params = _params(case)
+        # 缓存命中时的新输入：负荷变化，拓扑结构不变
+        changed = copy.deepcopy(case)
+        for t in changed["transformers"].values():
+            t["load"] = [load * 1.1 for load in t["load"]]
+        changed = _params(changed)
+        key = topology_fingerprint(_normalize_params(params), options)
+        for fmt in ("cip", "mps"):
+            with tempfile.TemporaryDirectory() as cache_dir:
+                build_times, load_times, update_times = [], [], []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    recovery_model = RecoveryModel(options, **params)
+                    build_times.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                model_cache.store_entry(key, recovery_model.write_file, cache_dir, fmt)
+                write_time = time.perf_counter() - start
+                size = os.path.getsize(model_cache.entry_paths(key, cache_dir, fmt)[0]) / 1024
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    path, meta = model_cache.load_entry(key, cache_dir, fmt)
+                    cached = RecoveryModel.from_file(path, meta, options)
+                    load_times.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    cached.update(**changed)
+                    update_times.append(time.perf_counter() - start)
+                cached.model.hideOutput()
+                cached.optimize()
+                fresh = RecoveryModel(options, **changed)
+                fresh.model.hideOutput()
+                fresh.optimize()
+                match = abs(cached.model.getObjVal() - fresh.model.getObjVal()) <= 1e-6 * max(1.0, abs(fresh.model.getObjVal()))
+                build, load, update = min(build_times), min(load_times), min(update_times)
+                print(f"{n:>8} {recovery_model.model.getNVars():>7} {recovery_model.model.getNConss():>7} {fmt:>6} {size:>8.0f} "
+                      f"{build:>8.3f} {write_time:>8.3f} {load:>8.3f} {update:>9.3f} {build / (load + update):>6.1f}x {str(match):>5}")
+
+
+class _DictRedis:
+    """只提供 get/set/delete 的内存Redis替身（decode_responses=True 语义）"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def bench_result_cache(n_sections: int = 2, n_zones: int = 4, horizon: int = 4):
+    """
+    结果缓存：未命中（求解）、进程内命中、Redis命中（清空进程内缓存后）的耗时；核对三者返回结果的形式相同
+    （去掉 solver.result_cache 和时段标签后完全一致），且命中时的时段标签按当前时间重新生成。不一致时以非零状态退出
+    """
+    from unittest import mock
+    from datetime import datetime, timedelta
+    from optimization_solver import solve_with_result_cache
+    from result_cache import ResultCache, set_result_cache
+    params = _params(make_synthetic_case(n_sections, n_zones=n_zones, horizon=horizon))
+    redis = _DictRedis()
+    cache = ResultCache(redis_client=redis)
+    set_result_cache(cache)
+
+    def stripped(result):
+        result = copy.deepcopy(result)
+        result["solver"].pop("result_cache")
+        result["results"].pop("time_slots")
+        for plan in result["results"]["dispatch_plan"]:
+            plan.pop("time")
+        return result
+
+    rows = []
+    for path in ("miss", "memory"):
+        start = time.perf_counter()
+        result = solve_with_result_cache(**params)
+        rows.append((path, time.perf_counter() - start, result))
+    miss = rows[0][2]
+    cache.clear()
+    # 模拟两小时后命中Redis：时段标签应从当前时间重新生成
+    later = datetime.now() + timedelta(hours=2)
+    with mock.patch("optimization_solver.datetime") as clock:
+        clock.now.return_value = later
+        start = time.perf_counter()
+        hit = solve_with_result_cache(**params)
+        rows.append(("redis", time.perf_counter() - start, hit))
+    expected = [(later + timedelta(hours=t)).strftime("%H:%M") for t in range(horizon)]
+    ok = True
+    print(f"{'path':<7} {'tier':<7} {'time(ms)':>10} {'same_shape':>10} {'labels':>7}")
+    for path, elapsed, result in rows:
+        same = stripped(result) == stripped(miss) and json.loads(json.dumps(result, default=str)) == result
+        labels = path == "miss" or (result["results"]["time_slots"] == expected if path == "redis" else True)
+        labels = labels and [plan["time"] for plan in result["results"]["dispatch_plan"]] == result["results"]["time_slots"]
+        ok = ok and same and labels
+        print(f"{path:<7} {result['solver']['result_cache']:<7} {elapsed * 1000:>10.2f} {str(same):>10} {str(labels):>7}")
+    print(f"redis keys: {len(redis.data)}, stats: {cache.stats()}")
+    if not ok:
+        sys.exit(1)
+
+
+def bench_contingency(sizes=(2, 4), n_zones: int = 2, horizon: int = 4, case_time_limit: float = 30.0):
+    """N-1预想事故扫描：单进程与全部CPU核并行时的总耗时和吞吐量，以及无解事故数"""
+    from contingency import screen_contingencies
+    cores = os.cpu_count() or 1
+    print(f"{'sections':>8} {'cases':>6} {'workers':>7} {'wall(s)':>8} {'cases/min/core':>14} {'infeasible':>10}")
+    for n in sizes:
+        params = _params(make_synthetic_case(n, n_zones=n_zones, horizon=horizon))
+        for workers in sorted({1, cores}):
+            report = screen_contingencies(params, max_workers=workers, case_time_limit=case_time_limit)
+            infeasible = sum(row["infeasible"] for row in report["cases"])
+            print(f"{n:>8} {report['case_count']:>6} {report['workers']:>7} {report['wall_time']:>8.2f} "
+                  f"{report['cases_per_minute_per_core']:>14.1f} {infeasible:>10}")
+
+
+def bench_n2(sizes=(2,), n_zones: int = 2, horizon: int = 4, case_time_limit: float = 30.0):
+    """N-2扫描：剪枝/证书校验后的总耗时（含N-1扫描）与逐对完整求解的对比，以及两者无解设备对是否一致"""
+    from contingency import screen_contingencies, screen_n2
+    print(f"{'sections':>8} {'pairs':>6} {'pruned':>6} {'certified':>9} {'solved':>6} {'n2(s)':>8} {'brute(s)':>8} {'speedup':>7} {'match':>5}")
+    for n in sizes:
+        params = _params(make_synthetic_case(n, n_zones=n_zones, horizon=horizon))
+        report = screen_n2(params, case_time_limit=case_time_limit)
+        brute = screen_contingencies(params, cases=[row["outages"] for row in report["cases"]], case_time_limit=case_time_limit)
+        infeasible = {row["device"] for row in brute["cases"] if row["infeasible"]}
+        match = infeasible == {row["device"] for row in report["cases"] if row["infeasible"]}
+        print(f"{n:>8} {report['case_count']:>6} {report['pruned']:>6} {report['certified']:>9} {report['solved']:>6} "
+              f"{report['wall_time']:>8.2f} {brute['wall_time']:>8.2f} {brute['wall_time'] / report['wall_time']:>6.1f}x {str(match):>5}")
+
+def bench_alternatives(sizes=(2, 3), k: int = 3, n_zones: int = 4, horizon: int = 4):
+    """
+    最优方案加K个备选方案的总耗时：解池去重、同一模型上逐个添加no-good割，
+    与每个方案重新建模并添加排除已得方案的割后独立求解对比，目标值应与独立求解一致
+    """
+    from pyscipopt import quicksum
+    print(f"{'sections':>8} {'method':<12} {'time(s)':>8} {'plans':>5}  objectives")
+    for n in sizes:
+        params = _params(make_synthetic_case(n, n_zones=n_zones, horizon=horizon))
+        for search in ("pool", "nogood"):
+            recovery_model = RecoveryModel(**params)
+            recovery_model.model.hideOutput()
+            start = time.perf_counter()
+            recovery_model.run(SolverSettings(warm_start="none"))
+            objectives = [round(recovery_model.model.getObjVal(), 4)]
+            objectives += [plan["objective_value"] for plan in recovery_model.alternative_plans(k, search)]
+            print(f"{n:>8} {search:<12} {time.perf_counter() - start:>8.3f} {len(objectives):>5}  {objectives}")
+        start = time.perf_counter()
+        found, objectives = [], []
+        for _ in range(k + 1):
+            recovery_model = RecoveryModel(**params)
+            recovery_model.model.hideOutput()
+            S = recovery_model.S
+            for states in found:
+                recovery_model.model.addCons(
+                    quicksum(1 - S[name] if state == 1 else S[name] for name, state in states.items()) >= 1)
+            recovery_model.run(SolverSettings(warm_start="none"))
+            if not recovery_model.has_solution():
+                break
+            found.append({name: round(recovery_model.model.getVal(var)) for name, var in S.items()})
+            objectives.append(round(recovery_model.model.getObjVal(), 4))
+        print(f"{n:>8} {'independent':<12} {time.perf_counter() - start:>8.3f} {len(objectives):>5}  {objectives}")
+
+def bench_scenarios(counts=(8, 32), n_sections: int = 2, n_zones: int = 4, horizon: int = 24):
+    """
+    N个负荷场景：以N份完整输入给出与以负荷矩阵给出时的请求大小和 pydantic 校验耗时，
+    以及 solve_scenarios 的求解、评估总耗时和不同开关方案数
+    """
+    import json
+    from scenarios import solve_scenarios
+    from schema import OptimizationInput, ScenarioInput
+    case = make_synthetic_case(n_sections, n_zones=n_zones, horizon=horizon)
+    print(f"{'scenarios':>9} {'copies(KB)':>10} {'copies(ms)':>10} {'matrix(KB)':>10} {'matrix(ms)':>10} "
+          f"{'solve(s)':>8} {'plans':>5} {'robust':>6}")
+    rng = random.Random(0)
+    for n in counts:
+        multipliers = [[round(rng.uniform(0.8, 1.2), 3) for _ in range(horizon)] for _ in range(n)]
+        copies = []
+        for row in multipliers:
+            edit = copy.deepcopy(case)
+            for t in edit["transformers"].values():
+                t["load"] = [load * m for load, m in zip(t["load"], row)]
+            for z in edit["zones"].values():
+                z["fixed_load"] = [load * m for load, m in zip(z["fixed_load"], row)]
+            copies.append(edit)
+        copies_payload = json.dumps(copies)
+        start = time.perf_counter()
+        [OptimizationInput(**c) for c in json.loads(copies_payload)]
+        copies_time = time.perf_counter() - start
+        matrix_payload = json.dumps(dict(case, scenarios={"multipliers": multipliers}))
+        start = time.perf_counter()
+        data = ScenarioInput(**json.loads(matrix_payload))
+        matrix_time = time.perf_counter() - start
+        params = data.model_dump()
+        scenarios = params.pop("scenarios")
+        report = solve_scenarios(params, **scenarios)
+        robust = sum(plan["feasible_probability"] >= 1.0 for plan in report["plans"])
+        print(f"{n:>9} {len(copies_payload) / 1024:>10.1f} {copies_time * 1000:>10.2f} {len(matrix_payload) / 1024:>10.1f} "
+              f"{matrix_time * 1000:>10.2f} {report['wall_time']:>8.2f} {len(report['plans']):>5} {robust:>6}")
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "build":
+        bench_build()
+    elif command == "template":
+        bench_template()
+    elif command == "warmstart":
+        bench_warm_start()
+    elif command == "objectives":
+        bench_objectives()
+    elif command == "lexicographic":
+        bench_lexicographic()
+    elif command == "reduction":
+        bench_reduction()
+    elif command == "equivalence":
+        bench_equivalence()
+    elif command == "reachability":
+        bench_reachability()
+    elif command == "formulation":
+        bench_formulation()
+    elif command == "strengthen":
+        bench_strengthen()
+    elif command == "heuristic":
+        bench_heuristic()
+    elif command == "aggregation":
+        bench_aggregation()
+    elif command == "decomposition":
+        bench_decomposition()
+    elif command == "islands":
+        bench_islands()
+    elif command == "backends":
+        bench_backends()
+    elif command == "modelcache":
+        bench_model_cache()
+    elif command == "resultcache":
+        bench_result_cache()
+    elif command == "contingency":
+        bench_contingency()
+    elif command == "n2":
+        bench_n2()
+    elif command == "alternatives":
+        bench_alternatives()
+    elif command == "scenarios":
+        bench_scenarios()
+    else:
+        print(f"Unknown command: {command}")
+        sys.exit(1)
@@ -0,0 +1,363 @@
+# contingency.py
+"""
+N-1 预想事故扫描：对基础输入逐一施加可信的单一设备停运（供区线路、主变、母线），得到故障后的输入，
+在进程池中分别限时求解，按严重程度排序输出扫描表。N-2 扫描（screen_n2）复用 N-1 结果剪枝：
+一个停运不影响另一事故N-1方案的设备对不求解（取该方案的指标），能由 N-1 方案直接给出可行方案的设备对
+只做固定开关状态的校验，其余设备对以 N-1 方案为初始解完整求解。
+
+故障后输入的构造与现有故障输入的约定一致（见 benchmark.make_synthetic_case）：
+    线路：available=False，连接点上的开关跳开（initial_state=0）
+    主变：连接点上的开关跳开并不可用，主变负荷计为损失负荷后置0，取消指定归属
+    母线：与母线相连的全部开关跳开并不可用
+"""
+import copy
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+
+from optimization_solver import RecoveryModel, _normalize_params, model_options
+from schema import SolverSettings
+
+DEVICE_LINE = "线路"
+DEVICE_TRANSFORMER = "主变"
+DEVICE_BUS = "母线"
+
+# 每个事故默认的求解时间上限（秒）
+CASE_TIME_LIMIT = 30.0
+
+
+def bus_nodes(params: dict) -> list:
+    """
+    母线节点：不是主变/线路连接点，且不经一个开关直接与连接点相连（即不是间隔断路器节点）的站内节点
+    """
+    conn_nodes = {t["conn_node"] for t in params["transformers"].values()} | \
+        {line["conn_node"] for line in params["zone_lines"].values()}
+    bay_nodes = set()
+    for sw in params["switches"].values():
+        u, v = sw["nodes"]
+        if u in conn_nodes:
+            bay_nodes.add(v)
+        if v in conn_nodes:
+            bay_nodes.add(u)
+    return [node for node in params["substation_nodes"] if node not in conn_nodes and node not in bay_nodes]
+
+
+def enumerate_contingencies(params: dict) -> list:
+    """
+    列出全部可信的单一停运：可用的供区线路、主变、母线
+    :return: [{"device": 设备名, "device_type": 线路/主变/母线}, ...]
+    """
+    cases = [{"device": name, "device_type": DEVICE_LINE}
+             for name, line in params["zone_lines"].items() if line.get("available", True)]
+    cases += [{"device": name, "device_type": DEVICE_TRANSFORMER} for name in params["transformers"]]
+    cases += [{"device": node, "device_type": DEVICE_BUS} for node in bus_nodes(params)]
+    return cases
+
+
+def _trip_switches(switches: dict, node: str, lock_out: bool):
+    """跳开与节点相连的开关；lock_out 时同时置为不可用（优化中固定为断开）"""
+    for sw in switches.values():
+        if node in sw["nodes"]:
+            sw["initial_state"] = 0
+            if lock_out:
+                sw["available"] = False
+
+
+def apply_outages(params: dict, outages: list) -> tuple:
+    """
+    在输入上施加设备停运，不修改原输入
+    :param outages: [{"device", "device_type"}, ...]
+    :return: (故障后的输入, 停运主变损失的负荷 MWh)
+    """
+    post = copy.deepcopy(params)
+    lost_load = 0.0
+    for outage in outages:
+        device, device_type = outage["device"], outage["device_type"]
+        if device_type == DEVICE_LINE:
+            line = post["zone_lines"][device]
+            line["available"] = False
+            _trip_switches(post["switches"], line["conn_node"], lock_out=False)
+        elif device_type == DEVICE_TRANSFORMER:
+            transformer = post["transformers"][device]
+            lost_load += sum(transformer["load"])
+            transformer["load"] = [0.0] * len(transformer["load"])
+            transformer["allocate"] = None
+            _trip_switches(post["switches"], transformer["conn_node"], lock_out=True)
+        elif device_type == DEVICE_BUS:
+            if device not in post["substation_nodes"]:
+                raise ValueError(f"未知母线: {device}")
+            _trip_switches(post["switches"], device, lock_out=True)
+        else:
+            raise ValueError(f"未知设备类型: {device_type}")
+    return post, lost_load
+
+
+def case_metrics(result: dict, lost_load: float = 0.0) -> dict:
+    """
+    由求解结果提取扫描指标，无解时 infeasible 为 True
+    :param lost_load: 停运设备直接损失的负荷 (MWh)，计入 load_shed
+    """
+    if result is None:
+        return {"infeasible": True, "load_shed": None, "lost_load": round(lost_load, 4), "operations_count": None,
+                "switch_cost": None, "min_safety_margin": None, "objective_value": None, "switch_operations": []}
+    shed = sum(sum(hour["shedding"].values()) for hour in result["results"]["dispatch_plan"])
+    return {
+        "infeasible": False,
+        "load_shed": round(shed + lost_load, 4),
+        "lost_load": round(lost_load, 4),
+        "operations_count": result["summary"]["total_operations_count"],
+        "switch_cost": round(sum(op["cost"] for op in result["results"]["switch_operations"]), 4),
+        "min_safety_margin": result["summary"]["safety_region_percent"],
+        "objective_value": result["objective_value"],
+        "switch_operations": [op["switch_name"] for op in result["results"]["switch_operations"]],
+    }
+
+
+def severity_key(row: dict) -> tuple:
+    """排序键（越严重越靠前）：无解、负荷损失多、最小安全裕度低、开关操作多"""
+    if row["infeasible"]:
+        return (0, 0.0, 0.0, 0)
+    return (1, -row["load_shed"], row["min_safety_margin"], -row["operations_count"])
+
+
+def _energized_nodes(params: dict, switch_states: dict) -> set:
+    """给定开关状态下与可用供区线路连接点连通的节点"""
+    graph = nx.Graph()
+    graph.add_nodes_from(params["substation_nodes"])
+    graph.add_edges_from(sw["nodes"] for name, sw in params["switches"].items() if switch_states[name] == 1)
+    nodes = set()
+    for line in params["zone_lines"].values():
+        if line.get("available", True) and line["conn_node"] in graph:
+            nodes |= nx.node_connected_component(graph, line["conn_node"])
+    return nodes
+
+
+def interrupted_transformers(params: dict) -> set:
+    """初始开关状态下不与任何可用供区线路连通的有负荷主变（故障后需要转供的主变）"""
+    energized = _energized_nodes(params, {name: sw["initial_state"] for name, sw in params["switches"].items()})
+    return {name for name, t in params["transformers"].items() if max(t["load"]) > 0 and t["conn_node"] not in energized}
+
+
+def outage_footprint(params: dict, outages: list) -> dict:
+    """
+    停运在基础输入上改动的部分：{"switches": 被跳开或闭锁的开关, "lines": 停运的供区线路连接点,
+    "lost_load": 损失负荷, "interrupted": 新增需转供的主变}
+    """
+    post, lost_load = apply_outages(params, outages)
+    switches = {name for name, sw in post["switches"].items()
+                if (sw["initial_state"], sw.get("available", True)) !=
+                (params["switches"][name]["initial_state"], params["switches"][name].get("available", True))}
+    lines = {line["conn_node"] for name, line in post["zone_lines"].items()
+             if not line.get("available", True) and params["zone_lines"][name].get("available", True)}
+    return {"switches": switches, "lines": lines, "lost_load": lost_load,
+            "interrupted": interrupted_transformers(post) - interrupted_transformers(params)}
+
+
+def dominates(post: dict, footprint: dict, switch_states: dict) -> bool:
+    """
+    另一事故的N-1方案在叠加本停运后是否仍然可行且不变：本停运不损失负荷、不新增失电主变，
+    跳开的开关在方案中都断开，停运线路在方案中不带有负荷的主变（此时该方案对N-2输入可行，指标为其上界）
+    :param post: 两个停运都施加后的输入
+    """
+    if footprint["lost_load"] > 0 or footprint["interrupted"]:
+        return False
+    if any(switch_states.get(name) != 0 for name in footprint["switches"]):
+        return False
+    graph = nx.Graph()
+    graph.add_nodes_from(post["substation_nodes"])
+    graph.add_edges_from(sw["nodes"] for name, sw in post["switches"].items() if switch_states[name] == 1)
+    loaded = {t["conn_node"] for t in post["transformers"].values() if max(t["load"]) > 0}
+    return not any(node in graph and nx.node_connected_component(graph, node) & loaded for node in footprint["lines"])
+
+
+def _certify(recovery_model, switch_states: dict, time_limit: float = None) -> bool:
+    """
+    以给定开关状态作为可行性证书：固定开关状态求解（只剩主变归属和调度），有解时模型保留该解；
+    开关状态与故障后固定的开关冲突或无解时恢复变量上下界并返回 False
+    """
+    model = recovery_model.model
+    keys = [("S", name) for name in recovery_model.S]
+    for key in keys:
+        lb, ub = recovery_model._bounds[key]
+        if not lb <= switch_states.get(key[1], -1) <= ub:
+            return False
+    for key in keys:
+        model.chgVarLb(recovery_model.vars[key], switch_states[key[1]])
+        model.chgVarUb(recovery_model.vars[key], switch_states[key[1]])
+    recovery_model.set_limits(time_limit)
+    recovery_model.optimize()
+    if recovery_model.has_solution():
+        return True
+    model.freeTransform()
+    for key in keys:
+        lb, ub = recovery_model._bounds[key]
+        model.chgVarLb(recovery_model.vars[key], lb)
+        model.chgVarUb(recovery_model.vars[key], ub)
+    return False
+
+
+def _solve_case(params: dict, outages: list, solver_settings: dict, keep_result: bool = False,
+                start_plans: list = None) -> dict:
+    """
+    进程池工作函数：构造故障后输入并限时求解一个事故；keep_result 时在 row["result"] 中返回完整结果
+    :param start_plans: [(来源事故, 开关状态), ...]，依次作为可行性证书校验，都不可行时以第一个作为初始解完整求解
+    """
+    start = time.perf_counter()
+    row = {"device": " + ".join(o["device"] for o in outages),
+           "device_type": " + ".join(o["device_type"] for o in outages), "outages": outages, "screened": "solved"}
+    try:
+        post, lost_load = apply_outages(params, outages)
+        settings = SolverSettings.model_validate(solver_settings or {})
+        recovery_model = RecoveryModel(model_options(settings), **post)
+        recovery_model.model.hideOutput()
+        termination = None
+        for source, switch_states in start_plans or []:
+            if _certify(recovery_model, switch_states, settings.time_limit):
+                termination = recovery_model.model.getStatus()
+                row.update(screened="certified", certificate=source)
+                break
+        if termination is None:
+            if start_plans:
+                settings = settings.model_copy(update={"warm_start": "plan", "start_plan": start_plans[0][1]})
+            termination = recovery_model.run(settings)
+        result = recovery_model.extract_result() if recovery_model.has_solution() else None
+        row.update(case_metrics(result, lost_load))
+        row["termination"] = termination
+        if keep_result:
+            row["result"] = result
+    except Exception as e:
+        row.update(case_metrics(None), termination="error", error=str(e))
+    row["wall_time"] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def _screening_settings(params: dict, case_time_limit: float) -> tuple:
+    """拆分输入和求解器设置：每个事故的时间上限覆盖 time_limit，初始解只用初始状态（或给定的N-1方案）"""
+    params = dict(params)
+    solver_settings = SolverSettings.model_validate(params.pop("solver_settings", None) or {}).model_dump()
+    if case_time_limit:
+        solver_settings["time_limit"] = case_time_limit
+    # 扫描只关心方案本身，不从上次解或启发式构造初始解以免进程间结果依赖求解顺序
+    solver_settings["warm_start"] = "initial"
+    # 事故直接用 RecoveryModel 建模求解（N-2 需要固定开关校验和N-1方案初始解），不使用标准形式求解引擎
+    solver_settings["backend"] = None
+    return _normalize_params(params), solver_settings
+
+
+def _run_cases(params: dict, cases: list, solver_settings: dict, max_workers: int = None, keep_results: bool = False,
+               start_plans: list = None) -> tuple:
+    """在进程池中求解事故列表，返回 (结果行列表, 进程数)"""
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    workers = max(1, max_workers or min(len(cases), os.cpu_count() or 1))
+    if not cases:
+        return [], workers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        rows = list(pool.map(_solve_case, [params] * len(cases), cases, [solver_settings] * len(cases),
+                             [keep_results] * len(cases), start_plans or [None] * len(cases)))
+    return rows, workers
+
+
+def screen_contingencies(params: dict, cases: list = None, max_workers: int = None, case_time_limit: float = CASE_TIME_LIMIT,
+                         db=None, keep_results: bool = False) -> dict:
+    """
+    批量求解预想事故并按严重程度排序
+    :param params: 基础输入（OptimizationInput.model_dump() 格式，可含 solver_settings）
+    :param cases: 事故列表，每项为停运设备列表 [{"device", "device_type"}, ...]，默认全部N-1事故
+    :param max_workers: 进程数，默认取事故数与CPU核数的较小值
+    :param case_time_limit: 每个事故的求解时间上限（秒），覆盖 solver_settings.time_limit
+    :param db: OptimizationDatabase，给出时将扫描结果写入数据库
+    :param keep_results: 是否在每行的 "result" 中保留完整求解结果（无解时为 None）
+    :return: {"cases": 按严重程度排序的扫描表, "case_count", "workers", "wall_time",
+              "cases_per_minute_per_core", "screening_id"}
+    """
+    params, solver_settings = _screening_settings(params, case_time_limit)
+    if cases is None:
+        cases = [[case] for case in enumerate_contingencies(params)]
+    start = time.perf_counter()
+    rows, workers = _run_cases(params, cases, solver_settings, max_workers, keep_results)
+    wall_time = time.perf_counter() - start
+    rows.sort(key=severity_key)
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+    report = {
+        "cases": rows,
+        "case_count": len(rows),
+        "workers": workers,
+        "wall_time": round(wall_time, 3),
+        "cases_per_minute_per_core": round(len(rows) / max(wall_time, 1e-9) * 60 / workers, 2),
+        "screening_id": None,
+    }
+    if db is not None:
+        report["screening_id"] = db.save_contingency_screening(report)
+    return report
+
+
+def screen_n2(params: dict, n1_report: dict = None, max_workers: int = None, case_time_limit: float = CASE_TIME_LIMIT,
+              db=None) -> dict:
+    """
+    N-2 预想事故扫描：枚举N-1事故的全部两两组合，复用N-1结果剪枝后只完整求解其余设备对
+    1) 支配剪枝：一个停运不损失负荷、不新增失电主变，且不触及另一事故N-1方案使用的开关和线路（见 dominates）时，
+       该N-1方案对设备对仍可行，不求解，指标取该方案的指标（screened="pruned"，dominated_by 为该事故）；
+    2) 可行性证书：依次固定两个N-1方案的开关状态求解，可行时直接采用（screened="certified"）；
+    3) 其余设备对以较好的N-1方案为初始解完整求解（screened="solved"）。
+    :param n1_report: keep_results=True 的 screen_contingencies 结果，缺省时先进行N-1扫描
+    :return: {"cases": 按严重程度排序的扫描表, "case_count", "pruned", "certified", "solved", "n1_wall_time",
+              "workers", "wall_time"（含N-1扫描）, "cases_per_minute_per_core", "screening_id"}
+    """
+    start = time.perf_counter()
+    # 传入的N-1扫描耗时另计入总耗时
+    previous_time = 0.0
+    if n1_report is None or any("result" not in row for row in n1_report["cases"]):
+        n1_report = screen_contingencies(params, max_workers=max_workers, case_time_limit=case_time_limit, keep_results=True)
+    else:
+        previous_time = n1_report["wall_time"]
+    base, solver_settings = _screening_settings(params, case_time_limit)
+    n1_rows = [row for row in n1_report["cases"] if len(row["outages"]) == 1]
+    footprints = {row["device"]: outage_footprint(base, row["outages"]) for row in n1_rows}
+    rows, cases, start_plans = [], [], []
+    for a, b in itertools.combinations(n1_rows, 2):
+        outages = a["outages"] + b["outages"]
+        post, lost_load = apply_outages(base, outages)
+        parents = sorted((row for row in (a, b) if row["result"] is not None), key=lambda row: row["objective_value"])
+        plans = [(row["device"], row["result"]["results"]["final_switch_states"]) for row in parents]
+        dominant = next((row for row, (_, states) in zip(parents, plans)
+                         if dominates(post, footprints[(b if row is a else a)["device"]], states)), None)
+        if dominant is not None:
+            row = {"device": f"{a['device']} + {b['device']}", "device_type": f"{a['device_type']} + {b['device_type']}",
+                   "outages": outages, "screened": "pruned", "dominated_by": dominant["device"],
+                   "termination": "pruned", "wall_time": 0.0}
+            row.update(case_metrics(dominant["result"], lost_load))
+            rows.append(row)
+            continue
+        cases.append(outages)
+        start_plans.append(plans)
+    solve_start = time.perf_counter()
+    solved_rows, workers = _run_cases(base, cases, solver_settings, max_workers, start_plans=start_plans)
+    rows += solved_rows
+    solve_time = time.perf_counter() - solve_start
+    wall_time = time.perf_counter() - start
+    rows.sort(key=severity_key)
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+    report = {
+        "cases": rows,
+        "case_count": len(rows),
+        "pruned": sum(row["screened"] == "pruned" for row in rows),
+        "certified": sum(row["screened"] == "certified" for row in rows),
+        "solved": sum(row["screened"] == "solved" for row in rows),
+        "n1_wall_time": n1_report["wall_time"],
+        "workers": workers,
+        "wall_time": round(wall_time + previous_time, 3),
+        "cases_per_minute_per_core": round(len(cases) / max(solve_time, 1e-9) * 60 / workers, 2),
+        "screening_id": None,
+    }
+    if db is not None:
+        report["screening_id"] = db.save_contingency_screening(report)
+    return report
@@ -190,6 +190,56 @@ class OptimizationDatabase:
                 ) -- 变电站节点表，存储电力系统中的变电站节点信息
             """)
             
+            # 创建预想事故扫描表
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS contingency_screenings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, -- 主键ID
+                    case_count INTEGER NOT NULL, -- 事故数
+                    workers INTEGER NOT NULL, -- 并行进程数
+                    wall_time REAL NOT NULL, -- 总耗时（秒）
+                    cases_per_minute_per_core REAL NOT NULL, -- 吞吐量（每核每分钟事故数）
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP -- 扫描时间
+                ) -- 预想事故扫描批次表，存储每次扫描的规模和吞吐量
+            """)
+            
+            # 创建预想事故扫描结果表
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS contingency_results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, -- 主键ID
+                    screening_id INTEGER NOT NULL, -- 扫描批次ID，外键
+                    rank INTEGER NOT NULL, -- 严重程度排名，1为最严重
+                    device_name TEXT NOT NULL, -- 停运设备名称（多重停运以 + 连接）
+                    device_type TEXT NOT NULL, -- 停运设备类型（线路、主变、母线）
+                    infeasible INTEGER NOT NULL, -- 是否无可行方案，1表示无解
+                    termination TEXT, -- 求解终止原因
+                    load_shed REAL, -- 负荷损失（MWh），含停运主变直接损失的负荷
+                    operations_count INTEGER, -- 开关操作次数
+                    switch_cost REAL, -- 开关操作成本
+                    min_safety_margin REAL, -- 最小安全裕度（%）
+                    objective_value REAL, -- 目标函数值
+                    switch_operations TEXT, -- 需操作的开关，JSON数组格式
+                    wall_time REAL, -- 求解耗时（秒）
+                    FOREIGN KEY (screening_id) REFERENCES contingency_screenings(id)
+                ) -- 预想事故扫描结果表，存储每个事故的求解结果，按严重程度排名
+            """)
+            
+            # 创建预计算恢复方案表
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS recovery_playbook (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, -- 主键ID
+                    device_name TEXT NOT NULL, -- 故障设备名称
+                    device_type TEXT NOT NULL, -- 故障设备类型（线路、主变、母线）
+                    fingerprint TEXT NOT NULL, -- 故障后输入的拓扑结构指纹
+                    state_signature TEXT NOT NULL, -- 故障后输入除负荷外全部参数（开关状态、设备可用性与参数、优化目标等）的哈希
+                    load_bucket INTEGER NOT NULL, -- 故障后总负荷所在的分档
+                    base_signature TEXT NOT NULL, -- 生成方案时基础配置的开关状态、设备可用性和优化目标的哈希
+                    base_load_bucket INTEGER NOT NULL, -- 生成方案时基础配置总负荷所在的分档
+                    plan TEXT NOT NULL, -- 求解结果，JSON对象格式
+                    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- 方案生成或最近一次实时求解刷新的时间
+                    UNIQUE(device_name, device_type, fingerprint, state_signature, load_bucket)
+                ) -- 预计算恢复方案表，按（故障设备、拓扑指纹、负荷分档）存储离线求解的恢复方案
+            """)
+            
             conn.commit()
     
     def save_optimization_config(self, config_data: Dict[str, Any]) -> int:
@@ -481,6 +531,104 @@ class OptimizationDatabase:
             
             return config_data
     
+    def save_contingency_screening(self, report: Dict[str, Any]) -> int:
+        """保存预想事故扫描结果（contingency.screen_contingencies 的返回值），返回扫描批次ID"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO contingency_screenings (case_count, workers, wall_time, cases_per_minute_per_core)
+                VALUES (?, ?, ?, ?)
+            """, (report['case_count'], report['workers'], report['wall_time'], report['cases_per_minute_per_core']))
+            screening_id = cursor.lastrowid
+            cursor.executemany("""
+                INSERT INTO contingency_results (screening_id, rank, device_name, device_type, infeasible, termination,
+                                                 load_shed, operations_count, switch_cost, min_safety_margin,
+                                                 objective_value, switch_operations, wall_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(screening_id, row['rank'], row['device'], row['device_type'], 1 if row['infeasible'] else 0,
+                   row.get('termination'), row['load_shed'], row['operations_count'], row['switch_cost'],
+                   row['min_safety_margin'], row['objective_value'], json.dumps(row['switch_operations'], ensure_ascii=False),
+                   row['wall_time']) for row in report['cases']])
+            conn.commit()
+            return screening_id
+    
+    def get_contingency_results(self, screening_id: int = None) -> list:
+        """获取预想事故扫描结果（按排名），默认取最近一次扫描"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            if screening_id is None:
+                cursor.execute("SELECT MAX(id) FROM contingency_screenings")
+                screening_id = cursor.fetchone()[0]
+                if screening_id is None:
+                    return []
+            cursor.execute("""
+                SELECT rank, device_name, device_type, infeasible, termination, load_shed, operations_count,
+                       switch_cost, min_safety_margin, objective_value, switch_operations, wall_time
+                FROM contingency_results WHERE screening_id = ? ORDER BY rank
+            """, (screening_id,))
+            columns = [column[0] for column in cursor.description]
+            rows = []
+            for values in cursor.fetchall():
+                row = dict(zip(columns, values))
+                row['infeasible'] = bool(row['infeasible'])
+                row['switch_operations'] = json.loads(row['switch_operations'])
+                rows.append(row)
+            return rows
+    
+    def save_playbook_entry(self, entry: Dict[str, Any]) -> int:
+        """保存（或替换同一键的）预计算恢复方案，返回方案ID"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR REPLACE INTO recovery_playbook (device_name, device_type, fingerprint, state_signature, load_bucket,
+                                                          base_signature, base_load_bucket, plan, refreshed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, (entry['device_name'], entry['device_type'], entry['fingerprint'], entry['state_signature'],
+                  entry['load_bucket'], entry['base_signature'], entry['base_load_bucket'],
+                  json.dumps(entry['plan'], ensure_ascii=False)))
+            conn.commit()
+            return cursor.lastrowid
+    
+    def get_playbook_entry(self, fingerprint: str, state_signature: str, load_bucket: int,
+                           device_name: str = None, device_type: str = None) -> Dict[str, Any]:
+        """按故障后输入的键查找预计算恢复方案（不指定设备时取最近刷新的一条），未找到时返回None"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            sql = """
+                SELECT id, device_name, device_type, plan, refreshed_at FROM recovery_playbook
+                WHERE fingerprint = ? AND state_signature = ? AND load_bucket = ?
+            """
+            params = [fingerprint, state_signature, load_bucket]
+            if device_name is not None:
+                sql += " AND device_name = ? AND device_type = ?"
+                params += [device_name, device_type]
+            cursor.execute(sql + " ORDER BY refreshed_at DESC LIMIT 1", params)
+            result = cursor.fetchone()
+            if not result:
+                return None
+            entry_id, device_name, device_type, plan, refreshed_at = result
+            return {'id': entry_id, 'device_name': device_name, 'device_type': device_type,
+                    'plan': json.loads(plan), 'refreshed_at': refreshed_at}
+    
+    def update_playbook_plan(self, entry_id: int, plan: Dict[str, Any]):
+        """用实时求解结果刷新预计算恢复方案"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE recovery_playbook SET plan = ?, refreshed_at = CURRENT_TIMESTAMP WHERE id = ?
+            """, (json.dumps(plan, ensure_ascii=False), entry_id))
+            conn.commit()
+    
+    def delete_stale_playbook(self, base_signature: str, base_load_bucket: int) -> int:
+        """删除由其他基础配置（负荷外的任一输入或负荷分档不同）生成的预计算方案，返回删除的条数"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                DELETE FROM recovery_playbook WHERE base_signature != ? OR base_load_bucket != ?
+            """, (base_signature, base_load_bucket))
+            conn.commit()
+            return cursor.rowcount
+    
     def create_Mschema(self):
         db_engine = create_engine(f'sqlite:///{self.db_path}')
         schema_engine = SchemaEngine(engine=db_engine)
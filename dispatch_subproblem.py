@@ -0,0 +1,146 @@
+# dispatch_subproblem.py
+"""
+分解求解（Benders）的供区调度子问题：给定主问题的主变归属（即各时段的供区主变负荷）和最小安全裕度，
+求该供区全部时段的调度线性规划，由对偶值生成主问题的最优性割。
+"""
+from pyscipopt import Model, SCIP_PARAMSETTING, quicksum
+
+# 子问题弹性松弛的罚系数：功率缺额、安全裕度不足每单位的代价，使子问题对任意主问题解都可行
+# （罚项非零即表示主问题方案不可行，其割同时起可行性割的作用）
+SLACK_PENALTY = 1e6
+
+
+class ZoneDispatchSubproblem:
+    """
+    单个供区的调度子问题（LP）。变量与约束与 RecoveryModel 中该供区的部分一致，备用机组启停状态松弛为连续变量，
+    另加功率缺额 shortfall[t] 和安全裕度缺额 deficit[t] 两组罚变量：
+        safety[t] - 出力 - 切负荷 - shortfall[t] = 容量 - 固定负荷 + 当前出力 - 主变负荷L[t]
+        safety[t] / 容量 + deficit[t] >= m
+    模型只建一次，每轮迭代 freeTransform 后修改左右端项重新求解。
+    """
+
+    def __init__(self, zone: str, params: dict, dispatch_weight: float):
+        """
+        :param zone: 供区名
+        :param params: 规范化后的优化输入（_normalize_params 的结果）
+        :param dispatch_weight: 目标函数中发电运行成本的系数（切负荷成本系数为1）
+        """
+        self.zone = zone
+        p = params
+        horizon = p["horizon"]
+        z_params = p["zones"][zone]
+        T = range(horizon)
+        w = p["time_weights"] or [1] * horizon
+        units = {key: {name: u for name, u in p[key].items() if u['zone'] == zone}
+                 for key in ("operating_units", "backup_units", "hydro_units", "storage_units", "interruptible_loads")}
+        operating_units, backup_units, hydro_units = units["operating_units"], units["backup_units"], units["hydro_units"]
+        storage_units, interruptible_loads = units["storage_units"], units["interruptible_loads"]
+        self.capacity = z_params['capacity']
+        self.transformers = {t_name: [t['load'][t_step] * t['sensitivity'][zone] for t_step in T]
+                             for t_name, t in p["transformers"].items()}
+
+        model = Model(f"dispatch_{zone}")
+        model.hideOutput()
+        # 对偶值取自LP，关闭预处理和传播以保证约束在LP中原样出现
+        model.setPresolve(SCIP_PARAMSETTING.OFF)
+        model.setHeuristics(SCIP_PARAMSETTING.OFF)
+        model.setSeparating(SCIP_PARAMSETTING.OFF)
+        model.disablePropagation()
+        self.model = model
+        P_opt = {(g, t): model.addVar(lb=0, ub=u['p_max'] - u['p_current']) for g, u in operating_units.items() for t in T}
+        P_bak = {(g, t): model.addVar(lb=0, ub=u['p_max'] if u.get('available', True) and t > 0 else 0)
+                 for g, u in backup_units.items() for t in T}
+        v_start = {(g, t): model.addVar(lb=0, ub=1 if u.get('available', True) else 0) for g, u in backup_units.items() for t in T}
+        v_oper = {(g, t): model.addVar(lb=0, ub=1 if u.get('available', True) and t > 0 else 0)
+                  for g, u in backup_units.items() for t in T}
+        P_hydro = {(g, t): model.addVar(lb=0, ub=u['p_max'] if u.get('available', True) else 0) for g, u in hydro_units.items() for t in T}
+        P_storage = {(es, t): model.addVar(lb=-u['p_charge_max'] - u['p_current'], ub=u['p_discharge_max'] - u['p_current'])
+                     for es, u in storage_units.items() for t in T}
+        SOC = {(es, t): model.addVar(lb=u['soc_min'], ub=u['soc_max']) for es, u in storage_units.items() for t in T}
+        P_shed = {(il, t): model.addVar(lb=0, ub=u['shed_max']) for il, u in interruptible_loads.items() for t in T}
+        safety = {t: model.addVar(lb=0) for t in T}
+        self.shortfall = {t: model.addVar(lb=0) for t in T}
+        self.deficit = {t: model.addVar(lb=0) for t in T}
+        self._outcomes = {}
+
+        for g, u in backup_units.items():
+            for t in T:
+                model.addCons(v_start[g, t] + v_oper[g, t] <= 1)
+                if t >= 1:
+                    model.addCons(v_oper[g, t] >= v_oper[g, t - 1])
+                    model.addCons(v_start[g, t - 1] + v_oper[g, t - 1] == v_oper[g, t])
+                    model.addCons(P_bak[g, t] == u['p_min'] * v_start[g, t - 1] + u['p_max'] * v_oper[g, t - 1])
+        for es, u in storage_units.items():
+            model.addCons(SOC[es, 0] == u['soc_initial'])
+            for t in range(1, horizon):
+                model.addCons(SOC[es, t] == SOC[es, t - 1] - w[t] * P_storage[es, t])
+
+        # 功率平衡与最小安全裕度约束，左右端项随主问题的解变化
+        self.base_rhs = []
+        self.balance, self.min_safety = {}, {}
+        max_ratio = []
+        for t in T:
+            injections = [(u['sensitivity'], P_opt[g, t]) for g, u in operating_units.items()] + \
+                [(u['sensitivity'], P_bak[g, t]) for g, u in backup_units.items()] + \
+                [(u['sensitivity'], P_hydro[g, t]) for g, u in hydro_units.items()] + \
+                [(u['sensitivity'], P_storage[es, t]) for es, u in storage_units.items()] + \
+                [(1, P_shed[il, t]) for il in interruptible_loads]
+            rhs = self.capacity - z_params['fixed_load'][t] + \
+                sum(u['p_current'] * u['sensitivity'] for u in operating_units.values()) + \
+                sum(u['p_current'] * u['sensitivity'] for u in storage_units.values())
+            self.base_rhs.append(rhs)
+            output = quicksum(sens * var for sens, var in injections)
+            self.balance[t] = model.addCons(safety[t] - output - self.shortfall[t] == rhs)
+            self.min_safety[t] = model.addCons(safety[t] / self.capacity + self.deficit[t] >= 0)
+            # 主变负荷为0、出力取上限时的裕度
+            headroom = sum(max(sens * var.getLbOriginal(), sens * var.getUbOriginal()) for sens, var in injections)
+            max_ratio.append((rhs + headroom) / self.capacity)
+        # 供区各时段最大可能裕度的最小值，是主问题中最小安全裕度变量的有效上界
+        self.max_safety_ratio = max(min(max_ratio), 0.0) if max_ratio else 0.0
+
+        t_end = horizon - 1
+        dispatch_cost = quicksum(w[t] * u['cost'] * (P_opt[g, t] + u['p_current']) for g, u in operating_units.items() for t in T) + \
+            quicksum(w[t] * u['cost'] * P_bak[g, t] for g, u in backup_units.items() for t in T) + \
+            quicksum(w[t] * u['cost'] * P_hydro[g, t] for g, u in hydro_units.items() for t in T) + \
+            quicksum(u['startup_cost'] * v_start[g, t_end] for g, u in backup_units.items())
+        shedding_cost = quicksum(w[t] * u['cost'] * P_shed[il, t] for il, u in interruptible_loads.items() for t in T)
+        penalty = quicksum(SLACK_PENALTY * (self.shortfall[t] + self.deficit[t]) for t in T)
+        model.setObjective(dispatch_weight * dispatch_cost + shedding_cost + penalty, "minimize")
+
+    def zone_load(self, assignment: dict) -> list:
+        """主变归属（主变名 -> 取值0~1）下各时段的供区主变负荷"""
+        return [sum(load[t] * assignment[t_name] for t_name, load in self.transformers.items())
+                for t in range(len(self.base_rhs))]
+
+    def solve(self, assignment: dict, min_safety: float) -> dict:
+        """
+        求解子问题并生成最优性割 theta >= value + sum(y_coefs[t] * (y[t] - y_hat[t])) + m_coef * (m - m_hat)
+        :param assignment: 主问题解中归属本供区的主变取值（主变名 -> y[t, zone]）
+        :param min_safety: 主问题解中的最小安全裕度 m
+        :return: {"value", "y_coefs": {主变名: 系数}, "m_coef", "slack": 罚变量之和, "status"}
+        """
+        loads = self.zone_load(assignment)
+        # 与已求解过的输入相同时直接返回（SCIP对未修改的模型重复求解时不再给出有效的对偶值）
+        key = tuple(round(load, 9) for load in loads) + (round(min_safety, 9),)
+        if key in self._outcomes:
+            return self._outcomes[key]
+        model = self.model
+        model.freeTransform()
+        for t, cons in self.balance.items():
+            rhs = self.base_rhs[t] - loads[t]
+            model.chgLhs(cons, rhs)
+            model.chgRhs(cons, rhs)
+            model.chgLhs(self.min_safety[t], min_safety)
+        # 释放GIL，多个供区的子问题可在线程池中并行求解
+        model.optimizeNogil()
+        # 平衡约束右端项为 base - L[t]，L[t] 对 y 的偏导为主变负荷，故 d(value)/dy = -sum(pi[t] * load[t])
+        pi = {t: model.getDualsolLinear(cons) for t, cons in self.balance.items()}
+        mu = {t: model.getDualsolLinear(cons) for t, cons in self.min_safety.items()}
+        self._outcomes[key] = {
+            "value": model.getObjVal(),
+            "y_coefs": {t_name: -sum(pi[t] * load[t] for t in pi) for t_name, load in self.transformers.items()},
+            "m_coef": sum(mu.values()),
+            "slack": sum(model.getVal(var) for var in list(self.shortfall.values()) + list(self.deficit.values())),
+            "status": model.getStatus(),
+        }
+        return self._outcomes[key]
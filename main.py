@@ -5,9 +5,13 @@ from fastapi.responses import StreamingResponse
 from schema import *
 import asyncio,json
 # 从另一个文件导入求解器函数
-from optimization_solver import solve_dynamic_recovery_model
+from optimization_solver import solve_dynamic_recovery_model, solve_all_objectives, solve_heuristic_recovery, solve_with_result_cache
+from result_cache import get_result_cache, get_single_flight
+from contingency import screen_contingencies, screen_n2
+from scenarios import solve_scenarios
+from database import OptimizationDatabase
 # 导入agent执行器
-from agent import agent_executor
+from agent import agent_executor, current_session
 import logging,os
 for key,value in os.environ.items():
     logging.info(f"{key}:{value}") #print to stdout
@@ -21,13 +25,16 @@ from fastapi.staticfiles import StaticFiles
 # --- 数据模型 ---
 class ChatRequest(BaseModel):
     message: str
+    session_id: str = "default"
     
 class ChatResponse(BaseModel):
     response: str
     success: bool
     error: str = None
 
-async def event_stream(agent_executor, agent_input: str):
+async def event_stream(agent_executor, agent_input: str, session_id: str = "default"):
+    # 工具在本请求的上下文中执行，后台获取优化边界等状态按会话区分
+    current_session.set(session_id)
     async for event in agent_executor.astream_events({"input": agent_input},version="v1"):
         kind = event["event"]
         if kind == "on_chat_model_stream":
@@ -80,35 +87,163 @@ async def chat_ui():
     return HTMLResponse(content=html_content, status_code=200)
 
 @app.post("/solve/topology-optimization-with-cost", tags=["Optimization"])
-def run_optimization_with_cost(data: OptimizationInput):
+def run_optimization_with_cost(data: OptimizationInput, bypass_cache: bool = False):
     """
     接收电网参数（包含开关操作成本）并执行拓扑优化。
 
     - **接收**: 一个包含电网所有参数和开关成本的JSON对象。
     - **执行**: 运行PySCIPOpt求解器找到最小化**总操作成本**的方案。
-    - **返回**: 包含优化结果的JSON对象，如开关操作、最终负荷等。
+    - **终止条件**: 可通过 `solver_settings.time_limit / mip_gap / node_limit` 限制求解，到达上限时返回当前最好可行解。
+    - **结果缓存**: 相同输入（含目标和求解器设置）直接返回缓存结果，`solver.result_cache` 给出命中层级；查询参数 `bypass_cache=true` 强制重新求解。
+    - **返回**: 包含优化结果的JSON对象，如开关操作、最终负荷等；`solver` 字段给出终止原因、对偶界和间隙。
     """
     try:
         params = data.model_dump()
-        result = solve_dynamic_recovery_model(**params)
+        result = solve_with_result_cache(bypass_cache=bypass_cache, **params)
 
         if not result:
             raise HTTPException(
                 status_code=422, 
-                detail="求解器未能找到最优解或输入数据有问题。"
+                detail="求解器在给定的时间/节点上限内未找到可行解，或输入数据有问题。"
             )
             
         return result
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"服务器内部错误: {str(e)}")
 
+async def solve_event_stream(params: dict):
+    """在线程池中求解，将求解器回调的每个新可行解和最终结果以SSE事件推送"""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def on_incumbent(summary):
+        loop.call_soon_threadsafe(queue.put_nowait, {"type": "incumbent", "content": summary})
+
+    def solve():
+        try:
+            result = solve_dynamic_recovery_model(**params, on_incumbent=on_incumbent)
+            event = {"type": "result", "content": result} if result else \
+                {"type": "error", "content": "求解器在给定的时间/节点上限内未找到可行解，或输入数据有问题。"}
+        except Exception as e:
+            event = {"type": "error", "content": f"服务器内部错误: {str(e)}"}
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    task = loop.run_in_executor(None, solve)
+    while True:
+        event = await queue.get()
+        yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        if event["type"] in ("result", "error"):
+            break
+    await task
+    yield f"data: {json.dumps({'type': 'stream_end'})}\n\n" # Signal stream end
+
+@app.post("/solve/topology-optimization-with-cost/stream", tags=["Optimization"])
+def run_optimization_with_cost_stream(data: OptimizationInput):
+    """
+    与 /solve/topology-optimization-with-cost 相同的优化，以SSE流式返回求解过程。
+
+    - **incumbent**: 每找到一个更好的可行解推送一次，包含目标值、间隙、开关操作和已用时间
+    - **result**: 最终结果，格式与非流式接口相同
+    - **error**: 未找到可行解或求解出错
+    """
+    if data.solver_settings.backend is not None:
+        raise HTTPException(status_code=422, detail="标准形式求解（solver_settings.backend）不回调新解，请使用非流式接口")
+    return StreamingResponse(solve_event_stream(data.model_dump()), media_type="text/event-stream")
+
+@app.post("/solve/topology-optimization-with-cost/heuristic", tags=["Optimization"])
+def run_heuristic_recovery(data: OptimizationInput):
+    """
+    不求解MIP，用贪心构造启发式快速给出初步恢复方案（通常在1秒内返回）。
+
+    - **返回**: 格式与 /solve/topology-optimization-with-cost 相同；`status` 为 "Heuristic Solution"，
+      `solver.violations` 列出方案不满足的约束（为空时方案可行）。
+    """
+    try:
+        return solve_heuristic_recovery(**data.model_dump())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"服务器内部错误: {str(e)}")
+
+@app.post("/solve/topology-optimization-with-cost/pareto", tags=["Optimization"])
+def run_optimization_all_objectives(data: OptimizationInput):
+    """
+    并行求解全部三个优化目标（最小化开关操作、最大化安全裕度、最小化发电成本），比较各方案。
+
+    - **返回**: `comparison` 各目标方案的指标比较表，`pareto_front` 非支配方案对应的目标，`plans` 各目标的完整结果。
+    """
+    try:
+        return solve_all_objectives(**data.model_dump())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"服务器内部错误: {str(e)}")
+
+@app.post("/solve/scenarios", tags=["Optimization"])
+def run_scenario_batch(data: ScenarioInput, max_workers: int = None):
+    """
+    负荷预测场景批量求解：`scenarios` 以矩阵给出各场景的主变负荷（场景数×主变数×时段数）、供区固定负荷
+    （场景数×供区数×时段数）或负荷倍数（场景数×时段数），各场景并行求解后，固定每个不同的开关方案在全部场景下评估鲁棒性。
+
+    - **max_workers**: 进程数，默认取场景数与CPU核数的较小值
+    - **返回**: `scenarios` 各场景的最优目标值及其方案编号，`plans` 按可行概率、期望目标值排序的方案
+      （可行概率、期望/最差目标值、最大遗憾值、最大切负荷、最小安全裕度及逐场景评估），`recommended` 推荐方案的完整结果。
+    """
+    try:
+        params = data.model_dump()
+        scenarios = params.pop("scenarios")
+        return solve_scenarios(params, max_workers=max_workers, **scenarios)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"服务器内部错误: {str(e)}")
+
+@app.post("/screening/n-1", tags=["Screening"])
+def run_n1_screening(data: OptimizationInput, max_workers: int = None, case_time_limit: float = 30.0):
+    """
+    N-1 预想事故扫描：对基础输入逐一施加单一设备停运（可用的供区线路、主变、母线），在进程池中限时求解全部事故。
+
+    - **max_workers**: 进程数，默认取事故数与CPU核数的较小值
+    - **case_time_limit**: 每个事故的求解时间上限（秒）
+    - **返回**: `cases` 按严重程度排序的扫描表（无解、负荷损失、开关操作、最小安全裕度），
+      `cases_per_minute_per_core` 吞吐量；结果同时写入数据库 `contingency_results` 表，`screening_id` 为批次ID。
+    """
+    try:
+        return screen_contingencies(data.model_dump(), max_workers=max_workers, case_time_limit=case_time_limit,
+                                    db=OptimizationDatabase())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"服务器内部错误: {str(e)}")
+
+@app.post("/screening/n-2", tags=["Screening"])
+def run_n2_screening(data: OptimizationInput, max_workers: int = None, case_time_limit: float = 30.0):
+    """
+    N-2 预想事故扫描：先进行N-1扫描，再枚举其全部两两组合，复用N-1方案剪枝后只求解其余设备对。
+
+    - **max_workers**: 进程数，默认取事故数与CPU核数的较小值
+    - **case_time_limit**: 每个事故的求解时间上限（秒）
+    - **返回**: `cases` 按严重程度排序的扫描表，`screened` 注明处理方式（`pruned` 由N-1方案支配不求解，
+      `certified` N-1方案固定开关状态校验可行，`solved` 完整求解）；`pruned/certified/solved` 为各方式的设备对数，
+      `wall_time` 含N-1扫描；结果写入数据库 `contingency_results` 表，`screening_id` 为批次ID。
+    """
+    try:
+        return screen_n2(data.model_dump(), max_workers=max_workers, case_time_limit=case_time_limit,
+                         db=OptimizationDatabase())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"服务器内部错误: {str(e)}")
+
+@app.get("/solve/cache/stats", tags=["Optimization"])
+def result_cache_stats():
+    """
+    求解结果缓存的命中/未命中计数、命中率和进程内缓存条数，以及并发相同请求的合并情况。
+
+    - **result_cache**: 缓存命中/未命中计数
+    - **coalescing**: `executions` 实际求解次数，`coalesced` 合并到进行中求解的请求数，`in_flight` 当前进行中的求解数
+    """
+    return {"result_cache": get_result_cache().stats(), "coalescing": get_single_flight().stats()}
+
 @app.post("/chat", response_model=ChatResponse, tags=["Chat"])
 def chat_with_agent(request: ChatRequest):
     """
     与智能代理进行对话交互。
     
-    - **接收**: 用户的聊天消息
+    - **接收**: 用户的聊天消息，session_id 区分会话（后台获取优化边界等状态按会话隔离）
     - **处理**: 通过LangChain代理处理用户输入
     - **返回**: 代理的响应结果
     
@@ -119,7 +254,7 @@ def chat_with_agent(request: ChatRequest):
     """
     try:
         # 调用agent执行器处理用户输入
-        return StreamingResponse(event_stream(agent_executor, request.message + "/nothink"), media_type="text/event-stream")
+        return StreamingResponse(event_stream(agent_executor, request.message + "/nothink", request.session_id), media_type="text/event-stream")
         
     except Exception as e:
         return ChatResponse(
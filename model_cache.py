@@ -0,0 +1,137 @@
+# model_cache.py
+"""
+编译后模型的磁盘缓存：同一拓扑结构（topology_fingerprint）的模型写为 CIP/MPS 文件及元数据，
+之后的求解直接读入模型文件并增量修改数值参数，不再在Python中逐条建立变量和约束。
+缓存目录、格式和淘汰策略由环境变量配置：
+    MODEL_CACHE_DIR        缓存目录，默认 .model_cache
+    MODEL_CACHE_FORMAT     cip（默认，SCIP原生格式）或 mps
+    MODEL_CACHE_MAX_BYTES  缓存总大小上限（字节），超过时按最近使用时间淘汰，默认 512MB
+    MODEL_CACHE_MAX_AGE    缓存项最长保留时间（秒），默认 7 天
+"""
+import os
+import pickle
+import threading
+import time
+
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", ".model_cache")
+MODEL_CACHE_FORMAT = os.getenv("MODEL_CACHE_FORMAT", "cip")
+MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+MODEL_CACHE_MAX_AGE = float(os.getenv("MODEL_CACHE_MAX_AGE", 7 * 24 * 3600))
+
+_lock = threading.Lock()
+
+
+def entry_paths(key: str, cache_dir: str = None, fmt: str = None) -> tuple:
+    """缓存项的模型文件和元数据文件路径"""
+    cache_dir = cache_dir or MODEL_CACHE_DIR
+    return os.path.join(cache_dir, f"{key}.{fmt or MODEL_CACHE_FORMAT}"), os.path.join(cache_dir, f"{key}.meta")
+
+
+def load_entry(key: str, cache_dir: str = None, fmt: str = None):
+    """
+    查找缓存项，命中时刷新其最近使用时间
+    :return: (模型文件路径, 元数据)，未命中、已过期或元数据损坏时返回 None
+    """
+    model_path, meta_path = entry_paths(key, cache_dir, fmt)
+    try:
+        if time.time() - os.path.getmtime(meta_path) > MODEL_CACHE_MAX_AGE:
+            remove_entry(key, cache_dir, fmt)
+            return None
+        if not os.path.exists(model_path):
+            return None
+        with open(meta_path, "rb") as f:
+            meta = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    now = time.time()
+    for path in (model_path, meta_path):
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+    return model_path, meta
+
+
+def store_entry(key: str, write_model, cache_dir: str = None, fmt: str = None) -> bool:
+    """
+    写入缓存项：先写临时文件再原子替换，元数据最后写入（元数据存在即表示模型文件完整）
+    :param write_model: write_model(模型文件路径) 写出模型并返回元数据
+    :return: 是否写入成功
+    """
+    cache_dir = cache_dir or MODEL_CACHE_DIR
+    model_path, meta_path = entry_paths(key, cache_dir, fmt)
+    suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    # 临时文件保留模型格式的扩展名，写出时按扩展名确定格式
+    tmp_model = f"{model_path}{suffix}.{fmt or MODEL_CACHE_FORMAT}"
+    tmp_meta = meta_path + suffix
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        meta = write_model(tmp_model)
+        with open(tmp_meta, "wb") as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_model, model_path)
+        os.replace(tmp_meta, meta_path)
+    except (OSError, ValueError) as e:
+        print(f"Model cache write failed: {e}")
+        for path in (tmp_model, tmp_meta):
+            if os.path.exists(path):
+                os.remove(path)
+        return False
+    evict(cache_dir)
+    return True
+
+
+def remove_entry(key: str, cache_dir: str = None, fmt: str = None):
+    for path in entry_paths(key, cache_dir, fmt):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def evict(cache_dir: str = None, max_bytes: int = None, max_age: float = None) -> int:
+    """
+    淘汰缓存项：先删除超过 max_age 未使用的项，再按最近使用时间从旧到新删除，直到总大小不超过 max_bytes
+    :return: 删除的缓存项数量
+    """
+    cache_dir = cache_dir or MODEL_CACHE_DIR
+    max_bytes = MODEL_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    max_age = MODEL_CACHE_MAX_AGE if max_age is None else max_age
+    with _lock:
+        entries = {}
+        try:
+            names = os.listdir(cache_dir)
+        except OSError:
+            return 0
+        for name in names:
+            if ".tmp" in name:
+                continue
+            path = os.path.join(cache_dir, name)
+            key = name.rsplit(".", 1)[0]
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = entries.setdefault(key, {"paths": [], "size": 0, "mtime": 0.0})
+            entry["paths"].append(path)
+            entry["size"] += stat.st_size
+            entry["mtime"] = max(entry["mtime"], stat.st_mtime)
+        now = time.time()
+        total = sum(entry["size"] for entry in entries.values())
+        removed = 0
+        for key, entry in sorted(entries.items(), key=lambda item: item[1]["mtime"]):
+            if now - entry["mtime"] <= max_age and total <= max_bytes:
+                continue
+            for path in entry["paths"]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= entry["size"]
+            removed += 1
+        return removed
+
+
+def clear(cache_dir: str = None) -> int:
+    """清空缓存目录中的全部缓存项"""
+    return evict(cache_dir, max_bytes=0, max_age=0)
@@ -1,431 +1,2217 @@
 # optimization_solver.py
-from pyscipopt import Model, quicksum
-from schema import ObjectiveType, OptimizationInput
+from pyscipopt import Conshdlr, Eventhdlr, Model, SCIP_EVENTTYPE, SCIP_RESULT, quicksum
+from schema import ObjectiveType, OptimizationInput, SolverSettings
 from datetime import datetime, timedelta
-from topology_analysis import build_power_system_graph, get_connected_edges_with_attrs
+from topology_analysis import build_power_system_graph, get_connected_edges_with_attrs, build_incidence_index, reduce_switch_network, zone_reachability, fixed_switch_states, independent_islands
+from recovery_heuristic import greedy_recovery_plan
+from time_aggregation import aggregation_blocks, aggregate_params, expand_result
+from dispatch_subproblem import ZoneDispatchSubproblem
+from standard_form import compile_standard_form
+from solver_backends import get_backend
+import model_cache
+from result_cache import canonical_key, get_result_cache, get_single_flight
+from collections import defaultdict, OrderedDict
+import hashlib
+import numpy as np
+import networkx as nx
 import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-def solve_dynamic_recovery_model(
-    # --- 输入参数 ---
-    horizon: int,
-    # 区域与负荷
-    zones: dict,
-    zone_lines: dict,
-    transformers: dict, # 包含时序负荷和供电成本
-    # 拓扑
-    substation_nodes: list,
-    switches: dict,
-    # 发电与储能
-    operating_units: dict,
-    backup_units: dict, # 包含启动成本
-    hydro_units: dict,
-    storage_units: dict,
-    interruptible_loads: dict,
-    # 优化目标
-    objective: ObjectiveType
-):
+# 模型模板缓存：拓扑结构不变时复用已构建的SCIP模型，仅更新数值参数
+MAX_MODEL_TEMPLATES = 8
+# SCIP在freeTransform后仍保留已提交的部分解（每次求解都交给completesol处理），模板累计提交这么多部分解后重新建模
+MAX_TEMPLATE_PARTIAL_STARTS = 50
+_model_templates = OrderedDict()
+_model_templates_lock = threading.Lock()
+# 每个拓扑最近一次求解得到的解：完整变量取值（按 model.getVars() 顺序）及开关状态，用作下次求解的初始解
+MAX_LAST_SOLUTIONS = 32
+_last_solutions = OrderedDict()
+_last_solutions_lock = threading.Lock()
+# backend="auto" 时各结构（拓扑指纹、目标、目标处理方式）下每个求解引擎最近一次的求解耗时，依次试用各引擎后选最快者
+MAX_BACKEND_TIMINGS = 256
+AUTO_BACKENDS = ("highs", "scip")
+_backend_timings = OrderedDict()
+_backend_timings_lock = threading.Lock()
+
+# 分解求解设置了 time_limit 时为最后固定方案的调度求解预留的时间比例，主问题（Benders割循环）只使用其余时间
+DECOMPOSITION_DISPATCH_SHARE = 0.25
+
+# 建模选项默认值：直接构建 RecoveryModel 时不化简、不剪枝，使用多商品流连通性约束；
+# dispatch 为 False 时只建拓扑与主变归属部分（分解求解的主问题），不含机组出力和供区裕度；
+# cost_scale 为发电运行成本的归一化系数，None 时取本模型机组的最大 cost * p_max（按孤岛拆分求解时统一取全网的值）
+MODEL_OPTIONS = {"reduce_topology": False, "prune_unreachable": False, "formulation": "multi_commodity", "strengthen": False,
+                 "dispatch": True, "cost_scale": None}
+
+# 加权目标中次要目标的权重
+SECONDARY_OBJECTIVE_WEIGHT = 1e-4
+
+# 加强建模时标号一致性不等式枚举的路径最大边数
+LABEL_PATH_DEPTH = 4
+
+# 写入模型文件时需要恢复的变量字典（RecoveryModel 的属性名）
+CACHED_VARIABLES = ("is_energized_by", "S", "ops_sw", "y", "f", "P_opt", "P_bak", "P_hydro", "v_bak_startup", "v_bak_operating",
+                    "P_storage", "SOC", "P_shed", "safety_region")
+
+UNIT_KEYS = ("operating_units", "backup_units", "hydro_units", "storage_units", "interruptible_loads")
+# time_weights：各时段代表的原始时段数（时段聚合后的加权块），缺省为1
+INPUT_KEYS = ("horizon", "zones", "zone_lines", "transformers", "substation_nodes", "switches", "objective", "time_weights") + UNIT_KEYS
+
+
+class IncumbentEventHandler(Eventhdlr):
+    """SCIP事件处理器：每找到一个新的最好解，就把其摘要交给回调函数（callback 为 None 时不做任何事）"""
+
+    def __init__(self, recovery_model):
+        self.recovery_model = recovery_model
+        self.callback = None
+
+    def eventinit(self):
+        self.model.catchEvent(SCIP_EVENTTYPE.BESTSOLFOUND, self)
+
+    def eventexit(self):
+        self.model.dropEvent(SCIP_EVENTTYPE.BESTSOLFOUND, self)
+
+    def eventexec(self, event):
+        if self.callback is not None:
+            self.callback(self.recovery_model.incumbent_summary(self.model.getBestSol()))
+
+
+class ConnectivityConshdlr(Conshdlr):
     """
-    求解一个完整的多层级、基于连通性推断的电网负荷转移优化问题。
-    此函数接收所有参数（包括开关成本），并返回一个包含结果的字典。
+    延迟连通性约束（lazy_cuts 建模方式）：模型中不含流量变量，候选解的开关状态下若某供区无法通过闭合开关
+    向其归属主变供电（按多商品流的边容量求最大流），则按最小割添加割集不等式
+        sum(y[t, z], t在割的另一侧) <= sum(容量 * S, 割边；边上有并联组时取该组的闭合变量)
+    该不等式对多商品流模型的每个可行解成立，因此两种建模方式的可行开关方案相同。
+    """
+
+    def __init__(self, recovery_model):
+        self.recovery_model = recovery_model
+        self.ncuts = 0
+        self._transformed = []
+
+    def find_cuts(self, sol=None, tolerance: float = 1e-6) -> list:
+        """返回被 sol（None 为当前LP/伪解）违反的割集不等式，每项为 (主变y变量列表, [(容量, 开关S变量或并联组闭合变量)])"""
+        rm = self.recovery_model
+        model = self.model
+        connectivity = rm.connectivity
+        cuts = []
+        for z_name, nodes in connectivity["zone_nodes"].items():
+            zone_capacity = connectivity["zone_capacity"][z_name]
+            demand = {}
+            for t_name, conn in connectivity["transformer_nodes"].items():
+                y_value = model.getSolVal(sol, rm.y[t_name, z_name])
+                if y_value > tolerance and conn in nodes:
+                    demand[t_name] = y_value
+                elif y_value > tolerance:
+                    # 连接点不在供区可达范围内：y[t, z] 只能为0
+                    cuts.append(([rm.y[t_name, z_name]], []))
+            if not demand:
+                continue
+            graph = nx.DiGraph()
+            graph.add_nodes_from(nodes)
+            for (u, v), (capacity, edge_closed) in connectivity["edges"].items():
+                if u in nodes and v in nodes:
+                    capacity = min(capacity, zone_capacity)
+                    # 割集不等式中每条边取当前取值最小的并联组闭合变量（单台开关即其状态变量）
+                    values = [model.getSolVal(sol, var) for var in edge_closed]
+                    i = min(range(len(values)), key=values.__getitem__)
+                    cap = capacity * max(values[i], 0.0)
+                    graph.add_edge(u, v, capacity=cap, closed=edge_closed[i], unit=capacity)
+                    graph.add_edge(v, u, capacity=cap, closed=edge_closed[i], unit=capacity)
+            for conn, zone in connectivity["zone_line_edges"]:
+                if conn in nodes and zone in nodes:
+                    graph.add_edge(conn, zone)
+                    graph.add_edge(zone, conn)
+            sink = ("sink",)
+            for t_name, y_value in demand.items():
+                conn = connectivity["transformer_nodes"][t_name]
+                if graph.has_edge(conn, sink):
+                    graph[conn][sink]["capacity"] += y_value
+                else:
+                    graph.add_edge(conn, sink, capacity=y_value)
+            cut_value, (source_side, _) = nx.minimum_cut(graph, z_name, sink)
+            if sum(demand.values()) - cut_value <= tolerance:
+                continue
+            lhs = [rm.y[t_name, z_name] for t_name, conn in connectivity["transformer_nodes"].items()
+                   if conn in nodes and conn not in source_side]
+            rhs = [(data["unit"], data["closed"]) for u, v, data in graph.edges(data=True)
+                   if u in source_side and v not in source_side and v != sink]
+            cuts.append((lhs, rhs))
+        return cuts
+
+    def _enforce(self, sol=None):
+        cuts = self.find_cuts(sol)
+        for lhs, rhs in cuts:
+            self.model.addCons(quicksum(lhs) <= quicksum(coef * var for coef, var in rhs),
+                               name=f"connectivity_cut_{self.ncuts}", removable=False)
+            self.ncuts += 1
+        return {"result": SCIP_RESULT.CONSADDED if cuts else SCIP_RESULT.FEASIBLE}
+
+    def consenfolp(self, constraints, nusefulconss, solinfeasible):
+        return self._enforce()
+
+    def consenfops(self, constraints, nusefulconss, solinfeasible, objinfeasible):
+        return self._enforce()
+
+    def conscheck(self, constraints, solution, checkintegrality, checklprows, printreason, completely):
+        return {"result": SCIP_RESULT.INFEASIBLE if self.find_cuts(solution) else SCIP_RESULT.FEASIBLE}
+
+    def constrans(self, sourceconstraint):
+        # 变换约束沿用原约束对象，删除变换约束时 PySCIPOpt 会减少其引用计数，这里补一个引用，
+        # 保证模板模型 freeTransform 后再次求解时原约束仍有效
+        self._transformed.append(sourceconstraint)
+        return {}
+
+    def conslock(self, constraint, locktype, nlockspos, nlocksneg):
+        # 开关断开、主变归属增加都可能破坏连通性
+        for var in self.recovery_model.S.values():
+            self.model.addVarLocks(var, nlockspos, nlocksneg)
+        for var in self.recovery_model.y.values():
+            self.model.addVarLocks(var, nlocksneg, nlockspos)
+
+
+class BendersConshdlr(Conshdlr):
+    """
+    分解求解主问题中的Benders最优性割（分支定界过程中按需添加，与 ConnectivityConshdlr 相同的延迟约束方式）：
+    候选解的主变归属 y 和最小安全裕度 m 下并行求解各供区调度子问题，子问题值 value 超过 theta[z] 时添加
+        theta[z] >= value + sum(y_coef * (y[t, z] - y_hat)) + m_coef * (m - m_hat)
+    主问题只需求解一次，不必每加一轮割重新求解。
+    """
+
+    def __init__(self, recovery_model, subproblems: dict, theta: dict, pool, tolerance: float):
+        self.recovery_model = recovery_model
+        self.subproblems = subproblems
+        self.theta = theta
+        self.pool = pool
+        self.tolerance = tolerance
+        self.ncuts = 0
+        self.evaluations = 0
+        self.subproblem_time = 0.0
+        self._transformed = []
+
+    def evaluate(self, sol=None) -> tuple:
+        """并行求解候选解对应的各供区子问题，返回 ({供区: 子问题结果}, y_hat, m_hat)"""
+        rm, model = self.recovery_model, self.model
+        transformers = rm.params["transformers"]
+        y_hat = {key: model.getSolVal(sol, var) for key, var in rm.y.items()}
+        m_hat = model.getSolVal(sol, rm.min_safety_region)
+        start = time.perf_counter()
+        outcomes = self.pool.map(
+            lambda z_name: self.subproblems[z_name].solve({t_name: y_hat[t_name, z_name] for t_name in transformers}, m_hat),
+            self.subproblems)
+        self.subproblem_time += time.perf_counter() - start
+        self.evaluations += 1
+        return dict(zip(self.subproblems, outcomes)), y_hat, m_hat
+
+    def find_cuts(self, sol=None) -> list:
+        """返回被 sol 违反的割：[(供区, 子问题结果, y_hat, m_hat)]"""
+        outcomes, y_hat, m_hat = self.evaluate(sol)
+        cuts = []
+        for z_name, outcome in outcomes.items():
+            theta_value = self.model.getSolVal(sol, self.theta[z_name])
+            if outcome["value"] - theta_value > self.tolerance * max(1.0, abs(outcome["value"])):
+                cuts.append((z_name, outcome, y_hat, m_hat))
+        return cuts
+
+    def _enforce(self, sol=None):
+        rm = self.recovery_model
+        cuts = self.find_cuts(sol)
+        for z_name, outcome, y_hat, m_hat in cuts:
+            self.model.addCons(
+                self.theta[z_name] >= outcome["value"] + outcome["m_coef"] * (rm.min_safety_region - m_hat) + quicksum(
+                    coef * (rm.y[t_name, z_name] - y_hat[t_name, z_name]) for t_name, coef in outcome["y_coefs"].items()),
+                name=f"benders_cut_{self.ncuts}", removable=False)
+            self.ncuts += 1
+        return {"result": SCIP_RESULT.CONSADDED if cuts else SCIP_RESULT.FEASIBLE}
+
+    def consenfolp(self, constraints, nusefulconss, solinfeasible):
+        return self._enforce()
+
+    def consenfops(self, constraints, nusefulconss, solinfeasible, objinfeasible):
+        return self._enforce()
+
+    def conscheck(self, constraints, solution, checkintegrality, checklprows, printreason, completely):
+        return {"result": SCIP_RESULT.INFEASIBLE if self.find_cuts(solution) else SCIP_RESULT.FEASIBLE}
+
+    def constrans(self, sourceconstraint):
+        self._transformed.append(sourceconstraint)
+        return {}
+
+    def conslock(self, constraint, locktype, nlockspos, nlocksneg):
+        # 割中 y 和 m 的系数可正可负，theta 减小可能违反割
+        rm = self.recovery_model
+        for var in list(rm.y.values()) + [rm.min_safety_region]:
+            self.model.addVarLocks(var, nlockspos + nlocksneg, nlockspos + nlocksneg)
+        for var in self.theta.values():
+            self.model.addVarLocks(var, nlockspos, nlocksneg)
+
+
+def _normalize_params(params: dict) -> dict:
+    """只保留模型输入字段，并将缺省的设备字典补全为空字典"""
+    normalized = {key: params.get(key) for key in INPUT_KEYS}
+    for key in UNIT_KEYS:
+        normalized[key] = normalized[key] or {}
+    return normalized
+
+
+def model_options(settings: SolverSettings) -> dict:
+    """求解器设置中影响模型结构的选项"""
+    return {
+        "reduce_topology": settings.topology_reduction,
+        "prune_unreachable": settings.reachability_pruning,
+        "formulation": settings.connectivity_formulation,
+        "strengthen": settings.strengthened_formulation,
+    }
+
+
+def topology_fingerprint(params: dict, options: dict = None) -> str:
+    """
+    计算模型结构指纹：只包含决定变量/约束结构的输入（开关、节点、供区、联络线、设备归属、时段数），
+    可用性、负荷、出力上下限、成本等数值参数不参与计算。
+    非默认的建模选项计入指纹；拓扑化简/可达性剪枝/加强建模时网络结构或系数取决于固定状态的开关，此时固定开关及其状态也计入指纹。
+    """
+    structure = {
+        "horizon": params["horizon"],
+        "zones": list(params["zones"].keys()),
+        "substation_nodes": list(params["substation_nodes"]),
+        "switches": [(name, list(sw["nodes"]), sw.get("switch_type", "switch")) for name, sw in params["switches"].items()],
+        "zone_lines": [(name, line["zone"], line["conn_node"]) for name, line in params["zone_lines"].items()],
+        "transformers": [(name, t["conn_node"]) for name, t in params["transformers"].items()],
+    }
+    for key in UNIT_KEYS:
+        structure[key] = [(name, p["zone"]) for name, p in (params.get(key) or {}).items()]
+    options = dict(MODEL_OPTIONS, **(options or {}))
+    if options != MODEL_OPTIONS:
+        structure["options"] = options
+    if options["reduce_topology"] or options["prune_unreachable"] or options["strengthen"]:
+        structure["fixed_switches"] = sorted(fixed_switch_states(params).items())
+    return hashlib.sha256(json.dumps(structure, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def lexicographic_bound(value: float, tolerance: float, objective) -> float:
+    """
+    分层求解时上一层目标值加容差后的上界。安全裕度为比值（通常远小于1），按纯相对容差；
+    开关操作成本、发电成本至少放宽 tolerance，避免目标值为0时不留余量
+    """
+    scale = abs(value) if ObjectiveType(objective) == ObjectiveType.MAX_SAFETY_REGION else max(1.0, abs(value))
+    return value + tolerance * scale
+
+
+class RecoveryModel:
+    """
+    负荷转移优化的SCIP模型。
+
+    模型结构（变量、连通性约束）只由拓扑决定；可用性、负荷、出力上下限、成本等数值参数
+    统一由 _parameters 计算，并以变量上下界、约束左右端项、约束系数和目标函数的形式写入模型。
+    update() 在 freeTransform 之后仅对发生变化的部分调用 chgVarLb/chgVarUb/chgLhs/chgRhs/chgCoefLinear，
+    从而在配置修改后无需重建模型即可重新求解。
     """
-    # # print all input
-    # print("horizon: ", horizon)
-    # print("zones: ", zones)
-    # print("zone_lines: ", zone_lines)
-    # print("transformers: ", transformers)
-    # print("substation_nodes: ", substation_nodes)
-    # print("switches: ", switches)
-    # print("operating_units: ", operating_units)
-    # print("backup_units: ", backup_units)
-    # print("hydro_units: ", hydro_units)
-    # print("storage_units: ", storage_units)
-    # print("interruptible_loads: ", interruptible_loads)
-    # print("objective: ", objective)
-    model = Model("Hybrid_Connectivity_Inference_Transfer_With_Cost")
-
-    # 参数和变量创建部分保持不变...
+
+    def __init__(self, options: dict = None, **params):
+        self._setup(options, params)
+        self._build()
+
+    def _setup(self, options: dict, params: dict):
+        self.params = _normalize_params(params)
+        self.options = dict(MODEL_OPTIONS, **(options or {}))
+        self.reduce_topology = self.options["reduce_topology"]
+        self.prune_unreachable = self.options["prune_unreachable"]
+        self.formulation = self.options["formulation"]
+        self.strengthen = self.options["strengthen"]
+        self.dispatch = self.options["dispatch"]
+        self.fingerprint = topology_fingerprint(self.params, self.options)
+        self.lock = threading.Lock()
+        self.model = Model("Hybrid_Connectivity_Inference_Transfer_With_Cost")
+        self._bounds = {}
+        self._rows = {}
+        self._row_data = {}
+        self._warm_start = None
+        # 已提交的部分解数：SCIP在freeTransform后仍保留部分解，总数受 limits/maxorigsol 限制
+        self._partial_starts = 0
+        self._incumbent_handler = None
+        # 分层求解时添加的目标约束及各层求解信息
+        self._lexicographic_conss = []
+        self._lexicographic_stages = None
+
     # =================================================================================
-    # 1. 参数定义
+    # 模型构建
     # =================================================================================
-    C = len(transformers)
-    M = C + 1
-    # 从新的Switch类结构中提取信息
-    initial_sw_states = {name: sw["initial_state"] for name, sw in switches.items()}
-    switch_costs = {name: sw["cost"] for name, sw in switches.items()}
-    switch_availability = {name: sw.get("available", True) for name, sw in switches.items()}
+    def _build(self):
+        model = self.model
+        p = self.params
+        horizon, zones, zone_lines, transformers = p["horizon"], p["zones"], p["zone_lines"], p["transformers"]
+        substation_nodes, switches = p["substation_nodes"], p["switches"]
+        operating_units, backup_units, hydro_units = p["operating_units"], p["backup_units"], p["hydro_units"]
+        storage_units, interruptible_loads = p["storage_units"], p["interruptible_loads"]
+
+        # 1. 参数定义
+        C = len(transformers)
+        M = C + 1
+        # 节点-开关关联索引（开关耦合约束用），及流量/分区标号所在的网络（可按固定开关化简）
+        index = build_incidence_index(substation_nodes, zones, zone_lines, switches, transformers)
+        self.index = index
+        node_switches = index["node_switches"]
+        fixed_states = fixed_switch_states(p)
+        network = reduce_switch_network(substation_nodes, zones, zone_lines, switches, transformers,
+                                        fixed_states if self.reduce_topology else None)
+        self.network = network
+        # 各供区的流量变量只建在其可达节点及供区节点上（不剪枝时为全部节点）
+        if self.prune_unreachable:
+            self.reachability = zone_reachability(network, zone_lines, transformers, fixed_states)
+            zone_nodes = {z_name: self.reachability["zone_nodes"].get(z_name, set()) | {z_name} for z_name in zones}
+        else:
+            self.reachability = None
+            zone_nodes = {z_name: set(network["flow_nodes"]) for z_name in zones}
+        # 流量上界：每个供区最多向其可达的主变供电（加强建模时按可达性计算，否则为主变总数）
+        if self.strengthen:
+            reachability = self.reachability or zone_reachability(network, zone_lines, transformers, fixed_states)
+            transformer_zones = reachability["transformer_zones"]
+            zone_capacity = {z_name: sum(z_name in transformer_zones[t_name] for t_name in transformers) for z_name in zones}
+            commodity_capacity = {None: sum(bool(transformer_zones[t_name]) for t_name in transformers)}
+            commodity_capacity.update(zone_capacity)
+        else:
+            zone_capacity = {z_name: C for z_name in zones}
+            commodity_capacity = {None: C}
+            commodity_capacity.update(zone_capacity)
+        # 流量商品：多商品流每个供区一种；单商品流只有一种（键为None），由分区标号区分来自哪个供区；
+        # 延迟割方式不建流量变量，由 ConnectivityConshdlr 检查连通性
+        if self.formulation == "single_commodity":
+            commodities = [None]
+            commodity_nodes = {None: set().union(*zone_nodes.values())}
+        elif self.formulation == "lazy_cuts":
+            commodities = []
+            commodity_nodes = {}
+        else:
+            commodities = list(zones)
+            commodity_nodes = zone_nodes
+
+        def commodity_zones(k):
+            return list(zones) if k is None else [k]
+        node_map = network["node_map"]
+        directed_edges = network["directed_edges"]
+        in_edges = network["in_edges"]
+        out_edges = network["out_edges"]
+        node_transformers = network["node_transformers"]
+        if self.reduce_topology:
+            print(f"Topology reduction: {network['stats']}")
+        # 各供区内的机组/负荷
+        self.zone_units = {}
+        for key in UNIT_KEYS:
+            by_zone = defaultdict(list)
+            for name, unit in p[key].items():
+                by_zone[unit['zone']].append(name)
+            self.zone_units[key] = by_zone
+
+        # 2. 变量创建（数值上下界由 _parameters 给出）
+        # 参数化变量以元组为键登记在 self.vars 中，如 ("S", 开关名)、("P_opt", 机组名, 时段)
+        values = self._parameters(p)
+        bounds = values["bounds"]
+        self.vars = {}
+
+        def add_var(key, vtype, lb=0, ub=None):
+            lb, ub = bounds.get(key, (lb, ub))
+            var = model.addVar(vtype=vtype, lb=lb, ub=ub, name="_".join(str(k) for k in key))
+            self.vars[key] = var
+            self._bounds[key] = (lb, ub)
+            return var
+
+        T = range(horizon) if self.dispatch else range(0)
+        # 分区标号取值为供区序号；加强建模时上界取最大序号，标号差的大M随之减小
+        label_ub = max(len(zones) - 1, 0) if self.strengthen else len(zones)
+        self.is_energized_by = {n: model.addVar(vtype="I", lb=0, ub=label_ub, name=f"is_energized_by_{n}") for n in network["nodes"]}
+        self.S = {name: add_var(("S", name), "B", 0, 1) for name in switches}
+        self.ops_sw = {name: model.addVar(vtype="B", name=f"op_sw_{name}") for name in switches}
+        self.y = {(t_name, z_name): add_var(("y", t_name, z_name), "B", 0, 1) for t_name in transformers for z_name in zones}
+        self.f = {(u, v, k): model.addVar(vtype="C", lb=0, name=f"f_{u}_{v}" if k is None else f"f_{u}_{v}_{k}")
+                  for u, v in directed_edges for k in commodities if u in commodity_nodes[k] and v in commodity_nodes[k]}
+        if self.prune_unreachable:
+            self.reachability["stats"] = {
+                "flow_variables": len(self.f), "unpruned_flow_variables": len(directed_edges) * len(commodities),
+                "transformer_zone_pairs": sum(len(z) for z in self.reachability["transformer_zones"].values()),
+                "unpruned_transformer_zone_pairs": len(transformers) * len(zones)}
+            print(f"Reachability pruning: {self.reachability['stats']}")
+        # 发电出力变量
+        self.P_opt = {(g, t): add_var(("P_opt", g, t), "C") for g in operating_units for t in T}
+        self.P_bak = {(g, t): add_var(("P_bak", g, t), "C") for g in backup_units for t in T}
+        self.P_hydro = {(g, t): add_var(("P_hydro", g, t), "C") for g in hydro_units for t in T}
+        # 备用机组运行状态决策变量
+        self.v_bak_startup = {(g, t): add_var(("v_bak_startup", g, t), "B", 0, 1) for g in backup_units for t in T}
+        self.v_bak_operating = {(g, t): add_var(("v_bak_operating", g, t), "B", 0, 1) for g in backup_units for t in T}
+        # 储能变量 (简化为单功率变量)
+        self.P_storage = {(es, t): add_var(("P_storage", es, t), "C") for es in storage_units for t in T}
+        self.SOC = {(es, t): add_var(("SOC", es, t), "C") for es in storage_units for t in T}
+        # 可中断负荷
+        self.P_shed = {(il, t): add_var(("P_shed", il, t), "C") for il in interruptible_loads for t in T}
+        # 供区容量裕度
+        self.safety_region = {(name, t): model.addVar(vtype="C", lb=0, name=f"safety_region_{name}_{t}") for name in zones for t in T}
+        self.min_safety_region = model.addVar(vtype="C", name="min_safety_region")
+        self.vars[("min_safety_region",)] = self.min_safety_region
+        for key, var in self.ops_sw.items():
+            self.vars[("op_sw", key)] = var
+        for key, var in self.safety_region.items():
+            self.vars[("safety_region",) + key] = var
+        S, f, y, is_energized_by = self.S, self.f, self.y, self.is_energized_by
+        # 化简后网络中的并联组（两端代表节点相同的多台开关）：组闭合变量 closed 取组内开关状态的“或”，
+        # S_i <= closed <= sum(S_i)；单台开关的组直接用其状态变量
+        self.group_closed = {}
+        for groups in network["edges"].values():
+            for group in groups:
+                if len(group) == 1:
+                    self.group_closed[group] = S[group[0]]
+                    continue
+                closed = model.addVar(vtype="C", lb=0, ub=1, name="closed_" + "_".join(group))
+                self.group_closed[group] = closed
+                model.addCons(closed <= quicksum(S[s_name] for s_name in group))
+                for s_name in group:
+                    model.addCons(closed >= S[s_name])
+        group_closed = self.group_closed
+
+        # 3. 结构约束（仅依赖拓扑）
+        # a) 流量-开关关联约束（串联合并的边上每个并联组都需闭合）
+        for (u, v), groups in network["edges"].items():
+            # 加强建模时联络线的容量上限1.5同时作为开关耦合的系数
+            limit = 1.5 if self.strengthen and (u, v) in network["limited_edges"] else C
+            for group in groups:
+                for k in commodities:
+                    if (u, v, k) in f:
+                        model.addCons(f[u, v, k] + f[v, u, k] <= min(commodity_capacity[k], limit) * group_closed[group])
+        for u, v in network["limited_edges"]: #单条联络线不能带2变
+            for k in commodities:
+                if (u, v, k) in f:
+                    model.addCons(f[u, v, k] + f[v, u, k] <= 1.5)
+        # b) 流量守恒约束
+        for n in network["flow_nodes"]:
+            for k in commodities:
+                if n not in commodity_nodes[k]:
+                    continue
+                in_flow = quicksum(f[a, b, k] for a, b in in_edges[n] if (a, b, k) in f)
+                out_flow = quicksum(f[a, b, k] for a, b in out_edges[n] if (a, b, k) in f)
+                supply, demand = 0, 0
+                if n in zones and n in commodity_zones(k):
+                    supply += quicksum(y[t, n] for t in transformers)
+                for t_name in node_transformers[n]:
+                    demand += quicksum(y[t_name, z_name] for z_name in commodity_zones(k))
+                model.addCons(out_flow - in_flow == supply - demand)
+        # c) 连通性约束（多商品流时主变不可达的供区没有流入流量，此约束即 y <= 0）
+        for t_name in transformers:
+            t_conn_node = node_map[transformers[t_name]['conn_node']]
+            for k in commodities:
+                in_flow_to_t = quicksum(f[a, b, k] for a, b in in_edges[t_conn_node] if (a, b, k) in f)
+                model.addCons(in_flow_to_t >= quicksum(y[t_name, z_name] for z_name in commodity_zones(k)))
+        if self.formulation in ("single_commodity", "lazy_cuts"):
+            # 单商品流/延迟割：主变归属的供区与其连接点的分区标号一致，闭合路径上标号相同，
+            # 因此流入主变的流量只能来自其归属供区
+            zone_idx = {zone: idx for idx, zone in enumerate(zones.keys())}
+            L = label_ub
+            for t_name in transformers:
+                t_conn_node = node_map[transformers[t_name]['conn_node']]
+                assigned = quicksum(y[t_name, z_name] for z_name in zones)
+                label = quicksum(zone_idx[z_name] * y[t_name, z_name] for z_name in zones)
+                model.addCons(is_energized_by[t_conn_node] - label <= L * (1 - assigned))
+                model.addCons(is_energized_by[t_conn_node] - label >= - L * (1 - assigned))
+                if self.prune_unreachable:
+                    for z_name in zones:
+                        if z_name not in self.reachability["transformer_zones"][t_name]:
+                            model.addCons(y[t_name, z_name] <= 0)
+        if self.formulation == "lazy_cuts":
+            self.connectivity = {
+                "zone_nodes": zone_nodes,
+                "edges": {key: (1.5 if key in network["limited_edges"] else C, [group_closed[group] for group in groups])
+                          for key, groups in network["edges"].items()},
+                "zone_capacity": zone_capacity,
+                "zone_line_edges": {(node_map[line['conn_node']], line['zone']) for line in zone_lines.values()},
+                "transformer_nodes": {t_name: node_map[t['conn_node']] for t_name, t in transformers.items()},
+            }
+            self.connectivity_conshdlr = ConnectivityConshdlr(self)
+            model.includeConshdlr(self.connectivity_conshdlr, "connectivity", "lazy transformer-zone connectivity cuts",
+                                  enfopriority=1, chckpriority=-1)
+            model.addPyCons(model.createCons(self.connectivity_conshdlr, "connectivity"))
+        # d) 分区解环运行约束
+        zone_idx = {zone: idx for idx, zone in enumerate(zones.keys())}
+        for line_name, line_params in zone_lines.items():
+            if line_params['zone'] in zone_idx:
+                model.addCons(is_energized_by[node_map[line_params['conn_node']]] == zone_idx[line_params['zone']])
+        # 供区线路连接点的标号固定，加强建模时每条边的大M取两端标号范围之差
+        fixed_labels = {node_map[line_params['conn_node']]: zone_idx[line_params['zone']]
+                        for line_params in zone_lines.values() if line_params['zone'] in zone_idx}
+
+        def label_range(n):
+            return (fixed_labels[n], fixed_labels[n]) if n in fixed_labels else (0, label_ub)
+        for (u, v), groups in network["edges"].items():
+            # 边上所有并联组闭合时两端属于同一分区
+            open_count = quicksum(1 - group_closed[group] for group in groups)
+            if self.strengthen:
+                (u_lo, u_hi), (v_lo, v_hi) = label_range(u), label_range(v)
+                if u_hi - v_lo > 0:
+                    model.addCons(is_energized_by[u] - is_energized_by[v] <= (u_hi - v_lo) * open_count)
+                if v_hi - u_lo > 0:
+                    model.addCons(is_energized_by[v] - is_energized_by[u] <= (v_hi - u_lo) * open_count)
+            else:
+                model.addCons(is_energized_by[u] - is_energized_by[v] <= M * open_count)
+                model.addCons(is_energized_by[u] - is_energized_by[v] >= - M * open_count)
+        if self.strengthen:
+            self._add_valid_inequalities(network, fixed_labels, transformers)
+        # f) 备用机组启动延迟约束,启动一小时后并网，并网一小时后带满，开机之后不停机
+        for g in backup_units:
+            for t in T:
+                model.addCons(self.v_bak_startup[g, t] + self.v_bak_operating[g, t] <= 1)
+                if t >= 1:
+                    model.addCons(self.v_bak_operating[g, t] >= self.v_bak_operating[g, t - 1])
+                    model.addCons(self.v_bak_startup[g, t - 1] + self.v_bak_operating[g, t - 1] == self.v_bak_operating[g, t])
+        # h) 隔离开关-断路器耦合约束
+        for s_name, sw in switches.items():
+            if sw['switch_type'] == 'breaker':
+                u, v = sw["nodes"]
+                # 通过节点索引找到与此breaker相连的所有switch
+                connected_switches_on_u = [other_name for other_name in node_switches[u]
+                                           if other_name != s_name and switches[other_name]['switch_type'] == 'switch']
+                on_u = set(connected_switches_on_u)
+                connected_switches_on_v = [other_name for other_name in node_switches[v]
+                                           if other_name != s_name and switches[other_name]['switch_type'] == 'switch' and other_name not in on_u]
+                # 添加约束条件, 确保最终状态在运行、热备用、冷备用三者之间
+                if connected_switches_on_u:
+                    model.addCons(quicksum(S[sw_name] for sw_name in connected_switches_on_u) >= S[s_name])
+                if connected_switches_on_v:
+                    model.addCons(quicksum(S[sw_name] for sw_name in connected_switches_on_v) >= S[s_name])
+
+        # 4. 参数化约束（系数和左右端项由 _parameters 给出）
+        for key, row in values["rows"].items():
+            self._add_row(key, row)
+        self._set_objective(p)
+
+    def _add_valid_inequalities(self, network: dict, fixed_labels: dict, transformers: dict):
+        """
+        加强建模的有效不等式（对原模型的每个整数可行解成立，只收紧LP松弛）：
+        1) 标号一致性：两个不同供区的连接点之间的短路径上，并联组不能全部闭合；
+        2) 主变接入：主变连接点不是供区连接点时，主变被分配则至少一条相邻边闭合，
+           sum(y[t, z]) <= sum(S, 相邻边)，是流量-开关耦合约束 f <= C * S 的加强形式。
+        """
+        model, y, group_closed = self.model, self.y, self.group_closed
+        adjacency = defaultdict(list)
+        for (u, v), groups in network["edges"].items():
+            adjacency[u].append((v, groups))
+            adjacency[v].append((u, groups))
+        # 从每个连接点出发搜索不超过 LABEL_PATH_DEPTH 条边、不经过其他连接点的简单路径
+        paths = set()
+        for start, label in fixed_labels.items():
+            stack = [(start, (start,), frozenset())]
+            while stack:
+                node, visited, path = stack.pop()
+                for neighbor, groups in adjacency[node]:
+                    if neighbor in visited:
+                        continue
+                    extended = path | frozenset(groups)
+                    if neighbor in fixed_labels:
+                        if fixed_labels[neighbor] != label:
+                            paths.add(extended)
+                    elif len(visited) < LABEL_PATH_DEPTH:
+                        stack.append((neighbor, visited + (neighbor,), extended))
+        for path in paths:
+            model.addCons(quicksum(group_closed[group] for group in path) <= len(path) - 1)
+        # 初始闭合开关连成的区段（不含供区连接点），区段内主变失电时需经区段边界的某条边恢复供电
+        switches = self.params["switches"]
+
+        def initially_closed(group):
+            return any(switches[s_name]["initial_state"] for s_name in group)
+        closed = defaultdict(list)
+        for (u, v), groups in network["edges"].items():
+            if all(initially_closed(group) for group in groups):
+                closed[u].append(v)
+                closed[v].append(u)
+        connections = 0
+        for t_name, t in transformers.items():
+            conn = network["node_map"][t['conn_node']]
+            if conn in fixed_labels or conn not in network["flow_nodes"]:
+                continue
+            section, stack = {conn}, [conn]
+            while stack and section is not None:
+                for neighbor in closed[stack.pop()]:
+                    if neighbor in fixed_labels:
+                        section = None
+                        break
+                    if neighbor not in section:
+                        section.add(neighbor)
+                        stack.append(neighbor)
+            cut_sets = [{conn}] if section in (None, {conn}) else [{conn}, section]
+            for nodes in cut_sets:
+                # 边界边上取一个并联组即可（边闭合要求每个组闭合），优先取初始断开的组
+                boundary = [min(groups, key=initially_closed)
+                            for node in nodes for neighbor, groups in adjacency[node] if neighbor not in nodes]
+                model.addCons(quicksum(y[t_name, z_name] for z_name in self.params["zones"])
+                              <= quicksum(group_closed[group] for group in boundary))
+                connections += 1
+        self.valid_inequalities = {"label_paths": len(paths), "transformer_connections": connections}
+
+    def _add_row(self, key, row):
+        inf = self.model.infinity()
+        lhs = -inf if row["lhs"] is None else row["lhs"]
+        rhs = inf if row["rhs"] is None else row["rhs"]
+        expr = quicksum(coef * self.vars[var_key] for var_key, coef in row["coefs"].items())
+        name = "_".join(str(k) for k in key)
+        cons = self.model.addCons(expr <= rhs, name=name) if lhs == -inf else self.model.addCons(expr >= lhs, name=name)
+        if lhs != -inf and rhs != inf:
+            self.model.chgRhs(cons, rhs)
+        self._rows[key] = cons
+        self._row_data[key] = {"lhs": row["lhs"], "rhs": row["rhs"], "coefs": dict(row["coefs"])}
+
+    def _parameters(self, p: dict) -> dict:
+        """
+        由输入数据计算模型中的全部数值参数。
+        :return: {"bounds": {变量键: (lb, ub)}, "rows": {约束键: {"lhs", "rhs", "coefs": {变量键: 系数}}}}
+        """
+        horizon, zones, zone_lines, transformers = p["horizon"], p["zones"], p["zone_lines"], p["transformers"]
+        switches = p["switches"]
+        operating_units, backup_units, hydro_units = p["operating_units"], p["backup_units"], p["hydro_units"]
+        storage_units, interruptible_loads = p["storage_units"], p["interruptible_loads"]
+        T = range(horizon)
+        weights = p["time_weights"] or [1] * horizon
+        bounds, rows = {}, {}
+        if not self.dispatch:
+            # 分解求解的主问题：调度部分由供区子问题求解
+            operating_units = backup_units = hydro_units = storage_units = interruptible_loads = {}
+            T = range(0)
+
+        # 开关可用性：不可用或连接到不可用区域线路的开关固定为初始状态
+        fixed = fixed_switch_states(p)
+        for name, sw in switches.items():
+            if name in fixed:
+                bounds[("S", name)] = (fixed[name], fixed[name])
+            else:
+                bounds[("S", name)] = (0, 1)
+            # 开关操作变量：ops >= S - init, ops >= init - S
+            init = sw["initial_state"]
+            rows[("op_close", name)] = {"lhs": -init, "rhs": None, "coefs": {("op_sw", name): 1, ("S", name): -1}}
+            rows[("op_open", name)] = {"lhs": init, "rhs": None, "coefs": {("op_sw", name): 1, ("S", name): 1}}
+        # 不破坏网架，结束时的开关闭合数大于等于初始状态
+        if switches:
+            rows[("keep_closed",)] = {"lhs": sum(sw["initial_state"] for sw in switches.values()), "rhs": None,
+                                   "coefs": {("S", name): 1 for name in switches}}
+
+        # 负荷归属：有负荷的主变必须分配到一个供区，指定归属的主变固定
+        for t_name, t_params in transformers.items():
+            loaded = max(t_params['load']) > 0
+            rows[("assign", t_name)] = {"lhs": 1 if loaded else 0, "rhs": 1 if loaded else len(zones),
+                                        "coefs": {("y", t_name, z_name): 1 for z_name in zones}}
+            for z_name in zones:
+                bounds[("y", t_name, z_name)] = (1 if t_params.get('allocate') == z_name else 0, 1)
+
+        # 发电与储能出力范围
+        for g, u in operating_units.items():
+            for t in T:
+                bounds[("P_opt", g, t)] = (0, u['p_max'] - u['p_current'])
+        for g, u in backup_units.items():
+            available = u.get('available', True)
+            for t in T:
+                # 不可用或首个时段：启动/运行状态及出力均为0
+                bounds[("P_bak", g, t)] = (0, u['p_max'] if available and t > 0 else 0)
+                bounds[("v_bak_startup", g, t)] = (0, 1 if available else 0)
+                bounds[("v_bak_operating", g, t)] = (0, 1 if available and t > 0 else 0)
+                if t >= 1:
+                    rows[("bak_output", g, t)] = {"lhs": 0, "rhs": 0, "coefs": {
+                        ("P_bak", g, t): 1, ("v_bak_startup", g, t - 1): -u['p_min'], ("v_bak_operating", g, t - 1): -u['p_max']}}
+        for g, u in hydro_units.items():
+            for t in T:
+                bounds[("P_hydro", g, t)] = (0, u['p_max'] if u.get('available', True) else 0)
+        for es, u in storage_units.items():
+            for t in T:
+                bounds[("P_storage", es, t)] = (-u['p_charge_max'] - u['p_current'], u['p_discharge_max'] - u['p_current'])
+                bounds[("SOC", es, t)] = (u['soc_min'], u['soc_max'])
+            # 初始SOC，假设时间步长为1小时
+            rows[("soc_initial", es)] = {"lhs": u['soc_initial'], "rhs": u['soc_initial'], "coefs": {("SOC", es, 0): 1}}
+            # 储能SOC动态约束：SOC[t] = SOC[t-1] - P_storage[t] * 时段权重
+            for t in range(1, horizon):
+                rows[("soc", es, t)] = {"lhs": 0, "rhs": 0, "coefs": {
+                    ("SOC", es, t): 1, ("SOC", es, t - 1): -1, ("P_storage", es, t): weights[t]}}
+        for il, u in interruptible_loads.items():
+            for t in T:
+                bounds[("P_shed", il, t)] = (0, u['shed_max'])
+
+        # 系统功率平衡约束,供区充裕度约束：
+        # 负荷 + 裕度 = 出力 + 容量，常数项移到右端
+        for t in T:
+            for z_name, z_params in zones.items():
+                coefs = {("y", t_name, z_name): t_params['load'][t] * t_params['sensitivity'][z_name]
+                         for t_name, t_params in transformers.items()}
+                rhs = z_params['capacity'] - z_params['fixed_load'][t]
+                for g in self.zone_units["operating_units"][z_name]:
+                    coefs[("P_opt", g, t)] = -operating_units[g]['sensitivity']
+                    rhs += operating_units[g]['p_current'] * operating_units[g]['sensitivity']
+                for g in self.zone_units["backup_units"][z_name]:
+                    coefs[("P_bak", g, t)] = -backup_units[g]['sensitivity']
+                for g in self.zone_units["hydro_units"][z_name]:
+                    coefs[("P_hydro", g, t)] = -hydro_units[g]['sensitivity']
+                for es in self.zone_units["storage_units"][z_name]:
+                    coefs[("P_storage", es, t)] = -storage_units[es]['sensitivity']
+                    rhs += storage_units[es]['p_current'] * storage_units[es]['sensitivity']
+                for il in self.zone_units["interruptible_loads"][z_name]:
+                    coefs[("P_shed", il, t)] = -1
+                coefs[("safety_region", z_name, t)] = 1
+                rows[("balance", z_name, t)] = {"lhs": rhs, "rhs": rhs, "coefs": coefs}
+                rows[("min_safety", z_name, t)] = {"lhs": None, "rhs": 0, "coefs": {
+                    ("min_safety_region",): 1, ("safety_region", z_name, t): -1 / z_params['capacity']}}
+        return {"bounds": bounds, "rows": rows}
+
+    def _set_objective(self, p: dict):
+        horizon, zones, transformers = p["horizon"], p["zones"], p["transformers"]
+        operating_units, backup_units, hydro_units = p["operating_units"], p["backup_units"], p["hydro_units"]
+        interruptible_loads = p["interruptible_loads"]
+        T = range(horizon)
+        # 发电运行成本在加权目标中的归一化系数
+        self.cost_scale = self.options["cost_scale"] or max([u['cost'] * u['p_max'] for u in operating_units.values()])
+        if not self.dispatch:
+            operating_units = backup_units = hydro_units = interruptible_loads = {}
+        # 聚合后的时段按其代表的原始时段数加权
+        w = p["time_weights"] or [1] * horizon
+        # 与原实现一致：启动成本和主变供电成本只计入最后一个时段
+        t_end = horizon - 1
+        self.op_cost = quicksum(w[t] * u['cost'] * (self.P_opt[g, t] + u['p_current']) for g, u in operating_units.items() for t in T) + \
+            quicksum(w[t] * u['cost'] * self.P_bak[g, t] for g, u in backup_units.items() for t in T) + \
+            quicksum(w[t] * u['cost'] * self.P_hydro[g, t] for g, u in hydro_units.items() for t in T) + \
+            quicksum(u['startup_cost'] * self.v_bak_startup[g, t_end] for g, u in backup_units.items()) + \
+            quicksum(transformers[t_name]['load'][t_end] * self.y[t_name, z_name] * transformers[t_name]['sensitivity'][z_name] * transformers[t_name]['cost'][z_name] for t_name in transformers for z_name in zones)
+        self.load_shedding_cost = quicksum(w[t] * u['cost'] * self.P_shed[il, t] for il, u in interruptible_loads.items() for t in T)
+        switch_cost = quicksum(self.ops_sw[name] * sw.get("cost", 1.0) for name, sw in p["switches"].items())
+        # 三个目标项（均为最小化），分层求解时按 objective_order 依次优化
+        self.objective_terms = {
+            ObjectiveType.MIN_SWITCH_OP: switch_cost,
+            ObjectiveType.MAX_SAFETY_REGION: -self.min_safety_region,
+            ObjectiveType.MIN_COST: self.op_cost,
+        }
+        # 根据目标类型设置单一目标函数（3选1）
+        objective = ObjectiveType(p["objective"])
+        self.objective_order = [objective] + [o for o in ObjectiveType if o != objective]
+        print(f"Optimization objective: {objective}")
+        eps = SECONDARY_OBJECTIVE_WEIGHT
+        # 目标函数中发电运行成本（op_cost 的调度部分）的系数，分解求解时用作子问题的成本系数
+        self.dispatch_weight = eps / self.cost_scale + (1 if objective == ObjectiveType.MIN_COST else 0)
+        obj_expr = eps * (switch_cost - self.min_safety_region + self.op_cost / self.cost_scale)
+        # 主目标：最小化开关操作成本 / 最大化安全裕度（转换为最小化负的安全裕度） / 最小化发电成本
+        obj_expr += self.objective_terms[objective]
+        obj_expr += self.load_shedding_cost
+        self.model.setObjective(obj_expr, "minimize")
+
     # =================================================================================
-    # 2. 变量创建
+    # 模型文件读写
     # =================================================================================
-    is_energized_by = {n: model.addVar(vtype="I", lb=0, ub=len(zones), name=f"is_energized_by_{n}") for n in substation_nodes}
-    S = {name: model.addVar(vtype="B", name=f"S_{name}") for name in switches}
-    ops_sw = {name: model.addVar(vtype="B", name=f"op_sw_{name}") for name in S}
-    y = { (t_name, z_name): model.addVar(vtype="B", name=f"y_{t_name}_{z_name}") for t_name in transformers for z_name in zones}
-    directed_edges = []
-    for name, sw in switches.items(): 
-        u, v = sw["nodes"]
-        directed_edges.extend([(u,v), (v,u)])
-    for line_name, line_params in zone_lines.items():
-        directed_edges.append((line_params['conn_node'], line_params['zone']))
-        directed_edges.append((line_params['zone'], line_params['conn_node']))
-    f = { (u, v, z_name): model.addVar(vtype="C", lb=0, name=f"f_{u}_{v}_{z_name}") for u, v in directed_edges for z_name in zones}
-
-    # b) 发电出力变量
-    P_opt = { (g, t): model.addVar(vtype="C", lb=0, ub=p['p_max'] - p['p_current'], name=f"P_opt_{g}_{t}") for g, p in operating_units.items() for t in range(horizon) }
-    P_bak = { (g, t): model.addVar(vtype="C", lb=0, ub=p['p_max'] if p.get('available', True) else 0, name=f"P_bak_{g}_{t}") for g, p in backup_units.items() for t in range(horizon) }
-    P_hydro = { (g, t): model.addVar(vtype="C", lb=0, ub=p['p_max'] if p.get('available', True) else 0, name=f"P_hydro_{g}_{t}") for g, p in hydro_units.items() for t in range(horizon) }
-    # 备用机组运行状态决策变量
-    v_bak_startup = { (g,t): model.addVar(vtype="B", name=f"v_bak_startup_{g}_{t}") for g in backup_units for t in range(horizon)} 
-    v_bak_operating = { (g,t): model.addVar(vtype="B", name=f"v_bak_operating_{g}_{t}") for g in backup_units for t in range(horizon)} 
-    # d) 储能变量 (简化为单功率变量)
-    P_storage = { (es, t): model.addVar(vtype="C", lb=-p['p_charge_max'] - p['p_current'], ub=p['p_discharge_max'] - p['p_current'], name=f"P_storage_{es}_{t}") for es, p in storage_units.items() for t in range(horizon) }
-    SOC = { (es, t): model.addVar(vtype="C", lb=p['soc_min'], ub=p['soc_max'], name=f"SOC_{es}_{t}") for es, p in storage_units.items() for t in range(horizon) }
-    
-    # 可中断负荷
-    P_shed = { (il,t): model.addVar(vtype="C", lb=0, ub=p['shed_max'], name=f"P_shed_{il}_{t}") for il, p in interruptible_loads.items() for t in range(horizon)}
-
-
-    # 约束部分保持不变...
+    def write_file(self, path: str) -> dict:
+        """
+        将模型写为 CIP/MPS 文件（按扩展名，变量/约束使用通用名称 x0, c0, ...），返回 from_file 恢复模型所需的元数据：
+        变量/约束与模型对象的对应关系、写出时的数值参数及拓扑预处理结果。延迟割方式含Python约束处理器，不能写出。
+        """
+        if self.formulation == "lazy_cuts":
+            raise ValueError("延迟割连通性建模含Python约束处理器，不能写为模型文件")
+        model = self.model
+        var_names = {var.getIndex(): f"x{i}" for i, var in enumerate(model.getVars())}
+        cons_names = {cons: f"c{i}" for i, cons in enumerate(model.getConss())}
+        variables = [(attr, key, var_names[var.getIndex()]) for attr in CACHED_VARIABLES for key, var in getattr(self, attr).items()]
+        variables.append(("min_safety_region", None, var_names[self.min_safety_region.getIndex()]))
+        model.writeProblem(path, genericnames=True, verbose=False)
+        return {
+            "params": self.params,
+            "variables": variables,
+            "vars": [(key, var_names[var.getIndex()]) for key, var in self.vars.items()],
+            "rows": [(key, cons_names[cons]) for key, cons in self._rows.items()],
+            "bounds": self._bounds,
+            "row_data": self._row_data,
+            "state": {attr: getattr(self, attr) for attr in ("index", "network", "reachability", "zone_units", "valid_inequalities")
+                      if hasattr(self, attr)},
+        }
+
+    @classmethod
+    def from_file(cls, path: str, meta: dict, options: dict = None) -> "RecoveryModel":
+        """
+        由 write_file 写出的模型文件和元数据恢复模型，不再逐条建立变量和约束。
+        恢复后的数值参数为写出时的取值，对新的输入调用 update() 只修改变化的部分。
+        """
+        self = cls.__new__(cls)
+        self._setup(options, meta["params"])
+        model = self.model
+        model.readProblem(path)
+        variables = {var.name: var for var in model.getVars()}
+        if "objoffset" in variables:
+            # CIP 以固定变量 objoffset 表示目标函数常数项，目标函数由 _set_objective 重新设置
+            model.delVar(variables.pop("objoffset"))
+        conss = {cons.name: cons for cons in model.getConss()}
+        for attr in CACHED_VARIABLES:
+            setattr(self, attr, {})
+        for attr, key, name in meta["variables"]:
+            if key is None:
+                setattr(self, attr, variables[name])
+            else:
+                getattr(self, attr)[key] = variables[name]
+        self.vars = {key: variables[name] for key, name in meta["vars"]}
+        self._rows = {key: conss[name] for key, name in meta["rows"]}
+        self._bounds = dict(meta["bounds"])
+        self._row_data = {key: {"lhs": row["lhs"], "rhs": row["rhs"], "coefs": dict(row["coefs"])}
+                          for key, row in meta["row_data"].items()}
+        for attr, value in meta["state"].items():
+            setattr(self, attr, value)
+        self._set_objective(self.params)
+        return self
+
     # =================================================================================
-    # 3. 约束添加
+    # 参数更新
     # =================================================================================
-    # a) 流量-开关关联约束
-    for s_name, sw in switches.items():
-        u, v = sw["nodes"]
-        for z_name in zones:
-            model.addCons(f[u, v, z_name] + f[v, u, z_name] <= C * S[s_name])
-    for line_name, line_params in zone_lines.items(): #单条联络线不能带2变
-        for s_name, sw in switches.items():
-             u, v = sw["nodes"]
-             for z_name in zones:
-                if u == line_params['conn_node'] or v == line_params['conn_node']:
-                    model.addCons(f[u, v, z_name] + f[v, u, z_name] <= 1.5)
-    # b) 流量守恒约束 
-    for n in substation_nodes + list(zones.keys()):
-        for z_name in zones:
-            in_flow = quicksum(f[m, n, z_name] for m, k in directed_edges if k == n)
-            out_flow = quicksum(f[n, k, z_name] for m, k in directed_edges if m == n)
-            supply, demand = 0, 0
-            
-            if n in zones.keys() and z_name == n:
-                supply += quicksum(y[t, z_name] for t in transformers)
-
-            for t_name, t_params in transformers.items():
-                if t_params['conn_node'] == n:
-                    demand += y[t_name, z_name]
-
-            model.addCons(out_flow - in_flow == supply - demand)
-
-    # c) 负荷归属和连通性约束
-    for t_name in transformers:
-        if max(transformers[t_name]['load']) > 0:
-            model.addCons(quicksum(y[t_name, z_name] for z_name in zones) == 1)
-        t_conn_node = transformers[t_name]['conn_node']
-        for z_name in zones:
-            in_flow_to_t = quicksum(f[m, t_conn_node, z_name] for m, k in directed_edges if k == t_conn_node)
-            model.addCons(in_flow_to_t >= y[t_name, z_name])
-        if transformers[t_name]['allocate']:
-            z_name = transformers[t_name]['allocate']
-            model.addCons(y[t_name, z_name] == 1)
-
-    # d) 分区解环运行约束
-    for line_name, line_params in zone_lines.items():
-        line_conn_node = line_params['conn_node']
-        for zone_idx, zone in enumerate(zones.keys()):
-            if zone == line_params['zone']:
-                model.addCons(is_energized_by[line_conn_node] == zone_idx)
-    for s_name, sw in switches.items():
-        u, v = sw["nodes"]
-        s_var = S[s_name]
-        model.addCons(is_energized_by[u] - is_energized_by[v] <= M * (1 - S[s_name]))
-        model.addCons(is_energized_by[u] - is_energized_by[v] >= - M * (1 - S[s_name]))
-
-    # e) 供区容量约束
-    safety_region = {(name,t): model.addVar(vtype="C", lb=0, name=f"safety_region_{name}_{t}") for name in zones for t in range(horizon)}
-    min_safety_region = model.addVar(vtype="C", name="min_safety_region")
-    # b) 系统功率平衡约束,供区充裕度约束
-    for t in range(horizon):
-        for z_name, z_params in zones.items():
-            supply_side = (quicksum((P_opt[g, t] + operating_units[g]['p_current']) * operating_units[g]['sensitivity'] for g, p in operating_units.items() if p['zone'] == z_name) +
-                           quicksum(P_bak[g, t] * backup_units[g]['sensitivity'] for g, p in backup_units.items() if p['zone'] == z_name) +
-                           quicksum(P_hydro[g, t] * hydro_units[g]['sensitivity'] for g, p in hydro_units.items() if p['zone'] == z_name) +
-                           quicksum((P_storage[es, t] + storage_units[es]['p_current']) * storage_units[es]['sensitivity'] for es, p in storage_units.items() if p['zone'] == z_name))
-            demand_side = (z_params['fixed_load'][t] +
-                           quicksum(transformers[t_name]['load'][t] * y[t_name, z_name] * transformers[t_name]['sensitivity'][z_name] for t_name in transformers) - \
-                           quicksum(P_shed[il,t] for il, p in interruptible_loads.items() if p['zone'] == z_name))
-            model.addCons( demand_side + safety_region[z_name,t] == supply_side + z_params['capacity'])
-            model.addCons(min_safety_region <= safety_region[z_name,t]/z_params['capacity'])
-
-    # f) 备用机组启动延迟约束,启动一小时后并网，并网一小时后带满，开机之后不停机
-    for g, p in backup_units.items():
-        for t in range(horizon):
-            model.addCons(v_bak_startup[g,t] + v_bak_operating[g,t] <= 1)
-            if t >= 1:
-                model.addCons(v_bak_operating[g,t] >= v_bak_operating[g,t - 1])
-            # 如果备用机组不可用，则启动变量固定为0
-            if not p.get('available', True):
-                model.addCons(v_bak_startup[g,t] == 0)
-                model.addCons(v_bak_operating[g,t] == 0)
-                model.addCons(P_bak[g,t] == 0)
-            elif t == 0:
-                model.addCons(v_bak_operating[g,t] == 0)
-                model.addCons(P_bak[g,t] == 0)
+    def update(self, **params) -> int:
+        """
+        将新的输入参数写入已有模型，仅修改发生变化的变量上下界、约束左右端项和系数。
+        :return: 修改的模型元素数量
+        """
+        new_params = _normalize_params(params)
+        if topology_fingerprint(new_params, self.options) != self.fingerprint:
+            raise ValueError("拓扑结构与模型模板不一致，无法增量更新")
+        model = self.model
+        model.freeTransform()
+        values = self._parameters(new_params)
+        changes = 0
+        for key, (lb, ub) in values["bounds"].items():
+            old_lb, old_ub = self._bounds[key]
+            if lb == old_lb and ub == old_ub:
+                continue
+            var = self.vars[key]
+            # 先放宽再收紧，避免中间状态出现 lb > ub
+            if lb > old_ub:
+                model.chgVarUb(var, ub)
+                model.chgVarLb(var, lb)
             else:
-                model.addCons(P_bak[g, t] == v_bak_startup[g, t - 1] * p['p_min'] + v_bak_operating[g, t - 1] * p['p_max'])
-                model.addCons(v_bak_startup[g,t - 1] + v_bak_operating[g,t - 1] == v_bak_operating[g,t])
-
-    # g) 储能SOC动态约束
-    for es, p in storage_units.items():
-        # 初始SOC
-        model.addCons(SOC[es, 0] == p['soc_initial']) # 假设时间步长为1小时
-        # 时序SOC
-        for t in range(1, horizon):
-            model.addCons(SOC[es, t] == SOC[es, t-1] - P_storage[es, t] * 1)
-            
-    # h) 隔离开关-断路器耦合约束
-    for s_name, sw in switches.items():
-        if sw['switch_type'] == 'breaker':
-            u, v = sw["nodes"]
-            breaker_initial_state = initial_sw_states[s_name]
-            breaker_final_state = S[s_name]
-            
-            # 找到与此breaker相连的所有switch
-            connected_switches_on_u = []
-            connected_switches_on_v = []
-            for other_name, other_sw in switches.items():
-                if other_name != s_name and other_sw['switch_type'] == 'switch':
-                    other_u, other_v = other_sw["nodes"]
-                    # 检查是否有共同节点
-                    if u in [other_u, other_v]:
-                        connected_switches_on_u.append(other_name)
-                    elif v in [other_u, other_v]:
-                        connected_switches_on_v.append(other_name)
-            
-            # 添加约束条件, 确保最终状态在运行、热备用、冷备用三者之间
-            if connected_switches_on_u:
-                model.addCons(quicksum(S[sw_name] for sw_name in connected_switches_on_u) >= breaker_final_state)
-            if connected_switches_on_v:
-                model.addCons(quicksum(S[sw_name] for sw_name in connected_switches_on_v) >= breaker_final_state)
-    # i) 不破坏网架，结束时的开关闭合数大于等于初始状态
-    model.addCons(quicksum(S[name] for name in switches) >= sum(initial_sw_states.values()))
-    # 3.5. 可用性约束
+                model.chgVarLb(var, lb)
+                model.chgVarUb(var, ub)
+            self._bounds[key] = (lb, ub)
+            changes += 1
+        inf = model.infinity()
+        for key, row in values["rows"].items():
+            old, cons = self._row_data[key], self._rows[key]
+            for var_key, coef in row["coefs"].items():
+                if old["coefs"].get(var_key, 0) != coef:
+                    model.chgCoefLinear(cons, self.vars[var_key], coef)
+                    old["coefs"][var_key] = coef
+                    changes += 1
+            if row["lhs"] != old["lhs"] or row["rhs"] != old["rhs"]:
+                lhs = -inf if row["lhs"] is None else row["lhs"]
+                rhs = inf if row["rhs"] is None else row["rhs"]
+                if lhs > model.getRhs(cons):
+                    model.chgRhs(cons, rhs)
+                    model.chgLhs(cons, lhs)
+                else:
+                    model.chgLhs(cons, lhs)
+                    model.chgRhs(cons, rhs)
+                old["lhs"], old["rhs"] = row["lhs"], row["rhs"]
+                changes += 1
+        self._set_objective(new_params)
+        self.params = new_params
+        return changes
+
     # =================================================================================
-    # 获取不可用区域线路相连的节点
-    unavailable_zone_line_nodes = set()
-    for line_name, line_params in zone_lines.items():
-        if not line_params.get('available', True):
-            unavailable_zone_line_nodes.add(line_params['conn_node'])
-    
-    # 开关可用性约束
-    for name, sw in switches.items():
-        u, v = sw["nodes"]
-        # 如果开关不可用，或者连接到不可用区域线路的节点，则状态固定为初始状态
-        if not switch_availability[name] or u in unavailable_zone_line_nodes or v in unavailable_zone_line_nodes:
-            model.addCons(S[name] == initial_sw_states[name])
-    
-    # 定义开关操作变量
-    for name, s_var in S.items():
-        if initial_sw_states.get(name, 0) == 0: 
-            model.addCons(ops_sw[name] >= s_var)
-        else: 
-            model.addCons(ops_sw[name] >= 1 - s_var)
-
-    # 新目标：最小化加权的操作总成本
-    op_cost = quicksum(p['cost'] * (P_opt[g, t] + operating_units[g]['p_current']) for g,p in operating_units.items() for t in range(horizon)) + \
-               quicksum(p['cost'] * P_bak[g, t] for g,p in backup_units.items() for t in range(horizon)) + \
-               quicksum(p['cost'] * P_hydro[g, t] for g,p in hydro_units.items() for t in range(horizon)) + \
-               quicksum(p['startup_cost'] * v_bak_startup[g, t] for g, p in backup_units.items()) + \
-               quicksum(transformers[t_name]['load'][t] * y[t_name, z_name] * transformers[t_name]['sensitivity'][z_name] * transformers[t_name]['cost'][z_name] for t_name in transformers for z_name in zones)
-    load_shedding_cost = quicksum(p['cost'] * P_shed[il, t] for il, p in interruptible_loads.items() for t in range(horizon))
-    # 根据目标类型设置单一目标函数（3选1）
-    print(f"Optimization objective: {objective}")
-    eps = 1e-4
-    obj_expr = eps * (quicksum(ops_sw[name] * switch_costs.get(name, 1.0) for name in S) - min_safety_region + op_cost/max([p['cost']*p['p_max'] for p in operating_units.values()]))
-    if objective == ObjectiveType.MIN_SWITCH_OP:
-        # 最小化开关操作成本
-        obj_expr += quicksum(ops_sw[name] * switch_costs.get(name, 1.0) for name in S)
-    elif objective == ObjectiveType.MAX_SAFETY_REGION:
-        # 最大化安全裕度（转换为最小化负的安全裕度）
-        obj_expr += -min_safety_region  # 将比值转化为百分数
-    elif objective == ObjectiveType.MIN_COST:
-        # 最小化发电成本
-        obj_expr += op_cost
-    obj_expr += load_shedding_cost
-    model.setObjective(obj_expr, "minimize")
+    # 初始解
     # =================================================================================
-    # 5. 求解与结果封装 (更新返回的字典)
+    def add_warm_start(self, source: str = "auto", start_plan: dict = None) -> dict:
+        """
+        向SCIP提交初始解，需在 update() 之后、optimize() 之前调用。
+        - previous: 同一拓扑上次求解的完整解，先用 checkSol 校验可行性，不可行时退化为其开关状态的部分解
+        - plan: 用户给定的开关状态方案，作为部分解由SCIP的completesol启发式补全
+        - heuristic: 贪心构造启发式给出的开关状态和主变归属，作为部分解
+        - initial: 初始开关状态（出力保持当前值即P_opt下界），作为部分解提交
+        - auto: 依次尝试 previous、plan、heuristic（方案可行时）、initial
+        :return: 初始解信息 {"source", "type", "accepted"}，部分解的accepted在求解后确定
+        """
+        self._warm_start = None
+        if source == "none":
+            return None
+        switches = self.params["switches"]
+        initial_sw_states = {name: sw["initial_state"] for name, sw in switches.items()}
+        if source in ("auto", "previous"):
+            with _last_solutions_lock:
+                previous = _last_solutions.get(self.fingerprint)
+            variables = self.model.getVars()
+            if previous is not None and len(previous["values"]) == len(variables):
+                sol = self.model.createSol()
+                for var, value in zip(variables, previous["values"]):
+                    self.model.setSolVal(sol, var, value)
+                if self.model.checkSol(sol, original=True):
+                    self.model.addSol(sol, free=True)
+                    self._warm_start = {"source": "previous", "type": "complete", "accepted": True}
+                    return self._warm_start
+                self.model.freeSol(sol)
+                # 上次解在当前参数下不可行，仅保留其开关状态
+                return self._add_partial_start("previous", previous["switch_states"])
+            if source == "previous":
+                return None
+        if source in ("auto", "plan") and start_plan:
+            return self._add_partial_start("plan", start_plan)
+        if source in ("auto", "heuristic"):
+            # 贪心构造方案：开关状态及主变归属作为部分解；auto 模式下方案不可行时退化为初始状态
+            plan = greedy_recovery_plan(**self.params)
+            if not plan["violations"] or source == "heuristic":
+                return self._add_partial_start("heuristic", plan["switch_states"], plan["assignment"])
+        if source in ("auto", "initial"):
+            return self._add_partial_start("initial", initial_sw_states)
+        return None
+
+    def _add_partial_start(self, source: str, plan: dict, assignment: dict = None) -> dict:
+        if self._partial_starts >= self.model.getParam("limits/maxorigsol"):
+            # 模型多次复用后保留的部分解已达SCIP上限，放宽上限以免 addSol 报错（模板由 get_model_template 定期重建）
+            self.model.setParam("limits/maxorigsol", self._partial_starts + 1)
+        sol = self.model.createPartialSol()
+        for name, state in plan.items():
+            if name in self.S:
+                self.model.setSolVal(sol, self.S[name], state)
+                self.model.setSolVal(sol, self.ops_sw[name], int(state != self.params["switches"][name]["initial_state"]))
+        for t_name, zone in (assignment or {}).items():
+            for z_name in self.params["zones"]:
+                if (t_name, z_name) in self.y:
+                    self.model.setSolVal(sol, self.y[t_name, z_name], int(zone == z_name))
+        self.model.addSol(sol, free=True)
+        self._partial_starts += 1
+        self._warm_start = {"source": source, "type": "partial", "accepted": None, "plan": dict(plan)}
+        return self._warm_start
+
+    def warm_start_report(self) -> dict:
+        """求解后的初始解报告：部分解以是否找到与其开关状态一致的可行解作为被接受的判据"""
+        if self._warm_start is None:
+            return None
+        report = {key: value for key, value in self._warm_start.items() if key != "plan"}
+        if report["type"] == "partial":
+            plan = {name: state for name, state in self._warm_start["plan"].items() if name in self.S}
+            report["accepted"] = any(
+                all(round(self.model.getSolVal(sol, self.S[name])) == state for name, state in plan.items())
+                for sol in self.model.getSols())
+        return report
+
+    def store_solution(self):
+        """保存当前最优解，作为同一拓扑下次求解的初始解"""
+        previous = {
+            "values": [self.model.getVal(var) for var in self.model.getVars()],
+            "switch_states": {name: round(self.model.getVal(var)) for name, var in self.S.items()},
+        }
+        with _last_solutions_lock:
+            _last_solutions[self.fingerprint] = previous
+            _last_solutions.move_to_end(self.fingerprint)
+            while len(_last_solutions) > MAX_LAST_SOLUTIONS:
+                _last_solutions.popitem(last=False)
+
     # =================================================================================
-    model.optimize()
-    
-    if model.getStatus() == "optimal":
-        final_switch_states = {name: round(model.getVal(var)) for name, var in S.items()}
-        
+    # 求解与结果封装
+    # =================================================================================
+    def set_incumbent_callback(self, callback):
+        """
+        设置新可行解回调，callback(summary) 在求解线程中被调用；传入 None 取消回调。
+        事件处理器只在首次设置时注册到模型中，模板复用时只替换回调函数。
+        """
+        if self._incumbent_handler is None:
+            if callback is None:
+                return
+            self._incumbent_handler = IncumbentEventHandler(self)
+            self.model.includeEventhdlr(self._incumbent_handler, "incumbent_stream", "emit each new incumbent")
+        self._incumbent_handler.callback = callback
+
+    def incumbent_summary(self, sol) -> dict:
+        """求解过程中新可行解的摘要：目标值、当前间隙、相对初始状态的开关操作、已用时间"""
+        model = self.model
         switch_operations = []
-        op_count = 0
-        for name, initial_state in initial_sw_states.items():
-            final_state = final_switch_states[name]
-            if initial_state != final_state:
-                op_count +=1
-                action = "合闸 (Close)" if final_state == 1 else "分闸 (Open)"
+        for name, var in self.S.items():
+            initial_state = self.params["switches"][name]["initial_state"]
+            final_state = round(model.getSolVal(sol, var))
+            if final_state != initial_state:
                 switch_operations.append({
                     "switch_name": name,
                     "initial_state": initial_state,
                     "final_state": final_state,
-                    "action": action,
-                    "cost": switch_costs.get(name, 1.0) # 在结果中也返回成本
+                    "action": "合闸 (Close)" if final_state == 1 else "分闸 (Open)",
                 })
-        final_transformer_assignment = {}
-        for t_name, t_params in transformers.items():
-            assigned_zone = "失电"
-            for z_name in zones:
-                if model.getVal(y[t_name, z_name]) > 0.5:
-                    assigned_zone = z_name
-                    break
-            final_transformer_assignment[t_name] = {
-                "assigned_zone": assigned_zone, "load": t_params['load']
-            }
-        final_zone_status = {}
-        for z_name, z_params in zones.items():
-            capacity = z_params['capacity']
-            load = [round(capacity - model.getVal(safety_region[z_name,t]),2) for t in range(horizon)]
-            final_zone_status[z_name] = {
-                "final_load": load,
-                "capacity": capacity,
-                "status": "安全" if max(load) <= capacity else "过载!",
-                "safety_region_percent": [round(model.getVal(safety_region[z_name,t])/capacity *100, 2) for t in range(horizon)]
-            }
-        final_dispatch_plan = []
-        for t in range(horizon):
-            hourly_plan = {
-                "time": (datetime.now() + timedelta(hours=t)).strftime("%H:%M"), # to string
-                "generation": {},
-                "storage": {},
-                "shedding": {}
+        objective_value, dual_bound = model.getSolObjVal(sol), model.getDualbound()
+        # 事件触发时SCIP尚未更新原始界，间隙按SCIP的定义由该解目标值与对偶界计算
+        denominator = min(abs(objective_value), abs(dual_bound))
+        gap = abs(objective_value - dual_bound) / denominator if denominator > 0 else None
+        return {
+            "objective_value": round(objective_value, 4),
+            "dual_bound": round(dual_bound, 6),
+            "gap": round(gap, 6) if gap is not None and abs(dual_bound) < 1e20 else None,
+            "elapsed": round(model.getSolvingTime(), 3),
+            "switch_operations": switch_operations,
+        }
+
+    def set_limits(self, time_limit: float = None, mip_gap: float = None, node_limit: int = None):
+        """
+        设置求解终止条件，未设置的项恢复SCIP默认值（模板复用时不能沿用上次的设置）
+        :param time_limit: 时间上限（秒）
+        :param mip_gap: 相对间隙目标
+        :param node_limit: 节点数上限
+        """
+        self.model.setParam("limits/time", time_limit if time_limit is not None else 1e20)
+        self.model.setParam("limits/gap", mip_gap if mip_gap is not None else 0.0)
+        self.model.setParam("limits/nodes", node_limit if node_limit is not None else -1)
+
+    def optimize(self):
+        self.model.optimize()
+        return self.model.getStatus()
+
+    def run(self, settings: SolverSettings):
+        """按求解器设置提交初始解、设置终止条件并求解，返回SCIP状态"""
+        self._clear_lexicographic()
+        self.add_warm_start(settings.warm_start, settings.start_plan)
+        if settings.objective_mode == "lexicographic":
+            return self.optimize_lexicographic(settings.lexicographic_tolerance,
+                                               settings.time_limit, settings.mip_gap, settings.node_limit)
+        self.set_limits(settings.time_limit, settings.mip_gap, settings.node_limit)
+        return self.optimize()
+
+    def optimize_lexicographic(self, tolerance: float = 1e-4, time_limit: float = None, mip_gap: float = None,
+                               node_limit: int = None):
+        """
+        分层（字典序）求解：先只优化主目标（含切负荷成本），再将其固定在容差范围内作为约束，
+        依次优化其余目标，每层以上一层的最好解作为初始解。各层目标量纲独立，避免加权混合带来的数值问题。
+        :param tolerance: 上一层目标值的相对容差
+        :param time_limit: 所有层合计的时间上限（秒）
+        :return: 最后一层的SCIP状态
+        """
+        model = self.model
+        start = time.perf_counter()
+        self._lexicographic_stages = []
+        status = None
+        for level, objective in enumerate(self.objective_order):
+            stage_expr = self.objective_terms[objective]
+            if level == 0:
+                stage_expr = stage_expr + self.load_shedding_cost
+            if level > 0:
+                previous = self._lexicographic_stages[-1]
+                values = [model.getVal(var) for var in model.getVars()]
+                model.freeTransform()
+                bound = lexicographic_bound(previous["value"], tolerance, previous["objective"])
+                self._lexicographic_conss.append(
+                    model.addCons(previous["expr"] <= bound, name=f"lexicographic_{previous['objective']}"))
+                sol = model.createSol()
+                for var, value in zip(model.getVars(), values):
+                    model.setSolVal(sol, var, value)
+                model.addSol(sol, free=True)
+            model.setObjective(stage_expr, "minimize")
+            remaining = None if time_limit is None else max(time_limit - (time.perf_counter() - start), 0.01)
+            self.set_limits(remaining, mip_gap, node_limit)
+            status = self.optimize()
+            if not self.has_solution():
+                break
+            self._lexicographic_stages.append({
+                "objective": objective.value, "expr": stage_expr, "value": model.getObjVal(), "status": status,
+                "solve_time": round(model.getSolvingTime(), 3), "nodes": model.getNNodes()})
+            if status != "optimal":
+                # 上一层未证明最优（如到达时间上限），不再继续优化后续目标
+                break
+        return status
+
+    def _clear_lexicographic(self):
+        """删除上次分层求解添加的目标约束并恢复加权目标函数（模板复用时调用）"""
+        self._lexicographic_stages = None
+        if not self._lexicographic_conss:
+            return
+        self.model.freeTransform()
+        for cons in self._lexicographic_conss:
+            self.model.delCons(cons)
+        self._lexicographic_conss = []
+        self._set_objective(self.params)
+
+    def has_solution(self) -> bool:
+        """是否找到了可行解（最优或到达终止条件时的当前最好解）"""
+        return self.model.getNSols() > 0
+
+    def solver_report(self) -> dict:
+        """求解过程信息：终止原因、原始/对偶界、间隙、耗时和节点数"""
+        model = self.model
+        gap = model.getGap()
+        report = {
+            "termination": model.getStatus(),
+            "primal_bound": round(model.getPrimalbound(), 6) if self.has_solution() else None,
+            "dual_bound": round(model.getDualbound(), 6),
+            "gap": round(gap, 6) if gap < 1e20 else None,
+            "solve_time": round(model.getSolvingTime(), 3),
+            "nodes": model.getNNodes(),
+            "warm_start": self.warm_start_report(),
+        }
+        if self.reduce_topology:
+            report["topology_reduction"] = self.network["stats"]
+        if self.prune_unreachable:
+            report["reachability_pruning"] = self.reachability["stats"]
+        if self.strengthen:
+            report["valid_inequalities"] = self.valid_inequalities
+        if self._lexicographic_stages is not None:
+            report["objective_mode"] = "lexicographic"
+            report["stages"] = [{key: value for key, value in stage.items() if key != "expr"}
+                                for stage in self._lexicographic_stages]
+            report["solve_time"] = round(sum(stage["solve_time"] for stage in self._lexicographic_stages), 3)
+            report["nodes"] = sum(stage["nodes"] for stage in self._lexicographic_stages)
+        return report
+
+    def extract_result(self) -> dict:
+        """从已求解的模型中提取结果字典"""
+        model = self.model
+        # 分层求解时报告返回方案的主目标值（后续层可能在容差内放宽主目标，不等于第一层的最优值）
+        objective_value = model.getVal(self._lexicographic_stages[0]["expr"]) if self._lexicographic_stages else model.getObjVal()
+        return assemble_result(self.params, lambda key: model.getVal(self.vars[key]), model.getVal(self.op_cost),
+                               model.getStatus(), objective_value, self.solver_report())
+
+    def _switch_key(self, sol=None) -> tuple:
+        """解（默认当前最优解）的开关状态，作为方案去重的键"""
+        if sol is None:
+            return tuple(round(self.model.getVal(var)) for var in self.S.values())
+        return tuple(round(self.model.getSolVal(sol, var)) for var in self.S.values())
+
+    def _harvest_pool(self, pool: dict, exclude: list):
+        """将解池中开关状态不在 exclude 中的解按开关状态去重（保留目标值最小者）记入 pool：键 -> (目标值, 变量值, 发电运行成本)"""
+        model = self.model
+        for sol in model.getSols():
+            key = self._switch_key(sol)
+            objective = model.getSolObjVal(sol)
+            if key not in exclude and (key not in pool or objective < pool[key][0]):
+                values = {var.name: model.getSolVal(sol, var) for var in model.getVars()}
+                pool[key] = (objective, values, model.getSolVal(sol, self.op_cost))
+
+    def _plan_summary(self, values: dict, op_cost: float, objective_value: float, source: str, termination: str) -> dict:
+        """由变量取值（变量名 -> 值）组装备选方案的摘要"""
+        result = assemble_result(self.params, lambda key: values[self.vars[key].name], op_cost, termination,
+                                 objective_value, None)
+        return {
+            "source": source,
+            "objective_value": result["objective_value"],
+            "summary": result["summary"],
+            "switch_operations": result["results"]["switch_operations"],
+            "final_switch_states": result["results"]["final_switch_states"],
+            "operations": result["results"]["operations"],
+        }
+
+    def alternative_plans(self, k: int, search: str = "nogood", time_limit: float = None, mip_gap: float = None,
+                          node_limit: int = None) -> list:
+        """
+        最优解之外开关状态互不相同的至多k个备选方案，按目标值升序。需在求解并提取结果之后调用（nogood 会清除模型中的解）。
+        - pool: 只从本次求解找到的可行解（解池）中按开关状态去重选取，不再求解；目标值为该解的目标值，
+          是该开关状态下的上界
+        - nogood: 在同一模型上依次添加排除已得开关状态的no-good割重新求解，每次以解池中最好的未排除解为初始解，
+          得到目标值第2至第k+1好的方案（在 mip_gap 范围内）；结束后删除割，模型可继续作为模板复用
+        :param time_limit: nogood 每次求解的时间上限（秒）
+        :return: [{"rank", "source", "objective_value", "summary", "switch_operations", "final_switch_states", "operations"}, ...]
+        """
+        model = self.model
+        found = [self._switch_key()]
+        pool = {}
+        self._harvest_pool(pool, found)
+        plans = []
+        if search == "pool":
+            for objective, values, op_cost in sorted(pool.values(), key=lambda item: item[0])[:k]:
+                plans.append(self._plan_summary(values, op_cost, objective, "pool", "feasible"))
+        else:
+            cuts = []
+            try:
+                while len(plans) < k:
+                    model.freeTransform()
+                    states = dict(zip(self.S, found[-1]))
+                    # 至少一台开关与已得方案的状态不同
+                    cuts.append(model.addCons(
+                        quicksum(1 - self.S[name] if state == 1 else self.S[name] for name, state in states.items()) >= 1,
+                        name=f"nogood_{len(cuts)}"))
+                    candidates = [item for key, item in pool.items() if key not in found]
+                    if candidates:
+                        _, values, _ = min(candidates, key=lambda item: item[0])
+                        sol = model.createSol()
+                        for var in model.getVars():
+                            model.setSolVal(sol, var, values[var.name])
+                        model.addSol(sol, free=True)
+                    self.set_limits(time_limit, mip_gap, node_limit)
+                    status = self.optimize()
+                    if not self.has_solution():
+                        break
+                    found.append(self._switch_key())
+                    values = {var.name: model.getVal(var) for var in model.getVars()}
+                    plans.append(self._plan_summary(values, model.getVal(self.op_cost), model.getObjVal(), "nogood", status))
+                    self._harvest_pool(pool, found)
+            finally:
+                model.freeTransform()
+                for cons in cuts:
+                    model.delCons(cons)
+        for rank, plan in enumerate(plans, 2):
+            plan["rank"] = rank
+        return plans
+
+
+def assemble_result(p: dict, value, op_cost: float, termination: str, objective_value: float, report: dict) -> dict:
+    """
+    由解中的变量取值组装结果字典
+    :param p: 规范化后的优化输入
+    :param value: value(变量键) 返回解中该变量的值，变量键与 RecoveryModel.vars 一致，如 ("S", 开关名)、("P_opt", 机组名, 时段)
+    :param op_cost: 发电运行成本
+    :param termination: 求解终止状态（SCIP状态名）
+    :param objective_value: 报告的目标值
+    :param report: 求解过程信息，作为结果中的 "solver"
+    """
+    horizon, zones, transformers = p["horizon"], p["zones"], p["transformers"]
+    operating_units, backup_units, hydro_units = p["operating_units"], p["backup_units"], p["hydro_units"]
+    storage_units, interruptible_loads = p["storage_units"], p["interruptible_loads"]
+    initial_sw_states = {name: sw["initial_state"] for name, sw in p["switches"].items()}
+    switch_costs = {name: sw["cost"] for name, sw in p["switches"].items()}
+
+    final_switch_states = {name: round(value(("S", name))) for name in p["switches"]}
+
+    switch_operations = []
+    op_count = 0
+    for name, initial_state in initial_sw_states.items():
+        final_state = final_switch_states[name]
+        if initial_state != final_state:
+            op_count +=1
+            action = "合闸 (Close)" if final_state == 1 else "分闸 (Open)"
+            switch_operations.append({
+                "switch_name": name,
+                "initial_state": initial_state,
+                "final_state": final_state,
+                "action": action,
+                "cost": switch_costs.get(name, 1.0) # 在结果中也返回成本
+            })
+    final_transformer_assignment = {}
+    for t_name, t_params in transformers.items():
+        assigned_zone = "失电"
+        for z_name in zones:
+            if value(("y", t_name, z_name)) > 0.5:
+                assigned_zone = z_name
+                break
+        final_transformer_assignment[t_name] = {
+            "assigned_zone": assigned_zone, "load": t_params['load']
+        }
+    final_zone_status = {}
+    for z_name, z_params in zones.items():
+        capacity = z_params['capacity']
+        load = [round(capacity - value(("safety_region", z_name, t)),2) for t in range(horizon)]
+        final_zone_status[z_name] = {
+            "final_load": load,
+            "capacity": capacity,
+            "status": "安全" if max(load) <= capacity else "过载!",
+            "safety_region_percent": [round(value(("safety_region", z_name, t))/capacity *100, 2) for t in range(horizon)]
+        }
+    final_dispatch_plan = []
+    for t in range(horizon):
+        hourly_plan = {
+            "time": (datetime.now() + timedelta(hours=t)).strftime("%H:%M"), # to string
+            "generation": {},
+            "storage": {},
+            "shedding": {}
+        }
+        for g in operating_units: hourly_plan["generation"][g] = round(value(("P_opt", g, t)) + operating_units[g]['p_current'], 2)
+        for g in backup_units: hourly_plan["generation"][g] = round(value(("P_bak", g, t)), 2)
+        for g in hydro_units: hourly_plan["generation"][g] = round(value(("P_hydro", g, t)), 2)
+        for es in storage_units:
+            hourly_plan["storage"][es] = {
+                "power_mw": round(value(("P_storage", es, t)) + storage_units[es]['p_current'], 2),
+                "soc_mwh": round(value(("SOC", es, t)), 2)
             }
-            for g in operating_units: hourly_plan["generation"][g] = round(model.getVal(P_opt[g, t]) + operating_units[g]['p_current'], 2)
-            for g in backup_units: hourly_plan["generation"][g] = round(model.getVal(P_bak[g, t]), 2)
-            for g in hydro_units: hourly_plan["generation"][g] = round(model.getVal(P_hydro[g, t]), 2)
-            for es in storage_units: 
-                hourly_plan["storage"][es] = {
-                    "power_mw": round(model.getVal(P_storage[es, t]) + storage_units[es]['p_current'], 2),
-                    "soc_mwh": round(model.getVal(SOC[es, t]), 2)
-                }
-            for il in interruptible_loads: hourly_plan["shedding"][il] = round(model.getVal(P_shed[il, t]), 2)
-            final_dispatch_plan.append(hourly_plan)
-        # 生成开关刀闸操作顺序
-        power_graph = build_power_system_graph(substation_nodes, switches)
-        operations = []
-        edges = {}
-        breakers_operate = {}
-        switches_operate = {}
-        for edge in list(power_graph.edges(data=True)):
-            edge_name = edge[2]['switch_name']
-            edges[edge_name] = edge
-            if edge[2]['switch_type'] == 'breaker':
-                # 无需操作
-                if final_switch_states[edge_name] == edge[2]['initial_state']:
-                    breakers_operate[edge_name] = 0
-                # 由分到合
-                elif final_switch_states[edge_name] == 1 and edge[2]['initial_state'] == 0:
-                    breakers_operate[edge_name] = 1
-                # 由合到分
-                elif final_switch_states[edge_name] == 0 and edge[2]['initial_state'] == 1:
-                    breakers_operate[edge_name] = 2
-            elif edge[2]['switch_type'] == 'switch':
-                # 无需操作
-                if final_switch_states[edge_name] == edge[2]['initial_state']:
-                    switches_operate[edge_name] = 0
-                # 由分到合
-                elif final_switch_states[edge_name] == 1 and edge[2]['initial_state'] == 0:
-                    switches_operate[edge_name] = 1
-                # 由合到分
-                elif final_switch_states[edge_name] == 0 and edge[2]['initial_state'] == 1:
-                    switches_operate[edge_name] = 2
-        # 先进行双母线倒排操作
-        for close_switch_name, operate in switches_operate.items():
-            if operate == 1:
-                # 找到需要分闸的刀闸，应与合闸刀闸相连
-                u = edges[close_switch_name][0]
-                v = edges[close_switch_name][1]
-                connected_edges = get_connected_edges_with_attrs(power_graph, u, v)
-                for edge in connected_edges:
-                    if edge[2]['switch_type'] == 'switch':
-                        open_switch_name = edge[2]['switch_name']
-                        if switches_operate[open_switch_name] == 2:
-                            operations.append(f"{close_switch_name}【刀闸合闸】")
-                            print(f"1、{close_switch_name}【刀闸合闸】")
-                            switches_operate[close_switch_name] = 0
-                            operations.append(f"{open_switch_name}【刀闸分闸】")
-                            print(f"1、{open_switch_name}【刀闸分闸】")
-                            switches_operate[open_switch_name] = 0
-                            break
-        # 再操作开关及其刀闸
-        for breaker_name, operate in breakers_operate.items():
-            if operate == 1:
-                # 找到需要分闸的开关，应与合闸开关两端的连通子图相连
-                close_conn_graph = edges[breaker_name][2]['connected_components']
-                open_breaker = "not_find"
-                for open_breaker_name, open_operate in breakers_operate.items():
-                    if open_operate == 2:
-                        open_conn_graph = edges[open_breaker_name][2]['connected_components']
-                        if open_conn_graph[0] in close_conn_graph or open_conn_graph[1] in close_conn_graph:
-                            open_breaker = open_breaker_name
-                    if open_breaker != "not_find":
+        for il in interruptible_loads: hourly_plan["shedding"][il] = round(value(("P_shed", il, t)), 2)
+        final_dispatch_plan.append(hourly_plan)
+    # 生成开关刀闸操作顺序
+    operations = generate_operation_sequence(p["substation_nodes"], p["switches"], final_switch_states)
+    result = {
+        "status": "Optimal Solution Found" if termination == "optimal" else "Feasible Solution Found",
+        "objective_value": round(objective_value, 4),
+        # --- 更新此处，反映成本 ---
+        "summary": {
+            "operation_cost": round(op_cost, 4),
+            "safety_region_percent": round(value(("min_safety_region",))*100, 2),
+            "total_operations_count": op_count
+        },
+        "results": {
+            "time_slots": [f"{(datetime.now() + timedelta(hours=t)).strftime('%H:%M')}" for t in range(horizon)],
+            "switch_operations": switch_operations,
+            "final_transformer_assignment": final_transformer_assignment,
+            "final_zone_status": final_zone_status,
+            "final_switch_states": final_switch_states,
+            "initial_sw_states": initial_sw_states,
+            "operations": operations,
+            "dispatch_plan": final_dispatch_plan
+        },
+        "solver": report
+    }
+    return result
+
+
+def build_dynamic_recovery_model(**params) -> RecoveryModel:
+    """
+    构建负荷转移优化的SCIP模型（不求解）。
+    所有按节点/开关查找的约束都通过预计算的关联索引完成，建模耗时与拓扑规模呈线性关系。
+    """
+    return RecoveryModel(**params)
+
+
+def load_or_build_model(options: dict = None, **params):
+    """
+    从模型磁盘缓存（model_cache）读入与输入拓扑一致的模型，未命中时新建模型并写入缓存。
+    :return: (RecoveryModel, 是否读自缓存)；读自缓存的模型数值参数为写入时的取值，需再调用 update()
+    """
+    key = topology_fingerprint(_normalize_params(params), options)
+    entry = model_cache.load_entry(key)
+    if entry is not None:
+        path, meta = entry
+        try:
+            return RecoveryModel.from_file(path, meta, options), True
+        except Exception as e:
+            print(f"Model cache entry {key} could not be loaded: {e}")
+            model_cache.remove_entry(key)
+    recovery_model = RecoveryModel(options, **params)
+    if recovery_model.formulation != "lazy_cuts":
+        model_cache.store_entry(key, recovery_model.write_file)
+    return recovery_model, False
+
+
+def get_model_template(options: dict = None, disk_cache: bool = False, **params):
+    """
+    获取与输入拓扑一致的模型模板：命中时只增量更新数值参数，否则新建模型（disk_cache 时先尝试读入磁盘缓存）并缓存；
+    模板累计提交的部分解超过 MAX_TEMPLATE_PARTIAL_STARTS 时重新建模。
+    :return: (RecoveryModel, 是否复用了已有模型（内存模板或磁盘缓存），复用时需调用 update())
+    """
+    key = topology_fingerprint(_normalize_params(params), options)
+    with _model_templates_lock:
+        template = _model_templates.get(key)
+        if template is not None:
+            _model_templates.move_to_end(key)
+    if template is not None and template._partial_starts < MAX_TEMPLATE_PARTIAL_STARTS:
+        return template, True
+    # 未命中，或模板累计的部分解过多（拖慢每次求解的completesol）时重新建模并替换
+    if disk_cache:
+        template, loaded = load_or_build_model(options, **params)
+    else:
+        template, loaded = RecoveryModel(options, **params), False
+    with _model_templates_lock:
+        _model_templates[key] = template
+        while len(_model_templates) > MAX_MODEL_TEMPLATES:
+            _model_templates.popitem(last=False)
+    return template, loaded
+
+
+def clear_model_templates():
+    """清空模型模板缓存"""
+    with _model_templates_lock:
+        _model_templates.clear()
+
+
+def supports_template(solver_settings) -> bool:
+    """求解器设置能否复用模型模板（use_template）：只有直接建模求解可以，标准形式求解（backend）不构建模型"""
+    return SolverSettings.model_validate(solver_settings or {}).backend is None
+
+
+def generate_operation_sequence(substation_nodes: list, switches: dict, final_switch_states: dict) -> list:
+    """
+    根据开关的初始状态和最终状态生成开关刀闸操作顺序
+    :param substation_nodes: 节点
+    :param switches: 开关（含初始状态）
+    :param final_switch_states: 优化得到的开关最终状态
+    :return: 操作步骤列表
+    """
+    power_graph = build_power_system_graph(substation_nodes, switches)
+    operations = []
+    edges = {}
+    breakers_operate = {}
+    switches_operate = {}
+    for edge in list(power_graph.edges(data=True)):
+        edge_name = edge[2]['switch_name']
+        edges[edge_name] = edge
+        if edge[2]['switch_type'] == 'breaker':
+            # 无需操作
+            if final_switch_states[edge_name] == edge[2]['initial_state']:
+                breakers_operate[edge_name] = 0
+            # 由分到合
+            elif final_switch_states[edge_name] == 1 and edge[2]['initial_state'] == 0:
+                breakers_operate[edge_name] = 1
+            # 由合到分
+            elif final_switch_states[edge_name] == 0 and edge[2]['initial_state'] == 1:
+                breakers_operate[edge_name] = 2
+        elif edge[2]['switch_type'] == 'switch':
+            # 无需操作
+            if final_switch_states[edge_name] == edge[2]['initial_state']:
+                switches_operate[edge_name] = 0
+            # 由分到合
+            elif final_switch_states[edge_name] == 1 and edge[2]['initial_state'] == 0:
+                switches_operate[edge_name] = 1
+            # 由合到分
+            elif final_switch_states[edge_name] == 0 and edge[2]['initial_state'] == 1:
+                switches_operate[edge_name] = 2
+    # 先进行双母线倒排操作
+    for close_switch_name, operate in switches_operate.items():
+        if operate == 1:
+            # 找到需要分闸的刀闸，应与合闸刀闸相连
+            u = edges[close_switch_name][0]
+            v = edges[close_switch_name][1]
+            connected_edges = get_connected_edges_with_attrs(power_graph, u, v)
+            for edge in connected_edges:
+                if edge[2]['switch_type'] == 'switch':
+                    open_switch_name = edge[2]['switch_name']
+                    if switches_operate[open_switch_name] == 2:
+                        operations.append(f"{close_switch_name}【刀闸合闸】")
+                        print(f"1、{close_switch_name}【刀闸合闸】")
+                        switches_operate[close_switch_name] = 0
+                        operations.append(f"{open_switch_name}【刀闸分闸】")
+                        print(f"1、{open_switch_name}【刀闸分闸】")
+                        switches_operate[open_switch_name] = 0
                         break
-                # 合闸操作，若找到与开关相连的需合闸的刀闸，则先合刀闸
+    # 再操作开关及其刀闸
+    for breaker_name, operate in breakers_operate.items():
+        if operate == 1:
+            # 找到需要分闸的开关，应与合闸开关两端的连通子图相连
+            close_conn_graph = edges[breaker_name][2]['connected_components']
+            open_breaker = "not_find"
+            for open_breaker_name, open_operate in breakers_operate.items():
+                if open_operate == 2:
+                    open_conn_graph = edges[open_breaker_name][2]['connected_components']
+                    if open_conn_graph[0] in close_conn_graph or open_conn_graph[1] in close_conn_graph:
+                        open_breaker = open_breaker_name
+                if open_breaker != "not_find":
+                    break
+            # 合闸操作，若找到与开关相连的需合闸的刀闸，则先合刀闸
+            # 获取与开关相连的所有边
+            u = edges[breaker_name][0]
+            v = edges[breaker_name][1]
+            connected_edges = get_connected_edges_with_attrs(power_graph, u, v)
+            for edge in connected_edges:
+                if edge[2]['switch_type'] == 'switch':
+                    switch_name = edge[2]['switch_name']
+                    if switches_operate[switch_name] == 1:
+                        operations.append(f"{switch_name}【刀闸合闸】")
+                        print(f"2、{switch_name}【刀闸合闸】")
+                        switches_operate[switch_name] = 0
+            operations.append(f"{breaker_name}【开关合闸】")
+            print(f"2、{breaker_name}【开关合闸】")
+            breakers_operate[breaker_name] = 0
+            # 分闸开关操作
+            if open_breaker != "not_find":
+                operations.append(f"{open_breaker}【开关分闸】")
+                print(f"3、{open_breaker}【开关分闸】")
+                breakers_operate[open_breaker] = 0
+                # 若找到与开关相连的需分闸的刀闸，则分刀闸
                 # 获取与开关相连的所有边
-                u = edges[breaker_name][0]
-                v = edges[breaker_name][1]
+                u = edges[open_breaker][0]
+                v = edges[open_breaker][1]
                 connected_edges = get_connected_edges_with_attrs(power_graph, u, v)
                 for edge in connected_edges:
                     if edge[2]['switch_type'] == 'switch':
                         switch_name = edge[2]['switch_name']
-                        if switches_operate[switch_name] == 1:
-                            operations.append(f"{switch_name}【刀闸合闸】")
-                            print(f"2、{switch_name}【刀闸合闸】")
+                        if switches_operate[switch_name] == 2:
+                            operations.append(f"{switch_name}【刀闸分闸】")
+                            print(f"3、{switch_name}【刀闸分闸】")
                             switches_operate[switch_name] = 0
-                operations.append(f"{breaker_name}【开关合闸】")
-                print(f"2、{breaker_name}【开关合闸】")
-                breakers_operate[breaker_name] = 0
-                # 分闸开关操作
-                if open_breaker != "notfind":
-                    operations.append(f"{open_breaker}【开关分闸】")
-                    print(f"3、{open_breaker}【开关分闸】")
-                    breakers_operate[open_breaker] = 0
-                    # 若找到与开关相连的需分闸的刀闸，则分刀闸
-                    # 获取与开关相连的所有边
-                    u = edges[open_breaker][0]
-                    v = edges[open_breaker][1]
-                    connected_edges = get_connected_edges_with_attrs(power_graph, u, v)
-                    for edge in connected_edges:
-                        if edge[2]['switch_type'] == 'switch':
-                            switch_name = edge[2]['switch_name']
-                            if switches_operate[switch_name] == 2:
-                                operations.append(f"{switch_name}【刀闸分闸】")
-                                print(f"3、{switch_name}【刀闸分闸】")
-                                switches_operate[switch_name] = 0
-        result = {
-            "status": "Optimal Solution Found",
-            "objective_value": round(model.getObjVal(), 4),
-            # --- 更新此处，反映成本 ---
-            "summary": {
-                "operation_cost": round(model.getVal(op_cost), 4),
-                "safety_region_percent": round(model.getVal(min_safety_region)*100, 2),
-                "total_operations_count": op_count
-            },
-            "results": {
-                "time_slots": [f"{(datetime.now() + timedelta(hours=t)).strftime('%H:%M')}" for t in range(horizon)],
-                "switch_operations": switch_operations,
-                "final_transformer_assignment": final_transformer_assignment,
-                "final_zone_status": final_zone_status,
-                "final_switch_states": final_switch_states,
-                "initial_sw_states": initial_sw_states,
-                "operations": operations,
-                "dispatch_plan": final_dispatch_plan
-            }
-        }
+    return operations
+
+def solve_dynamic_recovery_model(
+    # --- 输入参数 ---
+    horizon: int,
+    # 区域与负荷
+    zones: dict,
+    zone_lines: dict,
+    transformers: dict, # 包含时序负荷和供电成本
+    # 拓扑
+    substation_nodes: list,
+    switches: dict,
+    # 发电与储能
+    operating_units: dict,
+    backup_units: dict, # 包含启动成本
+    hydro_units: dict,
+    storage_units: dict,
+    interruptible_loads: dict,
+    # 优化目标
+    objective: ObjectiveType,
+    # 求解器设置（初始解等），dict 或 SolverSettings
+    solver_settings: dict = None,
+    # 复用同一拓扑的已构建模型，仅增量更新数值参数
+    use_template: bool = False,
+    # 每找到一个新的最好解时调用 on_incumbent(summary)，用于流式推送
+    on_incumbent=None
+):
+    """
+    求解一个完整的多层级、基于连通性推断的电网负荷转移优化问题。
+    此函数接收所有参数（包括开关成本），并返回一个包含结果的字典。
+    """
+    params = dict(
+        horizon=horizon, zones=zones, zone_lines=zone_lines, transformers=transformers,
+        substation_nodes=substation_nodes, switches=switches,
+        operating_units=operating_units, backup_units=backup_units, hydro_units=hydro_units,
+        storage_units=storage_units, interruptible_loads=interruptible_loads, objective=objective)
+    settings = SolverSettings.model_validate(solver_settings or {})
+    blocks = None
+    if settings.time_aggregation:
+        original_params = params
+        blocks = aggregation_blocks(params, settings.aggregation_tolerance, settings.coarsen_after, settings.coarsen_block)
+        params = aggregate_params(params, blocks)
+        print(f"Time aggregation: {original_params['horizon']} -> {len(blocks)} steps")
+    if settings.parallel_islands:
+        islands = independent_islands(params)
+        if len(islands) > 1:
+            print(f"Independent islands: {len(islands)}")
+            result = solve_independent_islands(params, settings, islands, settings.island_workers)
+            if result is not None and blocks is not None:
+                result = expand_result(result, original_params, blocks)
+            return result
+    if settings.backend is not None:
+        # 标准形式求解不构建 PySCIPOpt 模型，没有可复用的模板，也不回调新解
+        if use_template or on_incumbent is not None:
+            raise ValueError(f"backend={settings.backend} 使用稀疏标准形式求解，不支持 use_template/on_incumbent")
+        result = solve_standard_form(params, settings)
+        if result is not None and blocks is not None:
+            result = expand_result(result, original_params, blocks)
         return result
+    if settings.decomposition:
+        result = solve_decomposed_recovery(params, settings, on_incumbent)
+        if result is not None and blocks is not None:
+            result = expand_result(result, original_params, blocks)
+        return result
+    if use_template:
+        recovery_model, reused = get_model_template(model_options(settings), settings.model_cache, **params)
+    elif settings.model_cache:
+        recovery_model, reused = load_or_build_model(model_options(settings), **params)
     else:
+        recovery_model, reused = RecoveryModel(model_options(settings), **params), False
+    with recovery_model.lock:
+        if reused:
+            recovery_model.update(**params)
+        recovery_model.set_incumbent_callback(on_incumbent)
+        try:
+            status = recovery_model.run(settings)
+        finally:
+            recovery_model.set_incumbent_callback(None)
+        # 到达时间/间隙/节点上限时返回当前最好可行解，由 solver.termination 说明终止原因
+        if not recovery_model.has_solution():
+            print(f"No feasible solution found, status: {status}")
+            return None
+        recovery_model.store_solution()
+        result = recovery_model.extract_result()
+        if settings.alternative_plans and settings.objective_mode == "weighted":
+            result["alternatives"] = recovery_model.alternative_plans(
+                settings.alternative_plans, settings.alternative_search,
+                settings.time_limit, settings.mip_gap, settings.node_limit)
+    if blocks is not None:
+        result = expand_result(result, original_params, blocks)
+    return result
+
+def refresh_time_labels(result: dict) -> dict:
+    """按当前时间重新生成结果中的时段标签（time_slots 及调度计划各时段的 time），用于返回缓存的结果"""
+    results = result.get("results") or {}
+    if "time_slots" not in results:
+        return result
+    labels = [(datetime.now() + timedelta(hours=t)).strftime("%H:%M") for t in range(len(results["time_slots"]))]
+    results["time_slots"] = labels
+    for plan, label in zip(results.get("dispatch_plan") or [], labels):
+        plan["time"] = label
+    return result
+
+def solve_with_result_cache(bypass_cache: bool = False, use_template: bool = False, **params):
+    """
+    带结果缓存的 solve_dynamic_recovery_model：以输入（含目标和求解器设置，未给出的设置取默认值）的规范化哈希为键，
+    命中进程内或Redis缓存时直接返回缓存结果（时段标签按当前时间重新生成），不再求解；未命中时同一输入的并发请求合并为一次求解，共享其结果。
+    命中与未命中返回的结果形式相同（均经 result_cache.normalize_result 规范化）。
+    :param bypass_cache: 为 True 时跳过缓存查找，求解后仍写入缓存
+    :param use_template: 未命中时是否复用模型模板求解，不参与缓存键计算
+    :return: 与 solve_dynamic_recovery_model 相同，solver.result_cache 为 "memory"/"redis"/"miss"/"bypass"，
+             合并到进行中求解的请求为 "coalesced"
+    """
+    cache = get_result_cache()
+    settings = SolverSettings.model_validate(params.get("solver_settings") or {})
+    key = canonical_key(dict(params, solver_settings=settings.model_dump()))
+    if not bypass_cache:
+        result, tier = cache.get(key)
+        if result is not None:
+            refresh_time_labels(result)
+            result.setdefault("solver", {})["result_cache"] = tier
+            return result
+
+    def solve():
+        # 缓存前后结果形式一致：未命中时同样返回规范化（JSON往返）后的结果
+        return cache.put(key, solve_dynamic_recovery_model(**params, use_template=use_template))
+
+    result, coalesced = get_single_flight().do(key, solve)
+    if result is not None:
+        result.setdefault("solver", {})["result_cache"] = "coalesced" if coalesced else "bypass" if bypass_cache else "miss"
+    return result
+
+def choose_backend(key) -> str:
+    """backend="auto" 的引擎选择：该结构下尚未用过的引擎优先（按 AUTO_BACKENDS 顺序），都用过后选耗时最短的"""
+    with _backend_timings_lock:
+        timings = _backend_timings.get(key, {})
+        if key in _backend_timings:
+            _backend_timings.move_to_end(key)
+    untried = [name for name in AUTO_BACKENDS if name not in timings]
+    return untried[0] if untried else min(timings, key=timings.get)
+
+
+def record_backend_time(key, backend: str, seconds: float):
+    """记录引擎在该结构下的求解耗时"""
+    with _backend_timings_lock:
+        _backend_timings.setdefault(key, {})[backend] = seconds
+        _backend_timings.move_to_end(key)
+        while len(_backend_timings) > MAX_BACKEND_TIMINGS:
+            _backend_timings.popitem(last=False)
+
+
+def solve_standard_form(params: dict, settings: SolverSettings) -> dict:
+    """
+    编译为稀疏标准形式（standard_form.compile_standard_form）后用 settings.backend 指定的求解引擎求解，
+    加权/分层目标与 RecoveryModel 一致。backend="auto" 时同一结构的前几次求解依次试用各引擎，之后固定用耗时最短的。不支持初始解和新解回调；建模选项须为未加强的多商品流。
+    :return: 与 solve_dynamic_recovery_model 相同格式的结果字典，solver.backend 为求解引擎，
+             solver.standard_form 给出模型规模和编译耗时；没有可行解时返回 None
+    """
+    p = _normalize_params(params)
+    start = time.perf_counter()
+    options = dict(MODEL_OPTIONS, **model_options(settings))
+    form = compile_standard_form(p, options)
+    compile_time = time.perf_counter() - start
+    timing_key = None
+    if settings.backend == "auto":
+        timing_key = (topology_fingerprint(p, options), p["objective"], settings.objective_mode)
+        backend = get_backend(choose_backend(timing_key))
+    else:
+        backend = get_backend(settings.backend)
+    objective = ObjectiveType(p["objective"])
+    stages, x = None, None
+    if settings.objective_mode == "lexicographic":
+        # 分层求解：每层将上一层目标值（加容差）作为约束，时间上限为各层合计
+        stages, extra_rows = [], []
+        for level, stage_objective in enumerate([objective] + [o for o in ObjectiveType if o != objective]):
+            c, offset = form.stage_objective(stage_objective, level)
+            remaining = None if settings.time_limit is None else max(settings.time_limit - (time.perf_counter() - start), 0.01)
+            solution = backend.solve(form, c, offset, extra_rows, remaining, settings.mip_gap, settings.node_limit)
+            if solution["x"] is None:
+                break
+            x = solution["x"]
+            stages.append({"objective": stage_objective.value, "value": solution["objective"], "status": solution["termination"],
+                           "solve_time": round(solution["solve_time"], 3), "nodes": solution["nodes"]})
+            if solution["termination"] != "optimal":
+                break
+            if level == 0:
+                primary = (c, offset)
+            bound = lexicographic_bound(solution["objective"], settings.lexicographic_tolerance, stage_objective)
+            extra_rows.append((c, -np.inf, bound - offset))
+    else:
+        c, offset = form.weighted_objective(objective, SECONDARY_OBJECTIVE_WEIGHT)
+        solution = backend.solve(form, c, offset, (), settings.time_limit, settings.mip_gap, settings.node_limit)
+        x = solution["x"]
+    if timing_key is not None:
+        # 未求得可行解的引擎记为无穷大耗时
+        record_backend_time(timing_key, backend.name, time.perf_counter() - start if x is not None else float("inf"))
+    if x is None:
+        print(f"No feasible solution found, status: {solution['termination']}")
+        return None
+    # 分层求解时报告返回方案的主目标值
+    objective_value = float(primary[0] @ x + primary[1]) if stages else solution["objective"]
+    report = {
+        "termination": solution["termination"],
+        "primal_bound": round(solution["objective"], 6) if solution["x"] is not None else None,
+        "dual_bound": round(solution["dual_bound"], 6) if solution["dual_bound"] is not None else None,
+        "gap": round(solution["gap"], 6) if solution["gap"] is not None else None,
+        "solve_time": round(solution["solve_time"], 3),
+        "nodes": solution["nodes"],
+        "backend": backend.name,
+        "standard_form": dict(form.stats(), compile_time=round(compile_time, 3)),
+    }
+    if stages is not None:
+        report["objective_mode"] = "lexicographic"
+        report["stages"] = stages
+        report["solve_time"] = round(sum(stage["solve_time"] for stage in stages), 3)
+        report["nodes"] = sum(stage["nodes"] for stage in stages)
+    cost, cost_offset = form.objective_terms[ObjectiveType.MIN_COST]
+    return assemble_result(p, form.value_of(x), float(cost @ x + cost_offset), solution["termination"], objective_value, report)
+
+
+def solve_decomposed_recovery(params: dict, settings: SolverSettings, on_incumbent=None) -> dict:
+    """
+    拓扑/调度分解求解（Benders分解）。开关状态、主变归属和分区标号与时段无关，调度部分随时段数和机组数增长：
+    - 主问题：dispatch=False 的 RecoveryModel（拓扑、归属、开关操作、主变供电成本、最小安全裕度 m），
+      每个供区增加变量 theta[z] 表示该供区的调度成本；
+    - 子问题：每个供区一个调度LP（ZoneDispatchSubproblem，备用机组启停松弛），在线程池中并行求解，
+      由 BendersConshdlr 在分支定界中按需添加最优性割，功率/裕度缺额的罚项使割同时起可行性割的作用；
+    - 主问题求解结束后固定其最优方案的开关状态和主变归属，在完整模型上精确求解调度（含备用机组启停整数约束），
+      得到与直接求解相同格式的结果。
+    设置 time_limit 时主问题最多使用其中 1 - DECOMPOSITION_DISPATCH_SHARE 的时间，其余留给最后的调度求解；
+    调度求解超时仍无可行解时退回主问题方案，按贪心规则安排调度（heuristic_dispatch_result），solver.decomposition.dispatch_fallback 为 True。
+    主问题的分支定界中每个候选解都要求解子问题，时段少、机组少的算例上可能比直接求解慢得多，
+    decomposition_master_time_limit 限制主问题的求解时间（未设置 time_limit 时同样生效）。
+    :param params: 与 solve_dynamic_recovery_model 相同的输入参数
+    :param settings: 求解器设置，time_limit 为包括最后调度求解在内的总时间
+    :param on_incumbent: 最后调度求解中每找到一个新的最好解时的回调
+    :return: 结果字典，solver.decomposition 给出主问题界、割数和各部分耗时；没有可行解时返回 None
+    """
+    p = _normalize_params(params)
+    start = time.perf_counter()
+    zones = p["zones"]
+    options = model_options(settings)
+
+    def remaining(share: float = 1.0):
+        return None if settings.time_limit is None else max(settings.time_limit * share - (time.perf_counter() - start), 0.01)
+
+    master = RecoveryModel(dict(options, dispatch=False), **p)
+    model = master.model
+    subproblems = {z_name: ZoneDispatchSubproblem(z_name, p, master.dispatch_weight) for z_name in zones}
+    # 主问题中 m 只出现在目标函数和割中，用各供区的最大可能裕度限定其上界
+    model.chgVarUb(master.min_safety_region, min([sp.max_safety_ratio for sp in subproblems.values()] + [1.0]))
+    # 成本均非负，各供区调度成本的下界为0
+    theta = {z_name: model.addVar(vtype="C", lb=0, obj=1.0, name=f"theta_{z_name}") for z_name in zones}
+    with ThreadPoolExecutor(max_workers=settings.decomposition_workers or max(len(subproblems), 1)) as pool:
+        benders = BendersConshdlr(master, subproblems, theta, pool, settings.decomposition_tolerance)
+        model.includeConshdlr(benders, "dispatch_cuts", "zone dispatch optimality cuts", enfopriority=-1, chckpriority=-2)
+        model.addPyCons(model.createCons(benders, "dispatch_cuts"))
+        if settings.warm_start in ("auto", "heuristic"):
+            plan = greedy_recovery_plan(**p)
+            if not plan["violations"]:
+                master._add_partial_start("heuristic", plan["switch_states"], plan["assignment"])
+        master_limit = remaining(1 - DECOMPOSITION_DISPATCH_SHARE)
+        if settings.decomposition_master_time_limit is not None:
+            master_limit = min(master_limit or float("inf"), settings.decomposition_master_time_limit)
+        master.set_limits(master_limit, settings.mip_gap, settings.node_limit)
+        master_status = master.optimize()
+    if not master.has_solution():
+        print(f"Decomposition master problem has no solution, status: {master_status}")
+        return None
+    switch_states = {name: round(model.getVal(var)) for name, var in master.S.items()}
+    assignment = {t_name: next((z_name for z_name in zones if model.getVal(master.y[t_name, z_name]) > 0.5), None)
+                  for t_name in p["transformers"]}
+    master_report = master.solver_report()
+
+    # 固定开关状态和主变归属，在完整模型上求解调度
+    recovery_model = RecoveryModel(options, **p)
+    final = recovery_model.model
+    fixed_keys = [("S", name) for name in recovery_model.S] + [("y",) + key for key in recovery_model.y]
+    for key in fixed_keys:
+        state = switch_states[key[1]] if key[0] == "S" else int(assignment[key[1]] == key[2])
+        final.chgVarLb(recovery_model.vars[key], state)
+        final.chgVarUb(recovery_model.vars[key], state)
+    recovery_model._add_partial_start("decomposition", switch_states, assignment)
+    recovery_model.set_incumbent_callback(on_incumbent)
+    try:
+        recovery_model.set_limits(remaining(), settings.mip_gap, settings.node_limit)
+        status = recovery_model.optimize()
+        if not recovery_model.has_solution() and status == "infeasible":
+            # 备用机组启停为整数时方案可能不可行：放开固定，以该方案为初始解求解完整模型
+            print("Decomposition plan infeasible with integer dispatch, solving the full model")
+            final.freeTransform()
+            for key in fixed_keys:
+                lb, ub = recovery_model._bounds[key]
+                final.chgVarLb(recovery_model.vars[key], lb)
+                final.chgVarUb(recovery_model.vars[key], ub)
+            recovery_model._add_partial_start("decomposition", switch_states, assignment)
+            recovery_model.set_limits(remaining(), settings.mip_gap, settings.node_limit)
+            status = recovery_model.optimize()
+    finally:
+        recovery_model.set_incumbent_callback(None)
+    fallback = not recovery_model.has_solution()
+    if fallback and status == "infeasible":
+        print(f"No feasible solution found, status: {status}")
         return None
+    if fallback:
+        # 调度求解超时：退回主问题方案，调度按贪心规则安排
+        print(f"Decomposition dispatch found no solution ({status}), returning the master plan")
+        result = heuristic_dispatch_result(p, {"switch_states": switch_states, "assignment": assignment, "violations": [],
+                                               "iterations": 0, "time": master_report["solve_time"]})
+        overloaded = [f"供区 {z_name} 容量不足" for z_name, zone in result["results"]["final_zone_status"].items()
+                      if zone["status"] != "安全"]
+        result["solver"].update(termination=status, feasible=not overloaded, violations=overloaded)
+        result["status"] = "Feasible Solution Found"
+    else:
+        result = recovery_model.extract_result()
+    if master_status != "optimal":
+        result["status"] = "Feasible Solution Found"
+    result["solver"]["decomposition"] = {
+        "master_termination": master_status,
+        "lower_bound": master_report["dual_bound"],
+        "upper_bound": master_report["primal_bound"],
+        "gap": master_report["gap"],
+        "nodes": master_report["nodes"],
+        "cuts": benders.ncuts,
+        "subproblems": len(subproblems),
+        "evaluations": benders.evaluations,
+        "master_time": master_report["solve_time"],
+        "subproblem_time": round(benders.subproblem_time, 3),
+        "dispatch_time": round(final.getSolvingTime(), 3),
+        "dispatch_fallback": fallback,
+        "total_time": round(time.perf_counter() - start, 3),
+    }
+    return result
+
+
+def solve_heuristic_recovery(**params) -> dict:
+    """
+    用贪心构造启发式（recovery_heuristic.greedy_recovery_plan）在不求解MIP的情况下给出初步方案，
+    返回与 solve_dynamic_recovery_model 相同格式的结果字典。机组保持当前出力，供区容量不足时
+    依次增加运行机组、水电出力并切除可中断负荷；status 为 "Heuristic Solution"，
+    solver.violations 列出方案不满足的约束。
+    """
+    p = _normalize_params(params)
+    return heuristic_dispatch_result(p, greedy_recovery_plan(**p))
+
+
+def heuristic_dispatch_result(p: dict, plan: dict) -> dict:
+    """
+    按给定的开关方案和主变归属，用贪心规则安排调度并组装结果字典（见 solve_heuristic_recovery）
+    :param p: 规范化后的优化输入
+    :param plan: greedy_recovery_plan 格式的方案 {"switch_states", "assignment", "violations", "iterations", "time"}
+    """
+    horizon, zones, transformers = p["horizon"], p["zones"], p["transformers"]
+    operating_units, hydro_units = p["operating_units"], p["hydro_units"]
+    storage_units, interruptible_loads = p["storage_units"], p["interruptible_loads"]
+    T = range(horizon)
+    final_switch_states = plan["switch_states"]
+    initial_sw_states = {name: sw["initial_state"] for name, sw in p["switches"].items()}
+    switch_operations = [{
+        "switch_name": name, "initial_state": initial_state, "final_state": final_switch_states[name],
+        "action": "合闸 (Close)" if final_switch_states[name] == 1 else "分闸 (Open)",
+        "cost": p["switches"][name].get("cost", 1.0)
+    } for name, initial_state in initial_sw_states.items() if initial_state != final_switch_states[name]]
+
+    # 各供区各时段的裕度：容量 - 固定负荷 - 主变负荷 + 当前出力，不足时按顺序增加出力/切负荷
+    output = {(g, t): 0.0 for g in list(operating_units) + list(hydro_units) for t in T}
+    shed = {(il, t): 0.0 for il in interruptible_loads for t in T}
+    safety = {}
+    for z_name, z_params in zones.items():
+        for t in T:
+            margin = z_params['capacity'] - z_params['fixed_load'][t] - sum(
+                t_params['load'][t] * t_params['sensitivity'][z_name]
+                for t_name, t_params in transformers.items() if plan["assignment"][t_name] == z_name)
+            margin += sum(u['p_current'] * u['sensitivity'] for u in operating_units.values() if u['zone'] == z_name)
+            margin += sum(u['p_current'] * u['sensitivity'] for u in storage_units.values() if u['zone'] == z_name)
+            adjustable = [(g, u['sensitivity'], u['p_max'] - u['p_current']) for g, u in operating_units.items() if u['zone'] == z_name] + \
+                [(g, u['sensitivity'], u['p_max'] if u.get('available', True) else 0) for g, u in hydro_units.items() if u['zone'] == z_name]
+            for g, sensitivity, headroom in adjustable:
+                if margin >= 0 or sensitivity <= 0:
+                    continue
+                output[g, t] = min(headroom, -margin / sensitivity)
+                margin += output[g, t] * sensitivity
+            for il, u in interruptible_loads.items():
+                if margin < 0 and u['zone'] == z_name:
+                    shed[il, t] = min(u['shed_max'], -margin)
+                    margin += shed[il, t]
+            safety[z_name, t] = margin
+
+    t_end = horizon - 1
+    # 时段聚合后各时段按所代表的原时段数加权，与 RecoveryModel._set_objective 一致
+    w = p["time_weights"] or [1] * horizon
+    op_cost = sum(w[t] * u['cost'] * (output[g, t] + u['p_current']) for g, u in operating_units.items() for t in T) + \
+        sum(w[t] * u['cost'] * output[g, t] for g, u in hydro_units.items() for t in T) + \
+        sum(t_params['load'][t_end] * t_params['sensitivity'][zone] * t_params['cost'][zone]
+            for t_name, t_params in transformers.items() for zone in [plan["assignment"][t_name]] if zone)
+    shedding_cost = sum(w[t] * u['cost'] * shed[il, t] for il, u in interruptible_loads.items() for t in T)
+    switch_cost = sum(op["cost"] for op in switch_operations)
+    min_safety = min([safety[key] / zones[key[0]]['capacity'] for key in safety] + [float("inf")])
+    min_safety = min_safety if min_safety != float("inf") else 0.0
+    terms = {ObjectiveType.MIN_SWITCH_OP: switch_cost, ObjectiveType.MAX_SAFETY_REGION: -min_safety, ObjectiveType.MIN_COST: op_cost}
+    max_cost = max([u['cost'] * u['p_max'] for u in operating_units.values()] + [1.0])
+    objective_value = terms[ObjectiveType(p["objective"])] + shedding_cost + \
+        SECONDARY_OBJECTIVE_WEIGHT * (switch_cost - min_safety + op_cost / max_cost)
+
+    final_transformer_assignment = {t_name: {"assigned_zone": plan["assignment"][t_name] or "失电", "load": t_params['load']}
+                                    for t_name, t_params in transformers.items()}
+    final_zone_status = {}
+    for z_name, z_params in zones.items():
+        capacity = z_params['capacity']
+        load = [round(capacity - safety[z_name, t], 2) for t in T]
+        final_zone_status[z_name] = {
+            "final_load": load,
+            "capacity": capacity,
+            "status": "安全" if max(load) <= capacity else "过载!",
+            "safety_region_percent": [round(safety[z_name, t] / capacity * 100, 2) for t in T]
+        }
+    final_dispatch_plan = []
+    for t in T:
+        final_dispatch_plan.append({
+            "time": (datetime.now() + timedelta(hours=t)).strftime("%H:%M"),
+            "generation": dict({g: round(output[g, t] + u['p_current'], 2) for g, u in operating_units.items()},
+                               **{g: 0.0 for g in p["backup_units"]},
+                               **{g: round(output[g, t], 2) for g in hydro_units}),
+            "storage": {es: {"power_mw": round(u['p_current'], 2), "soc_mwh": round(u['soc_initial'], 2)} for es, u in storage_units.items()},
+            "shedding": {il: round(shed[il, t], 2) for il in interruptible_loads},
+        })
+    return {
+        "status": "Heuristic Solution",
+        "objective_value": round(objective_value, 4),
+        "summary": {
+            "operation_cost": round(op_cost, 4),
+            "safety_region_percent": round(min_safety * 100, 2),
+            "total_operations_count": len(switch_operations)
+        },
+        "results": {
+            "time_slots": [f"{(datetime.now() + timedelta(hours=t)).strftime('%H:%M')}" for t in T],
+            "switch_operations": switch_operations,
+            "final_transformer_assignment": final_transformer_assignment,
+            "final_zone_status": final_zone_status,
+            "final_switch_states": final_switch_states,
+            "initial_sw_states": initial_sw_states,
+            "operations": generate_operation_sequence(p["substation_nodes"], p["switches"], final_switch_states),
+            "dispatch_plan": final_dispatch_plan
+        },
+        "solver": {
+            "termination": "heuristic",
+            "feasible": not plan["violations"],
+            "violations": plan["violations"],
+            "iterations": plan["iterations"],
+            "solve_time": plan["time"],
+        }
+    }
+
+# 多目标并行求解时由父进程构建、fork 出的子进程共享的模型（写时复制，子进程只修改目标函数）
+_shared_model = None
+_shared_model_lock = threading.Lock()
+
+
+def _solve_objective(params: dict, objective: ObjectiveType, solver_settings: dict) -> dict:
+    """进程池工作函数：在共享模型（或无法 fork 时新建的模型）上设置目标函数并求解"""
+    global _shared_model
+    start = time.perf_counter()
+    params = dict(params, objective=objective)
+    settings = SolverSettings.model_validate(solver_settings or {})
+    recovery_model = _shared_model
+    if recovery_model is None or \
+            recovery_model.fingerprint != topology_fingerprint(_normalize_params(params), model_options(settings)):
+        recovery_model = RecoveryModel(model_options(settings), **params)
+    else:
+        recovery_model.params = _normalize_params(params)
+        recovery_model._set_objective(recovery_model.params)
+    recovery_model.model.hideOutput()
+    recovery_model.run(settings)
+    result = recovery_model.extract_result() if recovery_model.has_solution() else None
+    return {"objective": objective, "result": result, "wall_time": round(time.perf_counter() - start, 3)}
+
+
+def plan_metrics(result: dict) -> dict:
+    """从求解结果中提取方案比较指标：开关操作成本/次数（越小越好）、最小安全裕度（越大越好）、发电运行成本（越小越好）"""
+    return {
+        "switch_cost": round(sum(op["cost"] for op in result["results"]["switch_operations"]), 4),
+        "operations_count": result["summary"]["total_operations_count"],
+        "safety_region_percent": result["summary"]["safety_region_percent"],
+        "operation_cost": result["summary"]["operation_cost"],
+    }
+
+
+def pareto_front(rows: list) -> list:
+    """
+    返回非支配方案的下标（指标完全相同的方案同时保留）。方案a支配b：a在开关操作成本、发电运行成本上不大于b，安全裕度不小于b，且至少一项严格更优。
+    :param rows: plan_metrics 返回的指标列表
+    """
+    def dominates(a, b):
+        no_worse = a["switch_cost"] <= b["switch_cost"] and a["operation_cost"] <= b["operation_cost"] and \
+            a["safety_region_percent"] >= b["safety_region_percent"]
+        better = a["switch_cost"] < b["switch_cost"] or a["operation_cost"] < b["operation_cost"] or \
+            a["safety_region_percent"] > b["safety_region_percent"]
+        return no_worse and better
+
+    front = []
+    for i, row in enumerate(rows):
+        if not any(dominates(other, row) for j, other in enumerate(rows) if j != i):
+            front.append(i)
+    return front
+
+
+def solve_all_objectives(objectives: list = None, max_workers: int = None, **params) -> dict:
+    """
+    在进程池中并行求解多个优化目标，返回各目标方案的比较表和非支配方案集合。
+    支持 fork 的平台上父进程只构建一次模型，子进程继承后仅替换目标函数；否则每个子进程各自建模。
+    :param objectives: 需要求解的目标列表，默认全部三个目标
+    :param max_workers: 进程数，默认与目标数相同
+    :param params: 与 solve_dynamic_recovery_model 相同的输入参数（objective 被忽略），可含 solver_settings
+    :return: {"comparison": [...], "pareto_front": [...], "plans": {objective: result}, "wall_time": 秒}
+    """
+    global _shared_model
+    objectives = [ObjectiveType(o) for o in (objectives or list(ObjectiveType))]
+    solver_settings = params.pop("solver_settings", None)
+    params = _normalize_params(params)
+    start = time.perf_counter()
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    with _shared_model_lock:
+        settings = SolverSettings.model_validate(solver_settings or {})
+        _shared_model = RecoveryModel(model_options(settings), **dict(params, objective=objectives[0])) \
+            if context.get_start_method() == "fork" else None
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers or len(objectives), mp_context=context) as pool:
+                outcomes = list(pool.map(_solve_objective, [params] * len(objectives), objectives,
+                                         [solver_settings] * len(objectives)))
+        finally:
+            _shared_model = None
+    comparison, plans = [], {}
+    for outcome in outcomes:
+        name = outcome["objective"].value
+        result = outcome["result"]
+        row = {"objective": name, "status": result["status"] if result else "No Solution Found",
+               "wall_time": outcome["wall_time"]}
+        if result:
+            row.update(plan_metrics(result))
+            row["termination"] = result["solver"]["termination"]
+            plans[name] = result
+        comparison.append(row)
+    solved = [row for row in comparison if row["objective"] in plans]
+    front = [solved[i]["objective"] for i in pareto_front([plan_metrics(plans[row["objective"]]) for row in solved])]
+    for row in comparison:
+        row["pareto_optimal"] = row["objective"] in front
+    return {
+        "comparison": comparison,
+        "pareto_front": front,
+        "plans": plans,
+        "wall_time": round(time.perf_counter() - start, 3),
+    }
+
+
+def _island_params(params: dict, island: dict, index: int) -> dict:
+    """孤岛的优化输入：块内的供区、节点、开关、线路、主变，以及所属供区在块内的机组（所属供区不存在的机组归入第一个孤岛）"""
+    island_params = dict(params)
+    for key in ("zones", "switches", "zone_lines", "transformers"):
+        island_params[key] = {name: params[key][name] for name in island[key]}
+    island_params["substation_nodes"] = island["substation_nodes"]
+    for key in UNIT_KEYS:
+        island_params[key] = {name: u for name, u in params[key].items()
+                              if u['zone'] in island_params["zones"] or (index == 0 and u['zone'] not in params["zones"])}
+    return island_params
+
+
+def _solve_island(params: dict, solver_settings: dict, cost_scale: float, safety_floor: float = None) -> dict:
+    """
+    进程池工作函数：求解一个孤岛，返回结果及合并目标值所需的各目标项取值
+    :param safety_floor: 非None时孤岛的最小安全裕度不低于该值，且目标函数中不再计入本孤岛的安全裕度
+                         （全网的最小安全裕度由其他孤岛决定时，本孤岛的裕度只需满足该下限）
+    """
+    start = time.perf_counter()
+    settings = SolverSettings.model_validate(solver_settings or {})
+    recovery_model = RecoveryModel(dict(model_options(settings), cost_scale=cost_scale), **params)
+    recovery_model.model.hideOutput()
+    if safety_floor is not None:
+        model = recovery_model.model
+        model.chgVarLb(recovery_model.min_safety_region, safety_floor)
+        switch_cost = recovery_model.objective_terms[ObjectiveType.MIN_SWITCH_OP]
+        recovery_model.objective_terms[ObjectiveType.MAX_SAFETY_REGION] = quicksum([])
+        primary = recovery_model.objective_terms[recovery_model.objective_order[0]]
+        model.setObjective(primary + recovery_model.load_shedding_cost + SECONDARY_OBJECTIVE_WEIGHT * (
+            switch_cost + recovery_model.op_cost / recovery_model.cost_scale), "minimize")
+    status = recovery_model.run(settings)
+    if not recovery_model.has_solution():
+        return {"result": None, "termination": status, "wall_time": round(time.perf_counter() - start, 3)}
+    model = recovery_model.model
+    terms = {
+        "switch_cost": model.getVal(recovery_model.objective_terms[ObjectiveType.MIN_SWITCH_OP]),
+        "min_safety": model.getVal(recovery_model.min_safety_region),
+        "op_cost": model.getVal(recovery_model.op_cost),
+        "shedding": model.getVal(recovery_model.load_shedding_cost),
+    }
+    return {"result": recovery_model.extract_result(), "terms": terms, "termination": status,
+            "wall_time": round(time.perf_counter() - start, 3)}
+
+
+def merge_island_results(params: dict, outcomes: list, objective_mode: str, cost_scale: float) -> dict:
+    """
+    将各孤岛的结果合并为与 solve_dynamic_recovery_model 相同格式的结果字典：
+    开关操作、主变归属、供区状态、调度计划取并集，操作成本和开关操作次数求和，最小安全裕度取各孤岛的最小值，
+    目标值按全网的目标函数由各孤岛的目标项重新计算。
+    """
+    p = _normalize_params(params)
+    results = [outcome["result"] for outcome in outcomes]
+    terms = {key: sum(outcome["terms"][key] for outcome in outcomes) for key in ("switch_cost", "op_cost", "shedding")}
+    terms["min_safety"] = min(outcome["terms"]["min_safety"] for outcome in outcomes)
+    primary = {
+        ObjectiveType.MIN_SWITCH_OP: terms["switch_cost"],
+        ObjectiveType.MAX_SAFETY_REGION: -terms["min_safety"],
+        ObjectiveType.MIN_COST: terms["op_cost"],
+    }[ObjectiveType(p["objective"])]
+    objective_value = primary + terms["shedding"]
+    if objective_mode == "lexicographic" and ObjectiveType(p["objective"]) != ObjectiveType.MAX_SAFETY_REGION:
+        # 分层求解报告首层目标值，开关操作成本和发电成本可按孤岛相加
+        objective_value = sum(result["objective_value"] for result in results)
+    elif objective_mode != "lexicographic":
+        objective_value += SECONDARY_OBJECTIVE_WEIGHT * (terms["switch_cost"] - terms["min_safety"] + terms["op_cost"] / cost_scale)
+
+    final_switch_states, initial_sw_states, switch_operations = {}, {}, {}
+    final_transformer_assignment, final_zone_status = {}, {}
+    for result in results:
+        r = result["results"]
+        final_switch_states.update(r["final_switch_states"])
+        initial_sw_states.update(r["initial_sw_states"])
+        # 固定断开的开关可能同时属于两个孤岛，其状态不变，不会重复计入操作
+        switch_operations.update({op["switch_name"]: op for op in r["switch_operations"]})
+        final_transformer_assignment.update(r["final_transformer_assignment"])
+        final_zone_status.update(r["final_zone_status"])
+    dispatch_plan = []
+    for t, hourly_plan in enumerate(results[0]["results"]["dispatch_plan"]):
+        merged = {"time": hourly_plan["time"], "generation": {}, "storage": {}, "shedding": {}}
+        for result in results:
+            for key in ("generation", "storage", "shedding"):
+                merged[key].update(result["results"]["dispatch_plan"][t][key])
+        dispatch_plan.append(merged)
+
+    terminations = [outcome["termination"] for outcome in outcomes]
+    optimal = all(termination == "optimal" for termination in terminations)
+    return {
+        "status": "Optimal Solution Found" if optimal else "Feasible Solution Found",
+        "objective_value": round(objective_value, 4),
+        "summary": {
+            "operation_cost": round(terms["op_cost"], 4),
+            "safety_region_percent": round(terms["min_safety"] * 100, 2),
+            "total_operations_count": len(switch_operations),
+        },
+        "results": {
+            "time_slots": results[0]["results"]["time_slots"],
+            "switch_operations": list(switch_operations.values()),
+            "final_transformer_assignment": {t_name: final_transformer_assignment[t_name] for t_name in p["transformers"]},
+            "final_zone_status": {z_name: final_zone_status[z_name] for z_name in p["zones"]},
+            "final_switch_states": {name: final_switch_states[name] for name in p["switches"]},
+            "initial_sw_states": {name: initial_sw_states[name] for name in p["switches"]},
+            "operations": generate_operation_sequence(p["substation_nodes"], p["switches"], final_switch_states),
+            "dispatch_plan": dispatch_plan,
+        },
+        "solver": {
+            "termination": "optimal" if optimal else next(t for t in terminations if t != "optimal"),
+            "primal_bound": round(objective_value, 6),
+            "solve_time": round(max(result["solver"]["solve_time"] for result in results), 3),
+            "nodes": sum(result["solver"]["nodes"] for result in results),
+            "islands": [{
+                "zones": list(result["results"]["final_zone_status"]),
+                "switches": len(result["results"]["final_switch_states"]),
+                "termination": outcome["termination"],
+                "gap": result["solver"]["gap"],
+                "solve_time": result["solver"]["solve_time"],
+                "wall_time": outcome["wall_time"],
+            } for outcome, result in zip(outcomes, results)],
+        },
+    }
+
+
+def solve_independent_islands(params: dict, settings: SolverSettings, islands: list = None, max_workers: int = None) -> dict:
+    """
+    按 topology_analysis.independent_islands 划分的电气孤岛在进程池中并行求解，再合并为一个结果。
+    各孤岛之间没有可操作的开关，也不共享主变和供区，除“开关闭合数不少于初始状态”按孤岛分别要求、
+    最小安全裕度的次要目标项按孤岛分别计入外，与整体求解等价；发电成本的归一化系数统一取全网的值。
+    :param params: 与 solve_dynamic_recovery_model 相同的输入参数
+    :param settings: 求解器设置，各孤岛使用相同的设置（time_limit 对每个孤岛分别生效）
+    :param islands: independent_islands 的返回值，None 时在此计算
+    :param max_workers: 进程数，默认取孤岛数与CPU核数的较小值
+    :return: 合并后的结果字典，solver.islands 给出各孤岛的求解信息；任一孤岛无可行解时返回 None
+    """
+    p = _normalize_params(params)
+    start = time.perf_counter()
+    islands = islands or independent_islands(p)
+    cost_scale = max([u['cost'] * u['p_max'] for u in p["operating_units"].values()])
+    island_params = [_island_params(p, island, index) for index, island in enumerate(islands)]
+    solver_settings = settings.model_dump()
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    workers = max_workers or min(len(islands), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        outcomes = list(pool.map(_solve_island, island_params, [solver_settings] * len(islands), [cost_scale] * len(islands)))
+        for island, outcome in zip(islands, outcomes):
+            if outcome["result"] is None:
+                print(f"No feasible solution found for island {island['zones']}, status: {outcome['termination']}")
+                return None
+        if ObjectiveType(p["objective"]) == ObjectiveType.MAX_SAFETY_REGION:
+            # 全网目标只取决于裕度最小的孤岛，其余孤岛在不低于该裕度的前提下重新求解次要目标（避免为提高自身裕度多发电）
+            floor = min(outcome["terms"]["min_safety"] for outcome in outcomes)
+            loose = [i for i, outcome in enumerate(outcomes) if outcome["terms"]["min_safety"] > floor + 1e-6]
+            refined = pool.map(_solve_island, [island_params[i] for i in loose], [solver_settings] * len(loose),
+                               [cost_scale] * len(loose), [floor] * len(loose))
+            for i, outcome in zip(loose, refined):
+                if outcome["result"] is not None:
+                    outcome["wall_time"] += outcomes[i]["wall_time"]
+                    outcomes[i] = outcome
+    result = merge_island_results(p, outcomes, settings.objective_mode, cost_scale)
+    result["solver"]["workers"] = workers
+    result["solver"]["wall_time"] = round(time.perf_counter() - start, 3)
+    return result
+
 
 if __name__ == "__main__":
     # Load the JSON data (in this case, we'll use the provided dictionary)
@@ -434,4 +2220,4 @@ if __name__ == "__main__":
     input = OptimizationInput(**json_data)
     params = input.model_dump()
     result = solve_dynamic_recovery_model(**params)
-    print(result)
\ No newline at end of file
+    print(result)
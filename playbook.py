@@ -0,0 +1,178 @@
+# playbook.py
+"""
+预计算恢复方案（playbook）：离线对当前配置的每个可信故障设备（contingency.enumerate_contingencies）按配置的求解器设置求解，
+只保存证明最优的方案（solver.termination == "optimal"），按（故障设备, 故障后输入的拓扑指纹, 负荷分档）存入数据库 recovery_playbook 表；故障发生时直接返回对应方案，
+再在后台实时求解刷新。
+
+方案的查找键由故障后输入计算：拓扑指纹、除负荷外全部输入（开关状态、设备可用性、设备参数、优化目标等）的哈希
+（state_signature）和总负荷分档，任一项与生成方案时不同都不会命中。基础配置修改（负荷只在跨分档时）后由 invalidate() 删除旧方案。
+    python playbook.py build        # 离线生成当前配置的全部故障方案（建议定时运行）
+    python playbook.py invalidate   # 删除按旧配置生成的方案
+    PLAYBOOK_LOAD_STEP    负荷分档宽度（MW，取全部时段主变负荷与供区固定负荷的峰值之和），默认 50
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from contingency import apply_outages, enumerate_contingencies
+from optimization_solver import (_normalize_params, model_options, solve_dynamic_recovery_model, solve_with_result_cache,
+                                 supports_template, topology_fingerprint)
+from result_cache import canonical_key
+from schema import OptimizationInput, SolverSettings
+
+PLAYBOOK_LOAD_STEP = float(os.getenv("PLAYBOOK_LOAD_STEP", 50))
+
+# 负荷按 load_bucket 分档匹配，不参与状态哈希
+LOAD_FIELDS = {"transformers": "load", "zones": "fixed_load"}
+
+
+def load_bucket(params: dict) -> int:
+    """总负荷（各时段主变负荷与供区固定负荷之和的峰值）所在的分档"""
+    horizon = params["horizon"]
+    total = max((sum(t["load"][k] for t in params["transformers"].values()) +
+                 sum(z["fixed_load"][k] for z in params["zones"].values()) for k in range(horizon)), default=0.0)
+    return int(total // PLAYBOOK_LOAD_STEP)
+
+
+def state_signature(params: dict) -> str:
+    """
+    除负荷外全部输入的哈希：开关状态与可用性，线路和全部机组、储能、可中断负荷的可用性与参数（出力上下限、成本等），
+    供区容量，主变灵敏度与成本，优化目标及求解器设置
+    """
+    state = dict(params, solver_settings=SolverSettings.model_validate(params.get("solver_settings") or {}).model_dump())
+    for key, field in LOAD_FIELDS.items():
+        state[key] = {name: {k: v for k, v in item.items() if k != field} for name, item in params[key].items()}
+    return canonical_key(state, namespace="playbook_state")
+
+
+def plan_key(params: dict) -> tuple:
+    """故障后输入的查找键：(拓扑指纹, 状态哈希, 负荷分档)"""
+    settings = SolverSettings.model_validate(params.get("solver_settings") or {})
+    return topology_fingerprint(_normalize_params(params), model_options(settings)), state_signature(params), load_bucket(params)
+
+
+def is_optimal(plan: dict) -> bool:
+    """方案是否为证明最优的解：到达时间/间隙/节点上限的当前最好解、启发式或分解回退的解都不作为预计算方案"""
+    return plan is not None and (plan.get("solver") or {}).get("termination") == "optimal"
+
+
+def _solve_fault(base: dict, outage: dict) -> dict:
+    """进程池工作函数：按基础配置的求解器设置求解一个故障后输入，无解或出错时返回 None"""
+    try:
+        post, _ = apply_outages(base, [outage])
+        return solve_dynamic_recovery_model(**post)
+    except Exception as e:
+        print(f"Playbook solve for {outage['device']} failed: {e}")
+        return None
+
+
+def build_playbook(db, max_workers: int = None) -> dict:
+    """
+    离线任务：对数据库中当前配置的每个可信故障设备，按配置的求解器设置（solver_settings）在进程池中求解，
+    只保存证明最优的方案，同时删除由其他基础配置生成的旧方案
+    :param max_workers: 进程数，默认取故障设备数与CPU核数的较小值
+    :return: {"entries": 保存的方案数, "infeasible": 无解的故障设备, "not_optimal": 未证明最优（未保存）的故障设备,
+              "removed": 删除的旧方案数, "wall_time": 秒}
+    """
+    start = time.perf_counter()
+    base = OptimizationInput(**db.get_optimization_config()).model_dump()
+    base_signature, base_bucket = state_signature(base), load_bucket(base)
+    removed = db.delete_stale_playbook(base_signature, base_bucket)
+    outages = enumerate_contingencies(_normalize_params(base))
+    entries, infeasible, not_optimal = 0, [], []
+    if outages:
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+        workers = max(1, max_workers or min(len(outages), os.cpu_count() or 1))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            results = list(pool.map(_solve_fault, [base] * len(outages), outages))
+    else:
+        results = []
+    for outage, result in zip(outages, results):
+        if result is None:
+            infeasible.append(outage["device"])
+            continue
+        if not is_optimal(result):
+            not_optimal.append(outage["device"])
+            continue
+        post, _ = apply_outages(base, [outage])
+        fingerprint, signature, bucket = plan_key(post)
+        db.save_playbook_entry({
+            "device_name": outage["device"], "device_type": outage["device_type"],
+            "fingerprint": fingerprint, "state_signature": signature, "load_bucket": bucket,
+            "base_signature": base_signature, "base_load_bucket": base_bucket, "plan": result,
+        })
+        entries += 1
+    return {"entries": entries, "infeasible": infeasible, "not_optimal": not_optimal, "removed": removed,
+            "wall_time": round(time.perf_counter() - start, 3)}
+
+
+def lookup(db, params: dict, device_name: str = None, device_type: str = None) -> dict:
+    """
+    查找故障后输入对应的预计算方案
+    :return: 数据库中的方案项 {"id", "device_name", "device_type", "plan", "refreshed_at"}，
+             plan.solver.playbook 注明方案来源；未命中时返回 None
+    """
+    fingerprint, signature, bucket = plan_key(params)
+    entry = db.get_playbook_entry(fingerprint, signature, bucket, device_name, device_type)
+    # 只返回证明最优的方案
+    if entry is not None and not is_optimal(entry["plan"]):
+        return None
+    if entry is not None:
+        entry["plan"].setdefault("solver", {})["playbook"] = {
+            "device": entry["device_name"], "device_type": entry["device_type"], "refreshed_at": entry["refreshed_at"]}
+    return entry
+
+
+def lookup_fault(db, base: dict, device_name: str, device_type: str) -> dict:
+    """由基础输入和故障设备构造故障后输入并查找预计算方案，设备不在配置中时返回 None"""
+    try:
+        post, _ = apply_outages(base, [{"device": device_name, "device_type": device_type}])
+    except (KeyError, ValueError):
+        return None
+    return lookup(db, post, device_name, device_type)
+
+
+def refresh_in_background(db, entry: dict, params: dict) -> threading.Thread:
+    """后台实时求解故障后输入，用结果刷新方案项（同时写入求解结果缓存）"""
+    def refresh():
+        try:
+            result = solve_with_result_cache(bypass_cache=True, use_template=supports_template(params.get("solver_settings")),
+                                             **params)
+            # 未证明最优（如到达时间上限）时保留原方案
+            if is_optimal(result):
+                db.update_playbook_plan(entry["id"], result)
+        except Exception as e:
+            print(f"Playbook refresh for {entry['device_name']} failed: {e}")
+
+    thread = threading.Thread(target=refresh, name=f"playbook-refresh-{entry['device_name']}", daemon=True)
+    thread.start()
+    return thread
+
+
+def invalidate(db) -> int:
+    """基础配置修改后调用：删除由其他基础配置（负荷外的任一输入或负荷分档不同）生成的方案，返回删除的条数"""
+    config = db.get_optimization_config()
+    if not config:
+        return 0
+    base = OptimizationInput(**config).model_dump()
+    return db.delete_stale_playbook(state_signature(base), load_bucket(base))
+
+
+if __name__ == "__main__":
+    import sys
+    from database import OptimizationDatabase
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    database = OptimizationDatabase()
+    if command == "build":
+        print(build_playbook(database))
+    elif command == "invalidate":
+        print(f"Removed {invalidate(database)} stale playbook entries")
+    else:
+        print(f"Unknown command: {command}")
+        print("Available commands: build, invalidate")
+        sys.exit(1)
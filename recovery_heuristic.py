@@ -0,0 +1,299 @@
+# recovery_heuristic.py
+"""
+负荷转移的贪心构造启发式：不求解MIP，在 build_power_system_graph 的开关图上为失电主变寻找
+操作成本最小的合闸路径，给出可在1秒内返回的初步方案，也可作为MIP的初始解。
+"""
+import heapq
+import time
+from collections import defaultdict
+
+import networkx as nx
+
+from topology_analysis import build_power_system_graph, fixed_switch_states
+
+# 与优化模型一致：单条联络线（与供区线路连接点相连的边）的流量上限
+LINE_CAPACITY = 1.5
+
+
+class GreedyRecovery:
+    """
+    贪心恢复过程。状态为各开关的当前状态，闭合开关连成的每个连通分量按其中的供区线路连接点确定归属供区。
+    每轮处理一个不满足要求的分量：
+    - 失电分量（含有负荷主变但不含供区线路连接点）：沿最短合闸路径接入有剩余线路容量和供区裕度的已带电分量；
+    - 过载分量（负荷主变数超过线路容量或供区裕度不足）：沿最短合闸路径并入同一供区的其他线路；
+    找不到路径时，在分量内按最小操作成本断开一台主变所在间隔，使其成为新的失电分量在下一轮重新接入。
+    """
+
+    def __init__(self, **params):
+        self.params = params
+        self.zones = params["zones"]
+        self.transformers = params["transformers"]
+        self.switches = params["switches"]
+        self.graph = build_power_system_graph(params["substation_nodes"], self.switches)
+        self.fixed = fixed_switch_states(params)
+        self.states = {name: sw["initial_state"] for name, sw in self.switches.items()}
+        self.conn_zone = {line['conn_node']: line['zone'] for line in params["zone_lines"].values()}
+        self.transformer_node = {t_name: t['conn_node'] for t_name, t in self.transformers.items()}
+        self.loaded = [t_name for t_name, t in self.transformers.items() if max(t['load']) > 0 or t.get('allocate')]
+        self.margin = self._zone_margin()
+        self.detached = set()
+
+    def _zone_margin(self) -> dict:
+        """各供区各时段可承受的主变负荷：容量 - 固定负荷 + 机组/水电/可中断负荷的最大可调量（备用机组与储能不计）"""
+        p = self.params
+        horizon = p["horizon"]
+        margin = {}
+        for z_name, z in self.zones.items():
+            margin[z_name] = [z['capacity'] - z['fixed_load'][t] for t in range(horizon)]
+        for u in (p.get("operating_units") or {}).values():
+            for t in range(horizon):
+                margin[u['zone']][t] += u['sensitivity'] * u['p_max']
+        for u in (p.get("hydro_units") or {}).values():
+            if u.get('available', True):
+                for t in range(horizon):
+                    margin[u['zone']][t] += u['sensitivity'] * u['p_max']
+        for u in (p.get("storage_units") or {}).values():
+            for t in range(horizon):
+                margin[u['zone']][t] += u['sensitivity'] * u['p_current']
+        for u in (p.get("interruptible_loads") or {}).values():
+            for t in range(horizon):
+                margin[u['zone']][t] += u['shed_max']
+        return margin
+
+    # ---------------------------------------------------------------------------------
+    # 分量状态
+    # ---------------------------------------------------------------------------------
+    def components(self) -> list:
+        """
+        闭合开关连成的连通分量及其状态
+        :return: [{"nodes", "zones": 分量内连接点所属供区, "lines": 闭合的联络线边数, "transformers": 负荷主变}]
+        """
+        closed = nx.Graph()
+        closed.add_nodes_from(self.graph.nodes)
+        line_edges = set()
+        for name, sw in self.switches.items():
+            if self.states[name]:
+                u, v = sw["nodes"]
+                closed.add_edge(u, v)
+                if u in self.conn_zone or v in self.conn_zone:
+                    line_edges.add(frozenset((u, v)))
+        node_transformers = defaultdict(list)
+        for t_name in self.loaded:
+            node_transformers[self.transformer_node[t_name]].append(t_name)
+        result = []
+        for nodes in nx.connected_components(closed):
+            result.append({
+                "nodes": nodes,
+                "zones": {self.conn_zone[n] for n in nodes if n in self.conn_zone},
+                "lines": sum(1 for edge in line_edges if edge <= nodes),
+                "transformers": [t_name for n in nodes for t_name in node_transformers[n]],
+            })
+        return result
+
+    def _load(self, transformers: list, z_name: str) -> list:
+        return [sum(self.transformers[t_name]['load'][t] * self.transformers[t_name]['sensitivity'][z_name]
+                    for t_name in transformers) for t in range(self.params["horizon"])]
+
+    def _fits(self, z_name: str, transformers: list, lines: int, zone_load: dict) -> bool:
+        """供区 z_name 通过 lines 条联络线带 transformers 是否满足线路容量、供区裕度和指定归属"""
+        if len(transformers) > LINE_CAPACITY * lines:
+            return False
+        if any(self.transformers[t_name].get('allocate') not in (None, z_name) for t_name in transformers):
+            return False
+        return all(load <= margin for load, margin in zip(zone_load[z_name], self.margin[z_name]))
+
+    def _deficits(self, components: list, zone_load: dict) -> list:
+        """不满足要求的分量：失电或过载，按负荷主变数从多到少排列"""
+        deficits = []
+        for comp in components:
+            if not comp["transformers"] or len(comp["zones"]) > 1:
+                continue
+            if not comp["zones"]:
+                deficits.append(comp)
+                continue
+            z_name = next(iter(comp["zones"]))
+            if not self._fits(z_name, comp["transformers"], comp["lines"], zone_load):
+                deficits.append(comp)
+        return sorted(deficits, key=lambda comp: -len(comp["transformers"]))
+
+    # ---------------------------------------------------------------------------------
+    # 操作
+    # ---------------------------------------------------------------------------------
+    def _operable(self, name: str) -> bool:
+        return name not in self.fixed and self.switches[name].get("available", True)
+
+    def _connect(self, comp: dict, components: list, zone_load: dict) -> bool:
+        """从分量出发按操作成本做 Dijkstra，路径终点为能接纳该分量的已带电分量，成功则闭合路径上的开关"""
+        owner = {n: idx for idx, c in enumerate(components) for n in c["nodes"]}
+        own = owner[next(iter(comp["nodes"]))]
+        zone = next(iter(comp["zones"])) if comp["zones"] else None
+        dist = {n: 0.0 for n in comp["nodes"]}
+        previous = {}
+        heap = [(0.0, n) for n in comp["nodes"]]
+        heapq.heapify(heap)
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist.get(u, float("inf")):
+                continue
+            target = components[owner[u]]
+            if owner[u] != own and target["zones"]:
+                # 到达已带电分量：只合并到单一供区且容量、裕度满足的分量，不再向其内部扩展
+                if len(target["zones"]) == 1:
+                    z_name = next(iter(target["zones"]))
+                    lines = target["lines"] + comp["lines"] + (1 if previous[u][0] in self.conn_zone or u in self.conn_zone else 0)
+                    moved = comp["transformers"] + target["transformers"]
+                    load = dict(zone_load)
+                    load[z_name] = [a + b for a, b in zip(zone_load[z_name], self._load(comp["transformers"], z_name))] \
+                        if zone is None else zone_load[z_name]
+                    if (zone is None or zone == z_name) and self._fits(z_name, moved, lines, load):
+                        self._close_path(u, previous)
+                        return True
+                continue
+            for v, data in self.graph[u].items():
+                name = data["switch_name"]
+                if self.states[name]:
+                    weight = 0.0
+                elif self._operable(name):
+                    weight = data["cost"]
+                else:
+                    continue
+                if d + weight < dist.get(v, float("inf")):
+                    dist[v] = d + weight
+                    previous[v] = (u, name)
+                    heapq.heappush(heap, (d + weight, v))
+        return False
+
+    def _close_path(self, node, previous: dict):
+        while node in previous:
+            node, name = previous[node]
+            self.states[name] = 1
+
+    def _detach(self, comp: dict) -> bool:
+        """在分量内按最小操作成本断开一台负荷最大的主变（未断开过的）所在间隔"""
+        candidates = [t_name for t_name in comp["transformers"] if t_name not in self.detached]
+        if not candidates or not comp["zones"] and len(comp["transformers"]) < 2:
+            return False
+        t_name = max(candidates, key=lambda name: max(self.transformers[name]['load']))
+        conn = self.transformer_node[t_name]
+        others = {self.transformer_node[name] for name in comp["transformers"] if name != t_name} | \
+            {n for n in comp["nodes"] if n in self.conn_zone}
+        if not others or conn in others:
+            return False
+        transformer_nodes = {self.transformer_node[name] for name in comp["transformers"]}
+        hops = nx.single_source_shortest_path_length(self.graph, conn)
+        cut_graph = nx.Graph()
+        for name, sw in self.switches.items():
+            u, v = sw["nodes"]
+            if self.states[name] and u in comp["nodes"]:
+                # 与主变连接点直接相连的开关不断开，使断开后的间隔仍能经其他刀闸重新接入；
+                # 成本相同时优先断开离该主变近的开关，避免把其他主变断开
+                operable = self._operable(name) and u not in transformer_nodes and v not in transformer_nodes
+                distance = min(hops.get(u, 0), hops.get(v, 0))
+                capacity = sw["cost"] * (1 + 0.01 * distance) if operable else float("inf")
+                if cut_graph.has_edge(u, v):
+                    cut_graph[u][v]["capacity"] += capacity
+                    cut_graph[u][v]["names"].append(name)
+                else:
+                    cut_graph.add_edge(u, v, capacity=capacity, names=[name])
+        sink = ("sink",)
+        for n in others:
+            cut_graph.add_edge(n, sink, capacity=float("inf"), names=[])
+        try:
+            cut_value, (source_side, _) = nx.minimum_cut(cut_graph, conn, sink)
+        except nx.NetworkXUnbounded:
+            return False
+        if cut_value == float("inf"):
+            return False
+        for u, v, data in cut_graph.edges(data=True):
+            if (u in source_side) != (v in source_side):
+                for name in data["names"]:
+                    self.states[name] = 0
+        self.detached.add(t_name)
+        return True
+
+    def run(self, max_iterations: int = None) -> int:
+        """执行贪心过程，返回迭代轮数"""
+        max_iterations = max_iterations or 4 * len(self.transformers) + 10
+        for iteration in range(max_iterations):
+            components = self.components()
+            zone_load = self.zone_load(components)
+            deficits = self._deficits(components, zone_load)
+            if not deficits:
+                return iteration
+            if any(self._connect(comp, components, zone_load) for comp in deficits):
+                continue
+            if not any(self._detach(comp) for comp in deficits):
+                return iteration
+        return max_iterations
+
+    # ---------------------------------------------------------------------------------
+    # 结果
+    # ---------------------------------------------------------------------------------
+    def zone_load(self, components: list) -> dict:
+        zone_load = {z_name: [0.0] * self.params["horizon"] for z_name in self.zones}
+        for comp in components:
+            if len(comp["zones"]) == 1:
+                z_name = next(iter(comp["zones"]))
+                zone_load[z_name] = [a + b for a, b in zip(zone_load[z_name], self._load(comp["transformers"], z_name))]
+        return zone_load
+
+    def assignment(self) -> dict:
+        """主变归属：所在分量只含一个供区的连接点时归属该供区，否则为 None"""
+        assignment = {t_name: None for t_name in self.transformers}
+        for comp in self.components():
+            if len(comp["zones"]) == 1:
+                z_name = next(iter(comp["zones"]))
+                for n in comp["nodes"]:
+                    for t_name, conn in self.transformer_node.items():
+                        if conn == n:
+                            assignment[t_name] = z_name
+        return assignment
+
+    def violations(self) -> list:
+        """方案不满足的约束（为空时方案可行，可直接作为MIP初始解）"""
+        violations = []
+        components = self.components()
+        zone_load = self.zone_load(components)
+        for comp in components:
+            if len(comp["zones"]) > 1:
+                violations.append(f"供区 {sorted(comp['zones'])} 合环")
+            elif comp["transformers"] and not comp["zones"]:
+                violations.append(f"主变 {comp['transformers']} 失电")
+            elif comp["transformers"] and len(comp["transformers"]) > LINE_CAPACITY * comp["lines"]:
+                violations.append(f"主变 {comp['transformers']} 超过联络线容量")
+        for z_name, load in zone_load.items():
+            if any(value > margin for value, margin in zip(load, self.margin[z_name])):
+                violations.append(f"供区 {z_name} 容量不足")
+        node_switches = defaultdict(list)
+        for name, sw in self.switches.items():
+            for node in set(sw["nodes"]):
+                node_switches[node].append(name)
+        for name, sw in self.switches.items():
+            if sw["switch_type"] == "breaker" and self.states[name]:
+                for node in sw["nodes"]:
+                    disconnectors = [other for other in node_switches[node]
+                                     if other != name and self.switches[other]["switch_type"] == "switch"]
+                    if disconnectors and not any(self.states[other] for other in disconnectors):
+                        violations.append(f"开关 {name} 闭合但 {node} 侧刀闸均断开")
+        if sum(self.states.values()) < sum(sw["initial_state"] for sw in self.switches.values()):
+            violations.append("闭合开关数少于初始状态")
+        return violations
+
+
+def greedy_recovery_plan(**params) -> dict:
+    """
+    贪心构造负荷转移方案
+    :param params: 与 solve_dynamic_recovery_model 相同的输入
+    :return: {"switch_states": 开关最终状态, "assignment": 主变归属供区（失电为None）,
+              "violations": 不满足的约束, "iterations": 迭代轮数, "time": 耗时（秒）}
+    """
+    start = time.perf_counter()
+    greedy = GreedyRecovery(**params)
+    iterations = greedy.run()
+    return {
+        "switch_states": dict(greedy.states),
+        "assignment": greedy.assignment(),
+        "violations": greedy.violations(),
+        "iterations": iterations,
+        "time": round(time.perf_counter() - start, 4),
+    }
@@ -0,0 +1,259 @@
+# result_cache.py
+"""
+求解结果缓存：以校验后输入的规范化哈希为键，缓存 solve_dynamic_recovery_model 的结果；
+同一键的并发请求由 SingleFlight 合并为一次求解。
+两级缓存：进程内LRU（按条数和TTL淘汰），以及可选的Redis（复用 REDIS_HOST/REDIS_PORT/REDIS_DB/REDIS_PASSWORD，TTL由Redis过期时间控制）。
+配置由环境变量给出：
+    RESULT_CACHE_SIZE      进程内缓存的最大条数，默认 256，0 表示不使用进程内缓存
+    RESULT_CACHE_TTL       缓存项有效期（秒），默认 600
+    RESULT_CACHE_REDIS     为 1/true 时启用Redis缓存，默认关闭
+    RESULT_CACHE_PREFIX    Redis键前缀，默认 solve_result:
+"""
+import copy
+import enum
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 256))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", 600))
+RESULT_CACHE_REDIS = os.getenv("RESULT_CACHE_REDIS", "0").lower() in ("1", "true", "yes")
+RESULT_CACHE_PREFIX = os.getenv("RESULT_CACHE_PREFIX", "solve_result:")
+
+# 浮点数规范化保留的有效数字位数：1、1.0 和 1.0000000000001 视为同一输入
+FLOAT_DIGITS = 12
+
+
+def _canonical(value):
+    """转换为可稳定序列化的形式：枚举取值，元组转列表，浮点数按有效数字取整，整数值浮点数转为整数"""
+    if isinstance(value, enum.Enum):
+        return _canonical(value.value)
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        value = float(value)
+        if not math.isfinite(value):
+            return repr(value)
+        value = float(f"{value:.{FLOAT_DIGITS}g}")
+        return int(value) if value.is_integer() else value
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if hasattr(value, "model_dump"):
+        return _canonical(value.model_dump())
+    if hasattr(value, "tolist"):
+        return _canonical(value.tolist())
+    return str(value)
+
+
+def canonical_key(params: dict, namespace: str = "solve") -> str:
+    """
+    计算输入的内容哈希：字典键排序、浮点数规范化，目标和求解器设置都参与计算。
+    :param namespace: 区分不同的求解入口，相同输入在不同入口下的结果不共享
+    """
+    payload = json.dumps([namespace, _canonical(params)], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_result(result: dict) -> dict:
+    """
+    结果转换为JSON可表示的形式（元组转列表、非字符串键转字符串、其他对象转字符串），与Redis中读回的结果一致。
+    未命中时返回的结果与命中时取出的缓存结果形式相同
+    """
+    return None if result is None else json.loads(json.dumps(result, default=str))
+
+
+class ResultCache:
+    """
+    两级结果缓存。redis_client 为任意提供 get/set(ex=)/delete 的客户端（decode_responses=True），
+    为 None 时只使用进程内缓存；Redis读写失败时打印错误并按未命中处理。
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None, redis_client=None, prefix: str = None):
+        self.max_entries = RESULT_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl = RESULT_CACHE_TTL if ttl is None else ttl
+        self.redis = redis_client
+        self.prefix = RESULT_CACHE_PREFIX if prefix is None else prefix
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "memory_hits": 0, "redis_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "redis_errors": 0}
+
+    def _count(self, *names):
+        with self._lock:
+            for name in names:
+                self._stats[name] += 1
+
+    def get(self, key: str):
+        """
+        查找缓存结果，先查进程内缓存再查Redis（Redis命中时写回进程内缓存）
+        :return: (结果的副本, "memory"/"redis")，未命中时返回 (None, None)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, result = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return copy.deepcopy(result), "memory"
+                del self._entries[key]
+                self._stats["evictions"] += 1
+        if self.redis is not None:
+            try:
+                payload = self.redis.get(self.prefix + key)
+            except Exception as e:
+                print(f"Result cache Redis read failed: {e}")
+                self._count("redis_errors")
+                payload = None
+            if payload is not None:
+                result = json.loads(payload)
+                self._store_memory(key, result)
+                self._count("hits", "redis_hits")
+                return copy.deepcopy(result), "redis"
+        self._count("misses")
+        return None, None
+
+    def put(self, key: str, result: dict) -> dict:
+        """
+        规范化（normalize_result）后写入两级缓存；无解（None）不缓存
+        :return: 规范化后的结果，未命中时调用方返回它，与之后命中时得到的结果形式相同
+        """
+        if result is None:
+            return None
+        result = normalize_result(result)
+        self._store_memory(key, copy.deepcopy(result))
+        if self.redis is not None:
+            try:
+                self.redis.set(self.prefix + key, json.dumps(result, ensure_ascii=False), ex=max(1, int(math.ceil(self.ttl))))
+            except Exception as e:
+                print(f"Result cache Redis write failed: {e}")
+                self._count("redis_errors")
+        self._count("stores")
+        return result
+
+    def _store_memory(self, key: str, result: dict):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.redis is not None:
+            try:
+                self.redis.delete(self.prefix + key)
+            except Exception as e:
+                print(f"Result cache Redis delete failed: {e}")
+                self._count("redis_errors")
+
+    def clear(self):
+        """清空进程内缓存（Redis中的缓存项按TTL过期）并重置计数"""
+        with self._lock:
+            self._entries.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self) -> dict:
+        """命中/未命中计数、命中率和当前进程内缓存条数"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["redis_enabled"] = self.redis is not None
+        return stats
+
+
+class SingleFlight:
+    """
+    合并并发的相同请求：同一键同时只执行一次 fn，执行期间到达的请求等待并共享其结果（或异常）。
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"executions": 0, "coalesced": 0}
+
+    def do(self, key: str, fn):
+        """
+        :return: (fn() 的结果副本, 是否合并到了进行中的请求)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+                self._stats["executions"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return copy.deepcopy(call["result"]), True
+        try:
+            call["result"] = fn()
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+        # 各请求各自得到副本，调用方修改结果互不影响
+        return copy.deepcopy(call["result"]), False
+
+    def stats(self) -> dict:
+        """实际执行次数、被合并的请求数和当前进行中的请求数"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """进程内共享的结果缓存，RESULT_CACHE_REDIS 开启时连接 redis_utils.get_redis_client() 给出的Redis"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            redis_client = None
+            if RESULT_CACHE_REDIS:
+                try:
+                    from redis_utils import get_redis_client
+                    redis_client = get_redis_client()
+                except Exception as e:
+                    print(f"Result cache Redis unavailable, using memory only: {e}")
+            _default_cache = ResultCache(redis_client=redis_client)
+        return _default_cache
+
+
+def set_result_cache(cache: ResultCache):
+    """替换共享的结果缓存（如使用其他Redis客户端）"""
+    global _default_cache
+    with _default_cache_lock:
+        _default_cache = cache
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """进程内共享的并发请求合并器"""
+    return _single_flight
@@ -0,0 +1,215 @@
+# scenarios.py
+"""
+负荷预测场景批量求解：主变负荷和供区固定负荷以 场景数×设备数×时段数 的矩阵（或 场景数×时段数 的倍数）给出，
+不为每个场景复制整份输入。
+1) 各场景在进程池中分别求解（每个进程复用同一拓扑的模型模板，只更新负荷），得到各场景的最优开关方案；
+2) 按最终开关状态去重后，固定每个方案的开关状态在全部场景下重新优化调度，评估方案的鲁棒性：
+   可行场景的概率、期望/最差目标值、相对各场景最优方案的最大遗憾值、最大切负荷和最小安全裕度。
+   目标值均为 evaluate_plan 在原始时段上的加权目标值，各场景的最优值也取其最优方案在该场景下的评估值。
+方案按可行概率从高到低、期望目标值从低到高排序，第一个为推荐方案。
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from optimization_solver import (_normalize_params, get_model_template, model_options, solve_dynamic_recovery_model,
+                                 supports_template)
+from schema import SolverSettings
+
+
+def scenario_matrices(params: dict, transformer_load=None, fixed_load=None, multipliers=None) -> tuple:
+    """
+    由矩阵或倍数得到各场景的负荷矩阵
+    :param transformer_load: 场景数×主变数×时段数，缺省时由基础主变负荷乘以 multipliers 得到
+    :param fixed_load: 场景数×供区数×时段数，缺省时由基础供区固定负荷乘以 multipliers 得到
+    :param multipliers: 场景数×时段数 或 场景数（每个场景一个倍数）
+    :return: (主变负荷矩阵, 供区固定负荷矩阵)，均为 np.ndarray
+    """
+    horizon = params["horizon"]
+    transformers, zones = params["transformers"], params["zones"]
+    base_t = np.array([t["load"] for t in transformers.values()], dtype=float).reshape(len(transformers), horizon)
+    base_z = np.array([z["fixed_load"] for z in zones.values()], dtype=float).reshape(len(zones), horizon)
+    if multipliers is not None:
+        multipliers = np.asarray(multipliers, dtype=float)
+        if multipliers.ndim == 1:
+            multipliers = multipliers[:, None]
+        if multipliers.ndim != 2 or multipliers.shape[1] not in (1, horizon):
+            raise ValueError(f"multipliers 应为 场景数×{horizon} 或 场景数×1 的矩阵，实际形状 {multipliers.shape}")
+
+    def matrix(given, base, label):
+        if given is not None:
+            given = np.asarray(given, dtype=float)
+            if given.ndim != 3 or given.shape[1:] != base.shape:
+                raise ValueError(f"{label} 应为 场景数×{base.shape[0]}×{horizon} 的矩阵，实际形状 {given.shape}")
+            return given
+        if multipliers is None:
+            return None
+        return base[None, :, :] * multipliers[:, None, :]
+
+    t_load = matrix(transformer_load, base_t, "transformer_load")
+    z_load = matrix(fixed_load, base_z, "fixed_load")
+    if t_load is None and z_load is None:
+        raise ValueError("至少需要给出 transformer_load、fixed_load 或 multipliers 之一")
+    # 只给出一种负荷矩阵时另一种各场景取基础值
+    if t_load is None:
+        t_load = np.broadcast_to(base_t, (len(z_load),) + base_t.shape)
+    if z_load is None:
+        z_load = np.broadcast_to(base_z, (len(t_load),) + base_z.shape)
+    if len(t_load) != len(z_load):
+        raise ValueError(f"transformer_load 与 fixed_load 的场景数不一致：{len(t_load)} != {len(z_load)}")
+    if np.any(t_load < 0) or np.any(z_load < 0):
+        raise ValueError("场景负荷不能为负")
+    return t_load, z_load
+
+
+def scenario_params(params: dict, t_load: np.ndarray, z_load: np.ndarray) -> dict:
+    """单个场景的输入：只替换主变负荷和供区固定负荷，其余部分与基础输入共享"""
+    post = dict(params)
+    post["transformers"] = {name: dict(t, load=t_load[i].tolist()) for i, (name, t) in enumerate(params["transformers"].items())}
+    post["zones"] = {name: dict(z, fixed_load=z_load[i].tolist()) for i, (name, z) in enumerate(params["zones"].items())}
+    return post
+
+
+def evaluate_plan(recovery_model, switch_states: dict, time_limit: float = None) -> dict:
+    """
+    固定开关状态重新优化调度，返回方案在该模型输入下的指标；结束后恢复开关变量上下界，模型可继续复用
+    :return: {"feasible", "objective_value", "load_shed", "min_safety_margin"}
+    """
+    model = recovery_model.model
+    keys = [("S", name) for name in recovery_model.S]
+    row = {"feasible": False, "objective_value": None, "load_shed": None, "min_safety_margin": None}
+    # 与不可用开关（固定断开）冲突的方案直接判为不可行
+    if any(not recovery_model._bounds[key][0] <= switch_states[key[1]] <= recovery_model._bounds[key][1] for key in keys):
+        return row
+    recovery_model.add_warm_start("none")
+    for key in keys:
+        model.chgVarLb(recovery_model.vars[key], switch_states[key[1]])
+        model.chgVarUb(recovery_model.vars[key], switch_states[key[1]])
+    try:
+        recovery_model.set_limits(time_limit)
+        recovery_model.optimize()
+        if recovery_model.has_solution():
+            row.update(
+                feasible=True,
+                objective_value=round(model.getObjVal(), 4),
+                load_shed=round(sum(model.getVal(var) for var in recovery_model.P_shed.values()), 4),
+                min_safety_margin=round(model.getVal(recovery_model.min_safety_region) * 100, 2))
+    finally:
+        model.freeTransform()
+        for key in keys:
+            lb, ub = recovery_model._bounds[key]
+            model.chgVarLb(recovery_model.vars[key], lb)
+            model.chgVarUb(recovery_model.vars[key], ub)
+    return row
+
+
+def _solve_scenario(params: dict, t_load: np.ndarray, z_load: np.ndarray, solver_settings: dict) -> dict:
+    """进程池工作函数：求解一个场景，直接建模求解时同一进程内的场景复用模型模板"""
+    start = time.perf_counter()
+    result = solve_dynamic_recovery_model(**scenario_params(params, t_load, z_load), solver_settings=solver_settings,
+                                          use_template=supports_template(solver_settings))
+    return {"result": result, "wall_time": round(time.perf_counter() - start, 3)}
+
+
+def _evaluate_scenario(params: dict, t_load: np.ndarray, z_load: np.ndarray, solver_settings: dict, plans: list) -> list:
+    """进程池工作函数：在一个场景下依次评估全部开关方案"""
+    settings = SolverSettings.model_validate(solver_settings or {})
+    post = _normalize_params(scenario_params(params, t_load, z_load))
+    recovery_model, reused = get_model_template(model_options(settings), **post)
+    with recovery_model.lock:
+        if reused:
+            recovery_model.update(**post)
+        recovery_model.model.hideOutput()
+        recovery_model._clear_lexicographic()
+        return [evaluate_plan(recovery_model, states, settings.time_limit) for states in plans]
+
+
+def solve_scenarios(params: dict, transformer_load=None, fixed_load=None, multipliers=None, probabilities=None,
+                    max_workers: int = None) -> dict:
+    """
+    负荷场景批量求解并评估各场景最优方案的鲁棒性
+    :param params: 基础输入（OptimizationInput.model_dump() 格式，可含 solver_settings）
+    :param transformer_load, fixed_load, multipliers: 场景负荷，见 scenario_matrices
+    :param probabilities: 各场景概率，默认等概率，会归一化
+    :param max_workers: 进程数，默认取场景数与CPU核数的较小值
+    :return: {"scenario_count", "scenarios": 各场景的最优目标值及其方案编号, "plans": 按鲁棒性排序的方案及逐场景评估,
+              "recommended": 推荐方案（plans[0]）的完整求解结果, "workers", "wall_time"}
+    """
+    start = time.perf_counter()
+    params = dict(params)
+    solver_settings = SolverSettings.model_validate(params.pop("solver_settings", None) or {}).model_dump()
+    t_load, z_load = scenario_matrices(params, transformer_load, fixed_load, multipliers)
+    n = len(t_load)
+    probabilities = np.full(n, 1.0 / n) if probabilities is None else np.asarray(probabilities, dtype=float)
+    if probabilities.shape != (n,) or np.any(probabilities < 0) or probabilities.sum() <= 0:
+        raise ValueError(f"probabilities 应为 {n} 个非负数")
+    probabilities = probabilities / probabilities.sum()
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    workers = max(1, max_workers or min(n, os.cpu_count() or 1))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        outcomes = list(pool.map(_solve_scenario, [params] * n, t_load, z_load, [solver_settings] * n))
+        # 按最终开关状态去重，每个方案保留首个得到它的场景的完整结果
+        plans, plan_of = [], {}
+        for s, outcome in enumerate(outcomes):
+            result = outcome["result"]
+            if result is None:
+                continue
+            states = result["results"]["final_switch_states"]
+            key = tuple(sorted(states.items()))
+            if key not in plan_of:
+                plan_of[key] = len(plans)
+                plans.append({"final_switch_states": states, "switch_operations": result["results"]["switch_operations"],
+                              "source_scenarios": [], "result": result})
+            plans[plan_of[key]]["source_scenarios"].append(s)
+        states = [plan["final_switch_states"] for plan in plans]
+        evaluations = list(pool.map(_evaluate_scenario, [params] * n, t_load, z_load, [solver_settings] * n, [states] * n)) \
+            if plans else [[] for _ in range(n)]
+
+    # 各场景的最优值取该场景最优方案经 evaluate_plan 的评估值，与方案交叉评估的目标值口径一致
+    # （求解结果的 objective_value 在分层目标、时段聚合、分解或标准形式求解时不是同一口径的加权目标值）
+    best = [None] * n
+    for p, plan in enumerate(plans):
+        for s in plan["source_scenarios"]:
+            best[s] = evaluations[s][p]["objective_value"]
+    for p, plan in enumerate(plans):
+        rows = [dict(evaluations[s][p], scenario=s) for s in range(n)]
+        feasible = [row for row in rows if row["feasible"]]
+        feasible_probability = float(sum(probabilities[row["scenario"]] for row in feasible))
+        plan.update({
+            "plan": p,
+            "feasible_scenarios": len(feasible),
+            "feasible_probability": round(feasible_probability, 6),
+            "expected_objective": round(float(sum(probabilities[row["scenario"]] * row["objective_value"] for row in feasible))
+                                        / feasible_probability, 4) if feasible else None,
+            "worst_objective": max((row["objective_value"] for row in feasible), default=None),
+            "max_regret": max((round(row["objective_value"] - best[row["scenario"]], 4)
+                               for row in feasible if best[row["scenario"]] is not None), default=None),
+            "max_load_shed": max((row["load_shed"] for row in feasible), default=None),
+            "min_safety_margin": min((row["min_safety_margin"] for row in feasible), default=None),
+            "evaluations": rows,
+        })
+    plans.sort(key=lambda plan: (-plan["feasible_probability"],
+                                 plan["expected_objective"] if plan["expected_objective"] is not None else float("inf")))
+    recommended = plans[0].pop("result") if plans else None
+    for plan in plans[1:]:
+        plan.pop("result")
+    scenarios = [{"scenario": s, "probability": round(float(probabilities[s]), 6), "objective_value": best[s],
+                  "termination": outcome["result"]["solver"].get("termination") if outcome["result"] else None,
+                  "plan": next((plan["plan"] for plan in plans if s in plan["source_scenarios"]), None),
+                  "wall_time": outcome["wall_time"]}
+                 for s, outcome in enumerate(outcomes)]
+    return {
+        "scenario_count": n,
+        "scenarios": scenarios,
+        "plans": plans,
+        "recommended": recommended,
+        "workers": workers,
+        "wall_time": round(time.perf_counter() - start, 3),
+    }
@@ -1,5 +1,5 @@
 # --- Pydantic 模型定义 ---
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Dict, List, Optional, Tuple, Literal
 from enum import Enum
 
@@ -78,6 +78,61 @@ class InterruptibleLoad(BaseModel):
     cost: float = Field(..., description="切负荷成本 ($/MWh), 通常非常高")
     sensitivity: float = Field(..., description="敏感度")
 
+class SolverSettings(BaseModel):
+    """求解器设置"""
+    warm_start: Literal["auto", "none", "initial", "previous", "plan", "heuristic"] = Field("auto", description="初始解来源：auto依次尝试上次解、start_plan、贪心启发式方案（可行时）、初始开关状态；none不提供初始解")
+    start_plan: Optional[Dict[str, int]] = Field(None, description="用户给定的开关最终状态方案（开关名 -> 0/1），作为部分初始解")
+    time_limit: Optional[float] = Field(None, gt=0, description="求解时间上限（秒），到达后返回当前最好可行解")
+    mip_gap: Optional[float] = Field(None, ge=0, description="相对间隙目标，如0.01表示间隙小于1%即停止")
+    node_limit: Optional[int] = Field(None, gt=0, description="分支定界节点数上限")
+    objective_mode: Literal["weighted", "lexicographic"] = Field("weighted", description="目标处理方式：weighted主目标加eps加权的次要目标；lexicographic先优化主目标，固定后再依次优化其余目标")
+    lexicographic_tolerance: float = Field(1e-4, ge=0, description="分层求解时上一层目标值的相对容差（开关操作成本、发电成本至少放宽该值，安全裕度按纯相对值）")
+    topology_reduction: bool = Field(False, description="建模前化简拓扑：合并固定闭合开关、删除固定断开开关、合并串联链，仅作用于流量和分区标号变量。化简后的网络取决于开关可用性，开启后可用性变化时无法复用模型模板")
+    reachability_pruning: bool = Field(False, description="只为主变可达的供区、供区可达的边创建流量变量和约束。可达范围取决于开关可用性，开启后可用性变化时无法复用模型模板")
+    connectivity_formulation: Literal["multi_commodity", "single_commodity", "lazy_cuts"] = Field("multi_commodity", description="连通性建模方式：multi_commodity每个供区一组流量变量；single_commodity单一流量加分区标号与主变归属关联；lazy_cuts不建流量变量，求解中按需添加割集约束")
+    strengthened_formulation: bool = Field(False, description="加强建模：按供区可达主变数收紧流量上界、按标号范围收紧分区标号大M，并添加标号一致性与主变接入有效不等式")
+    time_aggregation: bool = Field(False, description="时段聚合：合并负荷相同或相近的连续时段为加权时段块求解，结果展开回原始时段")
+    aggregation_tolerance: float = Field(0.0, ge=0, description="时段聚合的相对容差，块内负荷与块首时段的相对偏差不超过该值时合并")
+    coarsen_after: Optional[int] = Field(None, ge=1, description="时段聚合时从该时段起每 coarsen_block 个时段合并为一块，不比较负荷")
+    coarsen_block: int = Field(4, ge=1, description="远端时段粗化的块长度")
+    decomposition: bool = Field(False, description="拓扑/调度分解求解：主问题选择开关状态和主变归属，各供区调度LP子问题并行求解并返回Benders割，最后固定方案精确求解调度；使用加权目标")
+    decomposition_tolerance: float = Field(1e-4, ge=0, description="分解求解时子问题值超过主问题估计值的相对容差，超过时添加割")
+    decomposition_workers: Optional[int] = Field(None, ge=1, description="并行求解子问题的线程数，默认与供区数相同")
+    decomposition_master_time_limit: Optional[float] = Field(300, gt=0, description="分解求解时主问题（Benders割循环）的时间上限（秒），未设置 time_limit 时同样生效，None 表示不限；设置 time_limit 时主问题另外为最后的调度求解预留一部分时间")
+    parallel_islands: bool = Field(False, description="自动检测互不相关的电气孤岛（之间没有可操作开关、不共享主变和供区），在进程池中分别求解后合并结果；开关闭合数不少于初始状态按孤岛分别要求")
+    island_workers: Optional[int] = Field(None, ge=1, description="并行求解孤岛的进程数，默认取孤岛数与CPU核数的较小值")
+    model_cache: bool = Field(False, description="模型磁盘缓存：同一拓扑结构的模型写为CIP/MPS文件，之后直接读入并只修改数值参数（目录、格式、淘汰策略见 model_cache 模块的环境变量）")
+    backend: Optional[Literal["scip", "highs", "auto"]] = Field(None, description="求解引擎：None直接用PySCIPOpt建模求解（支持全部选项）；scip/highs先用NumPy编译为稀疏标准形式再交给SCIP或HiGHS（scipy.optimize.milp）求解；auto对同一拓扑结构依次试用HiGHS和SCIP，之后选用耗时最短的。标准形式只支持未加强的多商品流建模，不支持初始解（未指定 warm_start 时按 none 处理）、分解求解、孤岛并行、备选方案和模型磁盘缓存，与这些选项同时设置时校验失败")
+    alternative_plans: int = Field(0, ge=0, description="除最优方案外再给出的开关状态互不相同的备选方案数（结果中的 alternatives，按目标值升序），仅直接求解且使用加权目标时生成")
+    alternative_search: Literal["pool", "nogood"] = Field("nogood", description="备选方案来源：pool只从本次求解的解池中去重选取，不再求解；nogood在同一模型上逐个添加no-good割重新求解（以解池中的解为初始解），得到目标值次优的方案")
+
+    @model_validator(mode="after")
+    def check_backend_options(self):
+        """标准形式求解（backend）不支持的选项组合直接报错，不静默忽略；未指定 warm_start 时按 none 处理"""
+        if self.backend is None:
+            return self
+        unsupported = []
+        if self.decomposition:
+            unsupported.append("decomposition")
+        if self.parallel_islands:
+            unsupported.append("parallel_islands")
+        if self.strengthened_formulation:
+            unsupported.append("strengthened_formulation")
+        if self.connectivity_formulation != "multi_commodity":
+            unsupported.append(f"connectivity_formulation={self.connectivity_formulation}")
+        if "warm_start" in self.model_fields_set and self.warm_start != "none":
+            unsupported.append(f"warm_start={self.warm_start}")
+        if self.start_plan is not None:
+            unsupported.append("start_plan")
+        if self.alternative_plans:
+            unsupported.append("alternative_plans")
+        if self.model_cache:
+            unsupported.append("model_cache")
+        if unsupported:
+            raise ValueError(f"backend={self.backend} 使用稀疏标准形式求解，不支持: {', '.join(unsupported)}")
+        self.warm_start = "none"
+        return self
+
 class OptimizationInput(BaseModel):
     """定义POST请求体的结构"""
     horizon: int
@@ -92,6 +147,7 @@ class OptimizationInput(BaseModel):
     hydro_units: Optional[Dict[str, HydroUnit]] = {}
     storage_units: Optional[Dict[str, StorageUnit]] = {}
     interruptible_loads: Optional[Dict[str, InterruptibleLoad]] = {}
+    solver_settings: SolverSettings = Field(default_factory=SolverSettings, description="求解器设置")
 
     class Config:
         json_schema_extra = {
@@ -169,3 +225,14 @@ class OptimizationInput(BaseModel):
         }
 
 
+
+class LoadScenarios(BaseModel):
+    """负荷预测场景：以矩阵（或倍数）给出各场景的负荷，不重复整份输入"""
+    transformer_load: Optional[List[List[List[float]]]] = Field(None, description="场景数×主变数×时段数 的主变负荷 (MW)，主变顺序与 transformers 一致")
+    fixed_load: Optional[List[List[List[float]]]] = Field(None, description="场景数×供区数×时段数 的供区固定负荷 (MW)，供区顺序与 zones 一致")
+    multipliers: Optional[List[List[float]]] = Field(None, description="场景数×时段数（或场景数×1）的负荷倍数，作用于未以矩阵给出的基础负荷")
+    probabilities: Optional[List[float]] = Field(None, description="各场景的概率，默认等概率")
+
+class ScenarioInput(OptimizationInput):
+    """基础输入加负荷预测场景"""
+    scenarios: LoadScenarios
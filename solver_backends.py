@@ -0,0 +1,124 @@
+# solver_backends.py
+"""
+求解引擎：在 standard_form.StandardForm 上求解给定目标的MIP。
+每个引擎返回相同格式的结果，终止状态统一使用SCIP的状态名（optimal、timelimit、nodelimit、infeasible 等）。
+"""
+import time
+import numpy as np
+from pyscipopt import Model, quicksum
+
+
+class SolverBackend:
+    """求解引擎接口"""
+    name = None
+
+    def solve(self, form, c: np.ndarray, offset: float = 0.0, extra_rows: list = (), time_limit: float = None,
+              mip_gap: float = None, node_limit: int = None) -> dict:
+        """
+        :param form: StandardForm
+        :param c: 目标函数系数向量（最小化）
+        :param offset: 目标函数常数项
+        :param extra_rows: 附加约束 [(系数向量, lb, ub)]，如分层求解时的上层目标约束
+        :return: {"termination", "x": 解向量（无可行解时为None）, "objective", "dual_bound", "gap", "solve_time", "nodes"}
+        """
+        raise NotImplementedError
+
+
+class ScipBackend(SolverBackend):
+    """SCIP：按稀疏矩阵逐行生成线性约束"""
+    name = "scip"
+
+    def solve(self, form, c, offset=0.0, extra_rows=(), time_limit=None, mip_gap=None, node_limit=None) -> dict:
+        model = Model("standard_form")
+        model.hideOutput()
+        x = [model.addVar(vtype="I" if integral else "C", lb=None if np.isinf(lb) else lb, ub=None if np.isinf(ub) else ub)
+             for lb, ub, integral in zip(form.lb.tolist(), form.ub.tolist(), form.integrality.tolist())]
+        A = form.A
+        rows = [(A.indices[A.indptr[i]:A.indptr[i + 1]], A.data[A.indptr[i]:A.indptr[i + 1]], form.row_lb[i], form.row_ub[i])
+                for i in range(A.shape[0])]
+        rows += [(np.flatnonzero(coefs), coefs[np.flatnonzero(coefs)], lb, ub) for coefs, lb, ub in extra_rows]
+        for cols, vals, lb, ub in rows:
+            if not len(cols):
+                continue
+            expr = quicksum(val * x[col] for col, val in zip(cols.tolist(), vals.tolist()))
+            if np.isinf(lb):
+                model.addCons(expr <= ub)
+            elif np.isinf(ub):
+                model.addCons(expr >= lb)
+            elif lb == ub:
+                model.addCons(expr == lb)
+            else:
+                cons = model.addCons(expr >= lb)
+                model.chgRhs(cons, ub)
+        nonzero = np.flatnonzero(c)
+        model.setObjective(quicksum(c[i] * x[i] for i in nonzero.tolist()) + offset, "minimize")
+        if time_limit is not None:
+            model.setParam("limits/time", time_limit)
+        if mip_gap is not None:
+            model.setParam("limits/gap", mip_gap)
+        if node_limit is not None:
+            model.setParam("limits/nodes", node_limit)
+        model.optimize()
+        has_solution = model.getNSols() > 0
+        gap = model.getGap()
+        return {
+            "termination": model.getStatus(),
+            "x": np.array([model.getVal(var) for var in x]) if has_solution else None,
+            "objective": model.getObjVal() if has_solution else None,
+            "dual_bound": model.getDualbound(),
+            "gap": gap if gap < 1e20 else None,
+            "solve_time": model.getSolvingTime(),
+            "nodes": model.getNNodes(),
+        }
+
+
+class HighsBackend(SolverBackend):
+    """HiGHS：通过 scipy.optimize.milp 直接传入稀疏矩阵"""
+    name = "highs"
+    # scipy.optimize.milp 的 status 与SCIP状态名的对应（1 为时间或节点上限，按耗时区分）
+    STATUS = {0: "optimal", 2: "infeasible", 3: "unbounded", 4: "unknown"}
+
+    def solve(self, form, c, offset=0.0, extra_rows=(), time_limit=None, mip_gap=None, node_limit=None) -> dict:
+        try:
+            from scipy.optimize import Bounds, LinearConstraint, milp
+        except ImportError as e:
+            raise RuntimeError("HiGHS 求解引擎需要安装 scipy") from e
+        constraints = []
+        if form.A.shape[0]:
+            constraints.append(LinearConstraint(form.A, form.row_lb, form.row_ub))
+        for coefs, lb, ub in extra_rows:
+            constraints.append(LinearConstraint(coefs[None, :], lb, ub))
+        # 与SCIP默认一致，不设相对间隙容差时求解到最优
+        options = {"disp": False, "mip_rel_gap": mip_gap if mip_gap is not None else 0.0}
+        if time_limit is not None:
+            options["time_limit"] = time_limit
+        if node_limit is not None:
+            options["node_limit"] = node_limit
+        start = time.perf_counter()
+        res = milp(c, integrality=form.integrality, bounds=Bounds(form.lb, form.ub), constraints=constraints, options=options)
+        solve_time = time.perf_counter() - start
+        if res.status == 1:
+            termination = "timelimit" if time_limit is not None and solve_time >= time_limit * 0.99 else "nodelimit"
+        else:
+            termination = self.STATUS.get(res.status, "unknown")
+        has_solution = res.x is not None
+        dual_bound = getattr(res, "mip_dual_bound", None)
+        return {
+            "termination": termination,
+            "x": np.asarray(res.x) if has_solution else None,
+            "objective": res.fun + offset if has_solution else None,
+            "dual_bound": dual_bound + offset if dual_bound is not None else None,
+            "gap": getattr(res, "mip_gap", None),
+            "solve_time": solve_time,
+            "nodes": getattr(res, "mip_node_count", 0),
+        }
+
+
+BACKENDS = {"scip": ScipBackend, "highs": HighsBackend}
+
+
+def get_backend(name: str) -> SolverBackend:
+    """按名称获取求解引擎"""
+    if name not in BACKENDS:
+        raise ValueError(f"未知的求解引擎: {name}，可选: {list(BACKENDS)}")
+    return BACKENDS[name]()
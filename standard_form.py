@@ -0,0 +1,401 @@
+# standard_form.py
+"""
+将优化输入编译为与求解器无关的稀疏标准形式：
+    min  c @ x + offset
+    s.t. row_lb <= A @ x <= row_ub,  lb <= x <= ub,  x[integrality == 1] 取整数
+变量与约束和 RecoveryModel（多商品流建模）一一对应，按变量/约束族用 NumPy 数组批量生成系数，
+不逐个调用 addVar/addCons；求解交给 solver_backends 中的各求解引擎。
+"""
+import numpy as np
+import scipy.sparse as sp
+from collections import defaultdict
+from schema import ObjectiveType
+from topology_analysis import reduce_switch_network, zone_reachability, fixed_switch_states
+
+UNIT_KEYS = ("operating_units", "backup_units", "hydro_units", "storage_units", "interruptible_loads")
+
+
+class StandardForm:
+    """
+    稀疏标准形式及变量映射。
+    columns: {变量族: 列号数组}，如 columns["P_opt"][g, t]、columns["y"][主变, 供区]、columns["f"][有向边, 供区]（-1 表示无此变量）
+    names: {变量族: 各维度的名称列表}，与 columns 的维度对应
+    objective_terms: {ObjectiveType: (系数向量, 常数项)}，均为最小化；shedding 为切负荷成本
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self.names = {}
+        self.row_families = {}
+        self.objective_terms = {}
+        self.shedding = None
+        self.cost_scale = None
+        self.A = None
+        self.row_lb = self.row_ub = None
+        self.lb = self.ub = self.integrality = None
+        self._lb, self._ub, self._integrality = [], [], []
+        self._row_lb, self._row_ub = [], []
+        self._rows, self._cols, self._vals = [], [], []
+        self.n_cols = 0
+        self.n_rows = 0
+
+    # =================================================================================
+    # 构建
+    # =================================================================================
+    def add_columns(self, family: str, names: tuple, lb, ub, integral: bool = False) -> np.ndarray:
+        """按名称列表的笛卡尔积新增一族变量，lb/ub 为标量或与形状一致的数组，返回列号数组"""
+        shape = tuple(len(n) for n in names)
+        size = int(np.prod(shape))
+        index = np.arange(self.n_cols, self.n_cols + size).reshape(shape)
+        self.n_cols += size
+        self._lb.append(np.broadcast_to(np.asarray(lb, dtype=float), shape).ravel())
+        self._ub.append(np.broadcast_to(np.asarray(ub, dtype=float), shape).ravel())
+        self._integrality.append(np.full(size, 1 if integral else 0, dtype=np.int8))
+        self.columns[family] = index
+        self.names[family] = names
+        return index
+
+    def add_rows(self, family: str, rows, cols, vals, lb, ub, count: int = None):
+        """
+        新增一族约束
+        :param rows: 各系数所在的族内行号（0 ~ count-1）
+        :param cols: 各系数的列号；与 rows、vals 广播后展平，列号为 -1 的系数（不存在的变量）被忽略
+        :param lb: 各行下界（标量或数组），None 表示无下界
+        :param ub: 各行上界，None 表示无上界
+        :param count: 行数，默认取 max(rows) + 1
+        """
+        rows, cols, vals = (np.ravel(a) for a in np.broadcast_arrays(np.asarray(rows), np.asarray(cols), np.asarray(vals, dtype=float)))
+        valid = (cols >= 0) & (vals != 0)
+        rows, cols, vals = rows[valid], cols[valid], vals[valid]
+        count = (int(rows.max()) + 1 if rows.size else 0) if count is None else count
+        if count == 0:
+            return
+        self._rows.append(rows + self.n_rows)
+        self._cols.append(cols)
+        self._vals.append(vals)
+        self._row_lb.append(np.broadcast_to(np.asarray(-np.inf if lb is None else lb, dtype=float), (count,)).ravel())
+        self._row_ub.append(np.broadcast_to(np.asarray(np.inf if ub is None else ub, dtype=float), (count,)).ravel())
+        self.row_families[family] = (self.n_rows, self.n_rows + count)
+        self.n_rows += count
+
+    def finalize(self):
+        """合并各族系数为 CSR 矩阵"""
+        concat = lambda parts, dtype: np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+        self.lb, self.ub = concat(self._lb, float), concat(self._ub, float)
+        self.integrality = concat(self._integrality, np.int8)
+        self.row_lb, self.row_ub = concat(self._row_lb, float), concat(self._row_ub, float)
+        # 同一行同一列的重复系数由 COO 转 CSR 时求和
+        self.A = sp.coo_matrix((concat(self._vals, float), (concat(self._rows, np.int64), concat(self._cols, np.int64))),
+                               shape=(self.n_rows, self.n_cols)).tocsr()
+        self._lb = self._ub = self._integrality = self._row_lb = self._row_ub = None
+        self._rows = self._cols = self._vals = None
+        return self
+
+    # =================================================================================
+    # 目标函数与取值
+    # =================================================================================
+    def weighted_objective(self, objective: ObjectiveType, eps: float):
+        """与 RecoveryModel 相同的加权目标：主目标 + 切负荷成本 + eps * (开关操作成本 - 最小裕度 + 发电成本 / cost_scale)"""
+        switch, switch_offset = self.objective_terms[ObjectiveType.MIN_SWITCH_OP]
+        safety, _ = self.objective_terms[ObjectiveType.MAX_SAFETY_REGION]
+        cost, cost_offset = self.objective_terms[ObjectiveType.MIN_COST]
+        primary, primary_offset = self.objective_terms[objective]
+        c = primary + self.shedding[0] + eps * (switch + safety + cost / self.cost_scale)
+        return c, primary_offset + self.shedding[1] + eps * (switch_offset + cost_offset / self.cost_scale)
+
+    def stage_objective(self, objective: ObjectiveType, level: int):
+        """分层求解第 level 层的目标：首层为主目标加切负荷成本"""
+        c, offset = self.objective_terms[objective]
+        if level == 0:
+            return c + self.shedding[0], offset + self.shedding[1]
+        return c, offset
+
+    def value_of(self, x: np.ndarray):
+        """按 RecoveryModel.vars 的变量键取解中的值，如 ("S", 开关名)、("P_opt", 机组名, 时段)、("min_safety_region",)"""
+        positions = {family: [{name: i for i, name in enumerate(names)} for names in self.names[family]]
+                     for family in self.names}
+
+        def value(key):
+            family = "safety" if key[0] == "safety_region" else key[0]
+            index = self.columns[family]
+            for position, name in zip(positions[family], key[1:]):
+                index = index[position[name] if isinstance(name, str) else name]
+            return float(x[int(index)])
+        return value
+
+    def stats(self) -> dict:
+        return {"variables": self.n_cols, "constraints": self.n_rows, "nonzeros": int(self.A.nnz),
+                "integers": int(self.integrality.sum())}
+
+
+def compile_standard_form(p: dict, options: dict) -> StandardForm:
+    """
+    将规范化后的优化输入编译为标准形式，变量、约束与 RecoveryModel 的多商品流建模一致
+    :param p: 规范化后的优化输入（_normalize_params 的结果）
+    :param options: 完整的建模选项（MODEL_OPTIONS 格式），仅支持 formulation="multi_commodity"、strengthen=False
+    :return: StandardForm
+    """
+    if options["formulation"] != "multi_commodity" or options["strengthen"]:
+        raise ValueError("稀疏标准形式只支持未加强的多商品流建模")
+    horizon, zones, zone_lines, transformers = p["horizon"], p["zones"], p["zone_lines"], p["transformers"]
+    substation_nodes, switches = p["substation_nodes"], p["switches"]
+    form = StandardForm()
+    form.cost_scale = options["cost_scale"] or max([u['cost'] * u['p_max'] for u in p["operating_units"].values()])
+    units = {key: p[key] for key in UNIT_KEYS} if options["dispatch"] else {key: {} for key in UNIT_KEYS}
+    T = list(range(horizon)) if options["dispatch"] else []
+    nT = len(T)
+    Z, TR, SW = list(zones), list(transformers), list(switches)
+    nz, ntr, nsw = len(Z), len(TR), len(SW)
+    zone_idx = {z: i for i, z in enumerate(Z)}
+    sw_idx = {s: i for i, s in enumerate(SW)}
+    C = ntr
+    M = C + 1
+
+    fixed_states = fixed_switch_states(p)
+    network = reduce_switch_network(substation_nodes, zones, zone_lines, switches, transformers,
+                                    fixed_states if options["reduce_topology"] else None)
+    node_map = network["node_map"]
+    flow_nodes = network["flow_nodes"]
+    node_idx = {n: i for i, n in enumerate(flow_nodes)}
+    # 供区可达节点矩阵 member[节点, 供区]：各供区的流量变量只建在其可达节点及供区节点上
+    member = np.zeros((len(flow_nodes), nz), dtype=bool)
+    if options["prune_unreachable"]:
+        reachability = zone_reachability(network, zone_lines, transformers, fixed_states)
+        for z in Z:
+            for n in reachability["zone_nodes"].get(z, set()) | {z}:
+                if n in node_idx:
+                    member[node_idx[n], zone_idx[z]] = True
+    else:
+        member[:, :] = True
+
+    # 1. 变量
+    sw_init = np.array([switches[s]["initial_state"] for s in SW], dtype=float)
+    sw_lb = np.array([fixed_states.get(s, 0) for s in SW], dtype=float)
+    sw_ub = np.array([fixed_states.get(s, 1) for s in SW], dtype=float)
+    label = form.add_columns("label", (network["nodes"],), 0, nz, integral=True)
+    S = form.add_columns("S", (SW,), sw_lb, sw_ub, integral=True)
+    op = form.add_columns("op_sw", (SW,), 0, 1, integral=True)
+    y_lb = np.array([[1.0 if transformers[t].get('allocate') == z else 0.0 for z in Z] for t in TR]).reshape(ntr, nz)
+    y = form.add_columns("y", (TR, Z), y_lb, 1, integral=True)
+    directed = network["directed_edges"]
+    edge_u = np.array([node_idx[u] for u, v in directed], dtype=np.int64)
+    edge_v = np.array([node_idx[v] for u, v in directed], dtype=np.int64)
+    f_mask = member[edge_u] & member[edge_v] if directed else np.zeros((0, nz), dtype=bool)
+    f = np.full((len(directed), nz), -1, dtype=np.int64)
+    f_cols = form.add_columns("f_vars", (list(range(int(f_mask.sum()))),), 0, np.inf)
+    f[f_mask] = f_cols
+    form.columns["f"], form.names["f"] = f, (directed, Z)
+    # 并联组（两端代表节点相同的多台开关）的闭合变量取组内开关状态的“或”；单台开关的组直接用其 S 列
+    parallel = [group for groups in network["edges"].values() for group in groups if len(group) > 1]
+    closed = form.add_columns("group_closed", (parallel,), 0, 1)
+    group_col = {group: closed[i] for i, group in enumerate(parallel)}
+    group_col.update({group: S[sw_idx[group[0]]] for groups in network["edges"].values() for group in groups if len(group) == 1})
+
+    def unit_array(key, field, default=None):
+        return np.array([u.get(field, default) if default is not None else u[field] for u in units[key].values()], dtype=float)
+    G_opt, G_bak, G_hyd = list(units["operating_units"]), list(units["backup_units"]), list(units["hydro_units"])
+    ES, IL = list(units["storage_units"]), list(units["interruptible_loads"])
+    t_arr = np.array(T, dtype=float)
+    P_opt = form.add_columns("P_opt", (G_opt, T), 0, (unit_array("operating_units", "p_max") - unit_array("operating_units", "p_current"))[:, None])
+    bak_available = unit_array("backup_units", "available", True)[:, None]
+    P_bak = form.add_columns("P_bak", (G_bak, T), 0, unit_array("backup_units", "p_max")[:, None] * bak_available * (t_arr > 0))
+    P_hydro = form.add_columns("P_hydro", (G_hyd, T), 0, unit_array("hydro_units", "p_max")[:, None] * unit_array("hydro_units", "available", True)[:, None])
+    v_start = form.add_columns("v_bak_startup", (G_bak, T), 0, np.broadcast_to(bak_available, (len(G_bak), nT)), integral=True)
+    v_oper = form.add_columns("v_bak_operating", (G_bak, T), 0, bak_available * (t_arr > 0), integral=True)
+    es_current = unit_array("storage_units", "p_current")
+    P_storage = form.add_columns("P_storage", (ES, T), (-unit_array("storage_units", "p_charge_max") - es_current)[:, None],
+                                 (unit_array("storage_units", "p_discharge_max") - es_current)[:, None])
+    SOC = form.add_columns("SOC", (ES, T), unit_array("storage_units", "soc_min")[:, None], unit_array("storage_units", "soc_max")[:, None])
+    P_shed = form.add_columns("P_shed", (IL, T), 0, unit_array("interruptible_loads", "shed_max")[:, None])
+    safety = form.add_columns("safety", (Z, T), 0, np.inf)
+    m = form.add_columns("min_safety_region", (), 0, np.inf)
+
+    # 2. 结构约束
+    # 并联组闭合变量：S_i <= closed <= sum(S_i)
+    member_rows = [i for i, group in enumerate(parallel) for _ in group]
+    member_sw = [sw_idx[s] for group in parallel for s in group]
+    form.add_rows("group_closed_upper", np.concatenate([np.arange(len(parallel)), member_rows]).astype(np.int64),
+                  np.concatenate([closed, S[member_sw]]).astype(np.int64),
+                  np.concatenate([np.ones(len(parallel)), -np.ones(len(member_sw))]), None, 0, count=len(parallel))
+    rows = np.arange(len(member_sw))
+    form.add_rows("group_closed_lower", np.stack([rows, rows], axis=1),
+                  np.stack([closed[member_rows], S[member_sw]], axis=1),
+                  np.array([1.0, -1.0]), 0, None, count=len(member_sw))
+    # a) 流量-开关关联：每条边上的每个并联组 f[u,v,k] + f[v,u,k] <= C * closed；经过供区线路连接点的边 f[u,v,k] + f[v,u,k] <= 1.5
+    edge_pos = {edge: i for i, edge in enumerate(directed)}
+    pair_fwd, pair_bwd, pair_col = [], [], []
+    for (u, v), groups in network["edges"].items():
+        for group in groups:
+            pair_fwd.append(edge_pos[u, v])
+            pair_bwd.append(edge_pos[v, u])
+            pair_col.append(group_col[group])
+    pair_fwd, pair_bwd, pair_col = (np.array(a, dtype=np.int64) for a in (pair_fwd, pair_bwd, pair_col))
+    valid = f[pair_fwd] >= 0
+    pair, k = np.nonzero(valid)
+    rows = np.arange(pair.size)
+    form.add_rows("flow_switch", np.stack([rows, rows, rows], axis=1),
+                  np.stack([f[pair_fwd[pair], k], f[pair_bwd[pair], k], pair_col[pair]], axis=1),
+                  np.array([1.0, 1.0, -C]), None, 0, count=pair.size)
+    limited = [key for key in network["edges"] if key in network["limited_edges"]]
+    lim_fwd = np.array([edge_pos[key] for key in limited], dtype=np.int64)
+    lim_bwd = np.array([edge_pos[key[1], key[0]] for key in limited], dtype=np.int64)
+    pair, k = np.nonzero(f[lim_fwd] >= 0)
+    rows = np.arange(pair.size)
+    form.add_rows("line_limit", np.stack([rows, rows], axis=1), np.stack([f[lim_fwd[pair], k], f[lim_bwd[pair], k]], axis=1),
+                  1.0, None, 1.5, count=pair.size)
+    # b) 流量守恒：每个供区可达节点上 流出 - 流入 - 供区供给 + 主变需求 = 0
+    conservation = np.full(member.shape, -1, dtype=np.int64)
+    conservation[member] = np.arange(int(member.sum()))
+    e, k = np.nonzero(f >= 0)
+    flow_rows = np.concatenate([conservation[edge_u[e], k], conservation[edge_v[e], k]])
+    flow_cols = np.concatenate([f[e, k], f[e, k]])
+    flow_vals = np.concatenate([np.ones(e.size), -np.ones(e.size)])
+    zone_nodes = np.array([node_idx[z] for z in Z], dtype=np.int64)
+    supply_rows = np.repeat(conservation[zone_nodes, np.arange(nz)], ntr)
+    supply_cols = y.T.ravel()
+    t_nodes = np.array([node_idx[node_map[transformers[t]['conn_node']]] for t in TR], dtype=np.int64)
+    t, k = np.nonzero(member[t_nodes]) if ntr else (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    form.add_rows("flow_balance", np.concatenate([flow_rows, supply_rows, conservation[t_nodes[t], k]]),
+                  np.concatenate([flow_cols, supply_cols, y[t, k]]),
+                  np.concatenate([flow_vals, -np.ones(supply_rows.size), np.ones(t.size)]), 0, 0, count=int(member.sum()))
+    # c) 连通性：流入主变连接点的供区k流量 >= y[t, k]
+    in_rows, in_cols = [], []
+    for i, t_name in enumerate(TR):
+        conn = node_map[transformers[t_name]['conn_node']]
+        in_pos = np.array([edge_pos[edge] for edge in network["in_edges"][conn]], dtype=np.int64)
+        if in_pos.size:
+            in_rows.append(np.repeat(i * nz + np.arange(nz), in_pos.size))
+            in_cols.append(f[in_pos].T.ravel())
+    in_rows = np.concatenate(in_rows) if in_rows else np.zeros(0, dtype=np.int64)
+    in_cols = np.concatenate(in_cols) if in_cols else np.zeros(0, dtype=np.int64)
+    form.add_rows("connectivity", np.concatenate([in_rows, np.arange(ntr * nz)]), np.concatenate([in_cols, y.ravel()]),
+                  np.concatenate([np.ones(in_rows.size), -np.ones(ntr * nz)]), 0, None, count=ntr * nz)
+    # d) 分区解环运行：供区线路连接点的标号固定为供区序号；边上并联组全部闭合时两端标号相同
+    label_pos = {n: i for i, n in enumerate(network["nodes"])}
+    fixed_lines = [(label_pos[node_map[line['conn_node']]], zone_idx[line['zone']]) for line in zone_lines.values() if line['zone'] in zone_idx]
+    form.add_rows("zone_label", np.arange(len(fixed_lines)), label[[n for n, _ in fixed_lines]], 1.0,
+                  [z for _, z in fixed_lines], [z for _, z in fixed_lines], count=len(fixed_lines))
+    edge_rows, edge_cols, edge_vals, edge_len = [], [], [], []
+    for i, ((u, v), groups) in enumerate(network["edges"].items()):
+        edge_rows.extend([i, i] + [i] * len(groups))
+        edge_cols.extend([label[label_pos[u]], label[label_pos[v]]] + [group_col[group] for group in groups])
+        edge_vals.extend([1.0, -1.0] + [M] * len(groups))
+        edge_len.append(len(groups))
+    edge_rows, edge_cols, edge_vals = np.array(edge_rows, dtype=np.int64), np.array(edge_cols, dtype=np.int64), np.array(edge_vals)
+    edge_len = np.array(edge_len, dtype=float)
+    # label_u - label_v <= M * sum(1 - closed)  与  label_u - label_v >= -M * sum(1 - closed)
+    form.add_rows("label_upper", edge_rows, edge_cols, edge_vals, None, M * edge_len, count=len(edge_len))
+    form.add_rows("label_lower", edge_rows, edge_cols, np.where(edge_vals == M, -M, edge_vals), -M * edge_len, None, count=len(edge_len))
+    # f) 备用机组启动延迟：启动一小时后并网，并网一小时后带满，开机之后不停机
+    nb = len(G_bak)
+    rows = np.arange(nb * nT).reshape(nb, nT)
+    form.add_rows("bak_state", np.stack([rows, rows]), np.stack([v_start, v_oper]), 1.0, None, 1, count=nb * nT)
+    if nT > 1:
+        rows = np.arange(nb * (nT - 1)).reshape(nb, nT - 1)
+        form.add_rows("bak_keep", np.stack([rows, rows]), np.stack([v_oper[:, 1:], v_oper[:, :-1]]),
+                      np.array([1.0, -1.0])[:, None, None], 0, None, count=nb * (nT - 1))
+        form.add_rows("bak_transition", np.stack([rows, rows, rows]), np.stack([v_start[:, :-1], v_oper[:, :-1], v_oper[:, 1:]]),
+                      np.array([1.0, 1.0, -1.0])[:, None, None], 0, 0, count=nb * (nT - 1))
+    # h) 隔离开关-断路器耦合：断路器闭合时两侧各至少闭合一台隔离开关
+    node_switches = defaultdict(list)
+    for name, sw in switches.items():
+        u, v = sw["nodes"]
+        node_switches[u].append(name)
+        if v != u:
+            node_switches[v].append(name)
+    coupling_rows, coupling_cols, coupling_vals = [], [], []
+    for s_name, sw in switches.items():
+        if sw['switch_type'] != 'breaker':
+            continue
+        u, v = sw["nodes"]
+        on_u = [other for other in node_switches[u] if other != s_name and switches[other]['switch_type'] == 'switch']
+        on_v = [other for other in node_switches[v] if other != s_name and switches[other]['switch_type'] == 'switch' and other not in on_u]
+        for side in (on_u, on_v):
+            if side:
+                row = coupling_rows[-1] + 1 if coupling_rows else 0
+                coupling_rows.extend([row] * (len(side) + 1))
+                coupling_cols.extend([S[sw_idx[other]] for other in side] + [S[sw_idx[s_name]]])
+                coupling_vals.extend([1.0] * len(side) + [-1.0])
+    form.add_rows("breaker_coupling", np.array(coupling_rows, dtype=np.int64), np.array(coupling_cols, dtype=np.int64),
+                  np.array(coupling_vals), 0, None)
+
+    # 3. 参数化约束
+    # 开关操作：op >= S - init, op >= init - S；结束时的开关闭合数不少于初始状态
+    rows = np.arange(nsw)
+    form.add_rows("op_close", np.stack([rows, rows]), np.stack([op, S]), np.array([1.0, -1.0])[:, None], -sw_init, None, count=nsw)
+    form.add_rows("op_open", np.stack([rows, rows]), np.stack([op, S]), 1.0, sw_init, None, count=nsw)
+    if nsw:
+        form.add_rows("keep_closed", np.zeros(nsw, dtype=np.int64), S, 1.0, sw_init.sum(), None, count=1)
+    # 负荷归属：有负荷的主变必须分配到一个供区
+    loaded = np.array([max(transformers[t]['load']) > 0 for t in TR], dtype=bool)
+    form.add_rows("assign", np.repeat(np.arange(ntr), nz), y.ravel(), 1.0, loaded.astype(float),
+                  np.where(loaded, 1.0, float(nz)), count=ntr)
+    # 备用机组出力：P_bak[t] = p_min * v_start[t-1] + p_max * v_oper[t-1]
+    if nT > 1:
+        rows = np.arange(nb * (nT - 1)).reshape(nb, nT - 1)
+        form.add_rows("bak_output", np.stack([rows, rows, rows]), np.stack([P_bak[:, 1:], v_start[:, :-1], v_oper[:, :-1]]),
+                      np.stack([np.ones((nb, nT - 1)), -unit_array("backup_units", "p_min")[:, None] * np.ones((1, nT - 1)),
+                                -unit_array("backup_units", "p_max")[:, None] * np.ones((1, nT - 1))]), 0, 0, count=nb * (nT - 1))
+    # 储能：初始SOC，SOC[t] = SOC[t-1] - P_storage[t] * 时段权重
+    ne = len(ES)
+    if nT:
+        form.add_rows("soc_initial", np.arange(ne), SOC[:, 0], 1.0, unit_array("storage_units", "soc_initial"),
+                      unit_array("storage_units", "soc_initial"), count=ne)
+    weights = np.array(p["time_weights"] or [1] * horizon, dtype=float)
+    if nT > 1:
+        rows = np.arange(ne * (nT - 1)).reshape(ne, nT - 1)
+        form.add_rows("soc", np.stack([rows, rows, rows]), np.stack([SOC[:, 1:], SOC[:, :-1], P_storage[:, 1:]]),
+                      np.stack([np.ones((ne, nT - 1)), -np.ones((ne, nT - 1)), np.broadcast_to(weights[1:nT], (ne, nT - 1))]),
+                      0, 0, count=ne * (nT - 1))
+    # 功率平衡：主变负荷 - 出力 - 切负荷 + 裕度 = 容量 - 固定负荷 + 当前出力
+    load = np.array([transformers[t]['load'][:horizon] for t in TR], dtype=float).reshape(ntr, horizon)[:, :nT]
+    sens = np.array([[transformers[t]['sensitivity'][z] for z in Z] for t in TR], dtype=float).reshape(ntr, nz)
+    balance = np.arange(nz * nT).reshape(nz, nT)
+    rhs = np.array([[zones[z]['capacity'] - zones[z]['fixed_load'][t] for t in T] for z in Z], dtype=float).reshape(nz, nT)
+    b_rows = [np.broadcast_to(balance[None, :, :], (ntr, nz, nT)).ravel(), balance.ravel()]
+    b_cols = [np.broadcast_to(y[:, :, None], (ntr, nz, nT)).ravel(), safety.ravel()]
+    b_vals = [(load[:, None, :] * sens[:, :, None]).ravel(), np.ones(nz * nT)]
+    for key, column in (("operating_units", P_opt), ("backup_units", P_bak), ("hydro_units", P_hydro),
+                        ("storage_units", P_storage), ("interruptible_loads", P_shed)):
+        for i, u in enumerate(units[key].values()):
+            if u['zone'] not in zone_idx:
+                continue
+            z = zone_idx[u['zone']]
+            b_rows.append(balance[z])
+            b_cols.append(column[i])
+            b_vals.append(np.full(nT, -1.0 if key == "interruptible_loads" else -u['sensitivity']))
+            if key in ("operating_units", "storage_units"):
+                rhs[z] += u['p_current'] * u['sensitivity']
+    form.add_rows("balance", np.concatenate(b_rows), np.concatenate(b_cols), np.concatenate(b_vals), rhs.ravel(), rhs.ravel(), count=nz * nT)
+    # 最小安全裕度：m <= safety[z, t] / 容量
+    capacity = np.array([zones[z]['capacity'] for z in Z], dtype=float)
+    form.add_rows("min_safety", np.stack([balance, balance]), np.stack([np.broadcast_to(m, (nz, nT)), safety]),
+                  np.stack([np.ones((nz, nT)), np.broadcast_to(-1 / capacity[:, None], (nz, nT))]), None, 0, count=nz * nT)
+
+    # 4. 目标项
+    n = form.n_cols
+    switch_cost, cost, shedding, safety_term = np.zeros(n), np.zeros(n), np.zeros(n), np.zeros(n)
+    switch_cost[op] = [switches[s].get("cost", 1.0) for s in SW]
+    safety_term[m] = -1
+    w = weights[:nT]
+    cost_offset = 0.0
+    for key, column in (("operating_units", P_opt), ("backup_units", P_bak), ("hydro_units", P_hydro)):
+        unit_cost = unit_array(key, "cost")
+        cost[column] = unit_cost[:, None] * w[None, :]
+        if key == "operating_units":
+            cost_offset = float((unit_cost * unit_array(key, "p_current")).sum() * w.sum())
+    # 与 RecoveryModel 一致：启动成本和主变供电成本只计入最后一个时段
+    if nT:
+        cost[v_start[:, -1]] += unit_array("backup_units", "startup_cost")
+    if horizon:
+        t_cost = np.array([[transformers[t]['cost'][z] for z in Z] for t in TR], dtype=float).reshape(ntr, nz)
+        t_load = np.array([transformers[t]['load'][horizon - 1] for t in TR], dtype=float)
+        cost[y] += t_load[:, None] * sens * t_cost
+    shedding[P_shed] = unit_array("interruptible_loads", "cost")[:, None] * w[None, :]
+    form.objective_terms = {
+        ObjectiveType.MIN_SWITCH_OP: (switch_cost, 0.0),
+        ObjectiveType.MAX_SAFETY_REGION: (safety_term, 0.0),
+        ObjectiveType.MIN_COST: (cost, cost_offset),
+    }
+    form.shedding = (shedding, 0.0)
+    return form.finalize()
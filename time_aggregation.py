@@ -0,0 +1,114 @@
+# time_aggregation.py
+"""
+时段聚合：将负荷相同或相近的连续时段（以及可选的远端时段）合并为加权时段块，
+在缩减后的模型上求解，再把调度计划展开回原始时段。
+"""
+import copy
+from datetime import datetime, timedelta
+
+
+def _load_vector(params: dict, t: int) -> list:
+    """时段 t 的全部负荷序列取值：各供区固定负荷和各主变负荷"""
+    return [z['fixed_load'][t] for z in params["zones"].values()] + \
+        [tr['load'][t] for tr in params["transformers"].values()]
+
+
+def aggregation_blocks(params: dict, tolerance: float = 0.0, coarsen_after: int = None, coarsen_block: int = 4) -> list:
+    """
+    划分时段块，首个时段始终单独成块
+    :param params: 优化输入
+    :param tolerance: 相对容差，块内每个负荷与块首时段的相对偏差不超过该值时合并（0 表示只合并完全相同的时段）
+    :param coarsen_after: 从该时段起不再比较负荷，每 coarsen_block 个时段合并为一块；None 表示不粗化
+    :param coarsen_block: 粗化时每块的时段数
+    :return: 时段块列表，每项为块内的原始时段列表
+    """
+    horizon = params["horizon"]
+    end = horizon if coarsen_after is None else max(1, min(coarsen_after, horizon))
+    # 首个时段单独成块：模型中备用机组在首个时段不能出力、储能SOC从首个时段开始递推
+    blocks = [[0]] if horizon else []
+    for t in range(1, end):
+        if blocks[-1][0] > 0:
+            first = _load_vector(params, blocks[-1][0])
+            current = _load_vector(params, t)
+            if all(abs(value - base) <= tolerance * abs(base) for value, base in zip(current, first)):
+                blocks[-1].append(t)
+                continue
+        blocks.append([t])
+    for start in range(end, horizon, max(1, coarsen_block)):
+        blocks.append(list(range(start, min(start + max(1, coarsen_block), horizon))))
+    return blocks
+
+
+def aggregate_params(params: dict, blocks: list) -> dict:
+    """
+    按时段块生成缩减后的优化输入：每块取块内负荷最大值（保证块内每个原始时段的供区容量约束成立），
+    time_weights 为各块包含的原始时段数
+    """
+    reduced = dict(params)
+    reduced["zones"] = copy.deepcopy(params["zones"])
+    reduced["transformers"] = copy.deepcopy(params["transformers"])
+    for z_name, z in reduced["zones"].items():
+        z['fixed_load'] = [max(params["zones"][z_name]['fixed_load'][t] for t in block) for block in blocks]
+    for t_name, tr in reduced["transformers"].items():
+        tr['load'] = [max(params["transformers"][t_name]['load'][t] for t in block) for block in blocks]
+    reduced["horizon"] = len(blocks)
+    reduced["time_weights"] = [len(block) for block in blocks]
+    return reduced
+
+
+def expand_result(result: dict, params: dict, blocks: list) -> dict:
+    """
+    将缩减模型的结果展开回原始时段：调度计划按块复制，储能SOC按块内功率逐时段递推，
+    供区负荷与裕度按原始时段的负荷重新计算
+    :param result: 缩减模型的 extract_result 结果
+    :param params: 原始优化输入
+    :param blocks: aggregation_blocks 的返回值
+    :return: 展开后的结果字典（原地修改并返回）
+    """
+    horizon = params["horizon"]
+    zones, transformers, storage_units = params["zones"], params["transformers"], params.get("storage_units") or {}
+    results = result["results"]
+    block_of = {t: b for b, block in enumerate(blocks) for t in block}
+    assignment = {t_name: info["assigned_zone"] for t_name, info in results["final_transformer_assignment"].items()}
+
+    def zone_load(z_name, t):
+        """原始时段 t 中随时段变化的负荷：固定负荷 + 归属该供区的主变负荷"""
+        return zones[z_name]['fixed_load'][t] + sum(
+            tr['load'][t] * tr['sensitivity'][z_name] for t_name, tr in transformers.items() if assignment[t_name] == z_name)
+
+    def block_load(z_name, b):
+        return max(zones[z_name]['fixed_load'][t] for t in blocks[b]) + sum(
+            max(tr['load'][t] for t in blocks[b]) * tr['sensitivity'][z_name]
+            for t_name, tr in transformers.items() if assignment[t_name] == z_name)
+
+    for z_name, status in results["final_zone_status"].items():
+        capacity = status["capacity"]
+        # 出力不变时，裕度随负荷减少而增加
+        final_load = [round(status["final_load"][block_of[t]] - block_load(z_name, block_of[t]) + zone_load(z_name, t), 2)
+                      for t in range(horizon)]
+        status["final_load"] = final_load
+        status["safety_region_percent"] = [round((capacity - load) / capacity * 100, 2) for load in final_load]
+        status["status"] = "安全" if max(final_load) <= capacity else "过载!"
+    for t_name, info in results["final_transformer_assignment"].items():
+        info["load"] = transformers[t_name]['load']
+
+    dispatch_plan = []
+    soc = {es: u['soc_initial'] for es, u in storage_units.items()}
+    for t in range(horizon):
+        plan = copy.deepcopy(results["dispatch_plan"][block_of[t]])
+        plan["time"] = (datetime.now() + timedelta(hours=t)).strftime("%H:%M")
+        for es, u in storage_units.items():
+            if t > 0:
+                soc[es] -= plan["storage"][es]["power_mw"] - u['p_current']
+            plan["storage"][es]["soc_mwh"] = round(soc[es], 2)
+        dispatch_plan.append(plan)
+    results["dispatch_plan"] = dispatch_plan
+    results["time_slots"] = [f"{(datetime.now() + timedelta(hours=t)).strftime('%H:%M')}" for t in range(horizon)]
+    if results["final_zone_status"]:
+        result["summary"]["safety_region_percent"] = min(
+            min(status["safety_region_percent"]) for status in results["final_zone_status"].values())
+    result["solver"]["time_aggregation"] = {
+        "horizon": horizon, "aggregated_horizon": len(blocks),
+        "blocks": [[block[0], block[-1]] for block in blocks],
+    }
+    return result
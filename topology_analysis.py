@@ -150,6 +150,301 @@ def build_power_system_graph(substation_nodes: list, switches: dict,):
     
     return G
 
+def fixed_switch_states(params: dict) -> dict:
+    """不可用或连接到不可用供区线路的开关在优化中固定为初始状态，返回 {开关名: 固定状态}"""
+    unavailable_zone_line_nodes = {line['conn_node'] for line in params["zone_lines"].values() if not line.get('available', True)}
+    fixed = {}
+    for name, sw in params["switches"].items():
+        u, v = sw["nodes"]
+        if not sw.get("available", True) or u in unavailable_zone_line_nodes or v in unavailable_zone_line_nodes:
+            fixed[name] = sw["initial_state"]
+    return fixed
+
+def build_incidence_index(substation_nodes: list, zones: dict, zone_lines: dict, switches: dict, transformers: dict):
+    """
+    预计算优化模型所需的节点-边关联索引，避免建模时对全部有向边/开关的重复扫描
+    :param substation_nodes: 节点
+    :param zones: 供区
+    :param zone_lines: 供区线路（conn_node与供区之间视为一条虚拟边）
+    :param switches: 开关
+    :param transformers: 主变
+    :return: 包含有向边列表及各类关联关系的字典
+    """
+    directed_edges = []
+    in_edges = defaultdict(list)      # 节点 -> 流入该节点的有向边
+    out_edges = defaultdict(list)     # 节点 -> 从该节点流出的有向边
+    node_switches = defaultdict(list) # 节点 -> 与该节点相连的开关
+    node_transformers = defaultdict(list) # 连接节点 -> 挂接的主变
+
+    def add_edge(u, v):
+        directed_edges.append((u, v))
+        out_edges[u].append((u, v))
+        in_edges[v].append((u, v))
+
+    for name, sw in switches.items():
+        u, v = sw["nodes"]
+        add_edge(u, v)
+        add_edge(v, u)
+        node_switches[u].append(name)
+        if v != u:
+            node_switches[v].append(name)
+    for line_name, line_params in zone_lines.items():
+        add_edge(line_params['conn_node'], line_params['zone'])
+        add_edge(line_params['zone'], line_params['conn_node'])
+    for t_name, t_params in transformers.items():
+        node_transformers[t_params['conn_node']].append(t_name)
+
+    return {
+        "directed_edges": directed_edges,
+        "in_edges": in_edges,
+        "out_edges": out_edges,
+        "node_switches": node_switches,
+        "node_transformers": node_transformers,
+        "flow_nodes": list(substation_nodes) + list(zones.keys()),
+    }
+
+def reduce_switch_network(substation_nodes: list, zones: dict, zone_lines: dict, switches: dict, transformers: dict,
+                          fixed_states: dict = None):
+    """
+    构建优化模型中潮流/分区标号所用的网络，并按开关固定状态进行化简：
+    1. 固定闭合的开关合并两端节点（与供区线路连接点相连的开关保留为边，以保留单线不带2变约束）
+    2. 固定断开的开关不产生边；两端代表节点相同的开关互为并联，合并为边上的一个并联组（任一闭合即组闭合）
+    3. 串联链（中间节点只连两条边，且无主变/供区线路）合并为一条边，边上依次保留链中各边的并联组（全部组闭合边才闭合）
+    4. 反复删除无主变/供区线路的悬挂节点
+    开关本身不受影响：每台开关在模型中仍有状态变量，化简只作用于流量变量和节点标号，因此结果无需另行映射。
+    :param substation_nodes: 节点
+    :param zones: 供区
+    :param zone_lines: 供区线路
+    :param switches: 开关
+    :param transformers: 主变
+    :param fixed_states: {开关名: 固定状态}，为 None 时不化简（每台开关一条边，与原模型一致）
+    :return: {"node_map": 原节点->代表节点, "nodes": 代表节点列表, "edges": {(a, b): [(并联开关名, ...), ...]}，
+              每条边为若干并联组的串联,
+              "limited_edges": 经过供区线路连接点的边, "directed_edges", "in_edges", "out_edges",
+              "node_transformers", "flow_nodes", "stats"}
+    """
+    order = {node: i for i, node in enumerate(substation_nodes)}
+    conn_nodes = {line['conn_node'] for line in zone_lines.values()}
+    protected = conn_nodes | {t['conn_node'] for t in transformers.values()}
+    reduce = fixed_states is not None
+    fixed_states = fixed_states or {}
+
+    # 1. 并查集合并固定闭合开关的两端，代表节点取节点列表中靠前者
+    parent = {node: node for node in substation_nodes}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    contracted = 0
+    for name, sw in switches.items():
+        u, v = sw["nodes"]
+        if fixed_states.get(name) == 1 and u not in conn_nodes and v not in conn_nodes:
+            a, b = find(u), find(v)
+            if a != b:
+                if order[b] < order[a]:
+                    a, b = b, a
+                parent[b] = a
+            contracted += 1
+
+    # 2. 剩余开关构成边，两端相同的代表节点之间的开关并联，合并为一个并联组
+    parallel, limited_edges, edge_key = {}, set(), {}
+    dropped_open = 0
+    for name, sw in switches.items():
+        u, v = sw["nodes"]
+        if fixed_states.get(name) == 0:
+            dropped_open += 1
+            continue
+        a, b = find(u), find(v)
+        if a == b:
+            continue
+        key = edge_key.setdefault(frozenset((a, b)), (a, b))
+        parallel.setdefault(key, []).append(name)
+        if u in conn_nodes or v in conn_nodes:
+            limited_edges.add(key)
+    edges = {key: [tuple(names)] for key, names in parallel.items()}
+
+    # 3/4. 串联链合并与悬挂节点删除
+    collapsed, pruned = 0, 0
+    if reduce:
+        adjacency = defaultdict(set)
+        for key in edges:
+            adjacency[key[0]].add(key)
+            adjacency[key[1]].add(key)
+        candidates = [node for node in substation_nodes if find(node) == node and node not in protected]
+        changed = True
+        while changed:
+            changed = False
+            for node in candidates:
+                incident = adjacency.get(node)
+                if not incident or len(incident) > 2:
+                    continue
+                if len(incident) == 1:
+                    key = next(iter(incident))
+                    other = key[1] if key[0] == node else key[0]
+                    adjacency[other].discard(key)
+                    del adjacency[node]
+                    del edges[key]
+                    limited_edges.discard(key)
+                    pruned += 1
+                    changed = True
+                    continue
+                first, second = incident
+                x = first[1] if first[0] == node else first[0]
+                y = second[1] if second[0] == node else second[0]
+                if x == y or frozenset((x, y)) in edge_key and edge_key[frozenset((x, y))] in edges:
+                    continue
+                key = (x, y)
+                edge_key[frozenset(key)] = key
+                edges[key] = edges.pop(first) + edges.pop(second)
+                if first in limited_edges or second in limited_edges:
+                    limited_edges.add(key)
+                limited_edges.discard(first)
+                limited_edges.discard(second)
+                adjacency[x].discard(first)
+                adjacency[y].discard(second)
+                adjacency[x].add(key)
+                adjacency[y].add(key)
+                del adjacency[node]
+                collapsed += 1
+                changed = True
+        used = {node for key in edges for node in key}
+        nodes = [node for node in substation_nodes if find(node) == node and (node in used or node in protected)]
+    else:
+        nodes = list(substation_nodes)
+
+    node_map = {node: find(node) for node in substation_nodes}
+    directed_edges = []
+    in_edges = defaultdict(list)
+    out_edges = defaultdict(list)
+
+    def add_edge(u, v):
+        directed_edges.append((u, v))
+        out_edges[u].append((u, v))
+        in_edges[v].append((u, v))
+
+    for a, b in edges:
+        add_edge(a, b)
+        add_edge(b, a)
+    zone_line_edges = set()
+    for line_params in zone_lines.values():
+        key = (node_map[line_params['conn_node']], line_params['zone'])
+        if reduce and key in zone_line_edges:
+            continue
+        zone_line_edges.add(key)
+        add_edge(*key)
+        add_edge(key[1], key[0])
+    node_transformers = defaultdict(list)
+    for t_name, t_params in transformers.items():
+        node_transformers[node_map[t_params['conn_node']]].append(t_name)
+
+    return {
+        "node_map": node_map,
+        "nodes": nodes,
+        "edges": edges,
+        "limited_edges": limited_edges,
+        "directed_edges": directed_edges,
+        "in_edges": in_edges,
+        "out_edges": out_edges,
+        "node_transformers": node_transformers,
+        "flow_nodes": nodes + list(zones.keys()),
+        "stats": {
+            "nodes": len(substation_nodes), "reduced_nodes": len(nodes),
+            "switches": len(switches), "reduced_edges": len(edges),
+            "contracted_closed": contracted, "dropped_open": dropped_open,
+            "collapsed_series": collapsed, "pruned_dangling": pruned,
+            "parallel_groups": sum(len(group) > 1 for groups in edges.values() for group in groups),
+        },
+    }
+
+def zone_reachability(network: dict, zone_lines: dict, transformers: dict, fixed_states: dict = None):
+    """
+    在 reduce_switch_network 给出的网络上，计算所有可用开关闭合时各供区能够到达的节点。
+    闭合路径两端的分区标号相同，而供区线路连接点的标号固定为所属供区，因此供区z的供电路径
+    不会经过其他供区的连接点；搜索从z的连接点出发，不进入其他供区的连接点，也不经过固定断开的开关。
+    :param network: reduce_switch_network 的返回值
+    :param zone_lines: 供区线路
+    :param transformers: 主变
+    :param fixed_states: {开关名: 固定状态}，网络未化简时用于排除固定断开的开关
+    :return: {"zone_nodes": {供区: 可达节点集合}, "transformer_zones": {主变: 可达供区列表}}
+    """
+    fixed_states = fixed_states or {}
+    node_map = network["node_map"]
+    adjacency = defaultdict(list)
+    for (a, b), groups in network["edges"].items():
+        # 某个并联组的开关全部固定断开时整条边断开
+        if any(all(fixed_states.get(name) == 0 for name in group) for group in groups):
+            continue
+        adjacency[a].append(b)
+        adjacency[b].append(a)
+    zone_conn = defaultdict(set)
+    for line_params in zone_lines.values():
+        zone_conn[line_params['zone']].add(node_map[line_params['conn_node']])
+    zone_nodes = {}
+    for zone, starts in zone_conn.items():
+        blocked = set().union(*(conn for other, conn in zone_conn.items() if other != zone)) - starts
+        visited = set(starts)
+        stack = list(starts)
+        while stack:
+            node = stack.pop()
+            for neighbor in adjacency[node]:
+                if neighbor not in visited and neighbor not in blocked:
+                    visited.add(neighbor)
+                    stack.append(neighbor)
+        zone_nodes[zone] = visited
+    transformer_zones = {t_name: [zone for zone, nodes in zone_nodes.items() if node_map[t['conn_node']] in nodes]
+                         for t_name, t in transformers.items()}
+    return {"zone_nodes": zone_nodes, "transformer_zones": transformer_zones}
+
+def independent_islands(params: dict) -> list:
+    """
+    将优化问题划分为互不相关的电气孤岛：由非固定断开的开关和供区线路（连接点-供区）连成的连通分量，
+    不同孤岛之间没有可操作的开关、不会共享主变和供区，可分别独立求解。
+    固定断开的开关两端可能属于不同的孤岛，此时归入两端所在的每个孤岛（其端点作为孤立节点一并加入）；
+    不含供区的分量（其中的开关只能保持初始状态、主变无法供电）并入第一个孤岛。
+    :param params: 优化输入
+    :return: 孤岛列表，每项为 {"zones", "substation_nodes", "switches", "zone_lines", "transformers"}，均为名称列表（保持输入顺序）
+    """
+    fixed = fixed_switch_states(params)
+    graph = nx.Graph()
+    graph.add_nodes_from(params["substation_nodes"])
+    # 供区以元组为节点，避免与变电站节点重名
+    graph.add_nodes_from(("zone", z_name) for z_name in params["zones"])
+    for name, sw in params["switches"].items():
+        if fixed.get(name) != 0:
+            graph.add_edge(*sw["nodes"])
+    for line in params["zone_lines"].values():
+        graph.add_edge(line['conn_node'], ("zone", line['zone']))
+    components = list(nx.connected_components(graph))
+    with_zones = [c for c in components if any(isinstance(node, tuple) for node in c)] or [set()]
+    for component in components:
+        if not any(isinstance(node, tuple) for node in component):
+            with_zones[0] |= component
+    component_of = {node: index for index, component in enumerate(with_zones) for node in component}
+
+    blocks = [{"zones": [], "substation_nodes": [], "switches": [], "zone_lines": [], "transformers": []} for _ in with_zones]
+    for z_name in params["zones"]:
+        blocks[component_of[("zone", z_name)]]["zones"].append(z_name)
+    for line_name, line in params["zone_lines"].items():
+        blocks[component_of[line['conn_node']]]["zone_lines"].append(line_name)
+    for t_name, t in params["transformers"].items():
+        blocks[component_of[t['conn_node']]]["transformers"].append(t_name)
+    node_blocks = defaultdict(set)
+    for node in params["substation_nodes"]:
+        node_blocks[node].add(component_of[node])
+    for name, sw in params["switches"].items():
+        indices = {component_of[node] for node in sw["nodes"]}
+        for index in sorted(indices):
+            blocks[index]["switches"].append(name)
+        for node in sw["nodes"]:
+            node_blocks[node] |= indices
+    for node in params["substation_nodes"]:
+        for index in sorted(node_blocks[node]):
+            blocks[index]["substation_nodes"].append(node)
+    return blocks
+
 def get_connected_edges_with_attrs(G, u, v):
     """获取与边(u,v)相连的其他边（带属性）"""
     connected_edges = []